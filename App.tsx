@@ -12,6 +12,7 @@ const App: React.FC = () => {
   const [viewMode, setViewMode] = useState<ViewMode>('home');
   const [selectedWardId, setSelectedWardId] = useState<string | null>(null);
   const [wardsData, setWardsData] = useState<Ward[]>([]);
+  const [wardDetails, setWardDetails] = useState<Ward | null>(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
 
@@ -52,9 +53,24 @@ const App: React.FC = () => {
     return () => window.removeEventListener('hashchange', handleHashChange);
   }, [wardsData]);
 
+  // The ward list is fetched without meetings; load them for the selected ward
+  useEffect(() => {
+    setWardDetails(null);
+    if (!selectedWardId) return;
+    let cancelled = false;
+    fetchWardById(selectedWardId).then(ward => {
+      if (!cancelled) setWardDetails(ward);
+    });
+    return () => {
+      cancelled = true;
+    };
+  }, [selectedWardId]);
+
   const selectedWard = useMemo(
-    () => wardsData.find(w => w.id === selectedWardId),
-    [selectedWardId, wardsData]
+    () => (wardDetails && wardDetails.id === selectedWardId
+      ? wardDetails
+      : wardsData.find(w => w.id === selectedWardId)),
+    [selectedWardId, wardsData, wardDetails]
   );
 
   const handleWardClick = (wardId: string) => {
@@ -0,0 +1,65 @@
+"""
+Gunicorn configuration for production.
+
+Picked up automatically when gunicorn is started from this directory
+(``cd backend && gunicorn pdp_calendar.wsgi:application``). Every value can be
+overridden with the environment variable next to it.
+
+Threaded workers (``gthread``) suit this app: requests spend much of their
+time waiting on the database, which threads overlap. Each thread keeps its
+own persistent database connection (``CONN_MAX_AGE``), so a worker holds at
+most ``threads`` connections and the whole server ``workers * threads``; keep
+that below the database's ``max_connections``, or put PgBouncer in front (see
+``DATABASE_POOLER``).
+
+The worker count is fixed rather than derived from the CPU count, which in a
+container is the host's and would multiply connections and memory. More than
+one worker needs a shared cache (``REDIS_URL``): with the default local
+memory cache, each process keeps its own response cache and invalidations
+never reach the others. So the default is one worker, or two with Redis.
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.getenv('WEB_CONCURRENCY', 2 if os.getenv('REDIS_URL') else 1))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+
+# Import the app once in the master so workers share its memory copy-on-write
+# and start faster. Code changes then need a full restart, not a HUP.
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True') == 'True'
+
+# Recycle workers periodically to bound slow memory growth; the jitter keeps
+# them from all restarting at once
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+
+def on_starting(server):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pdp_calendar.settings')
+    from django.conf import settings
+    backend = settings.CACHES[settings.WARDS_CACHE_ALIAS]['BACKEND']
+    if server.cfg.workers > 1 and backend == 'django.core.cache.backends.locmem.LocMemCache':
+        server.log.error(
+            'Running %d workers with the local memory cache: cache invalidations only reach '
+            'the worker that made the change, so the others serve stale occurrences, conflicts, '
+            'next meetings and search results until WARDS_CACHE_TIMEOUT runs out. '
+            'Set REDIS_URL, or WEB_CONCURRENCY=1.',
+            server.cfg.workers,
+        )
+
+
+def post_fork(server, worker):
+    # Never share a database connection opened in the preloaded master
+    if server.cfg.preload_app:
+        from django.db import connections
+        connections.close_all()
@@ -0,0 +1,18 @@
+"""
+ASGI config for pdp_calendar project.
+
+Serves the read-heavy ward endpoints from async views (``WARDS_ASYNC_VIEWS``),
+so slow clients and calendar pollers wait on the event loop instead of each
+holding a worker thread. Run it with uvicorn workers:
+
+    gunicorn pdp_calendar.asgi:application -k uvicorn.workers.UvicornWorker
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pdp_calendar.settings')
+os.environ.setdefault('WARDS_ASYNC_VIEWS', 'True')
+
+application = get_asgi_application()
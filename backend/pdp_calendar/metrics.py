@@ -0,0 +1,136 @@
+"""
+In-process request metrics, exported in the Prometheus text format.
+
+Histograms are kept per view in this process only; with several worker
+processes each reports its own numbers, as with any pull-based exporter
+without a multiprocess collector.
+"""
+import bisect
+import hmac
+import threading
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Upper bounds of the SQL query count histogram buckets
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+# Upper bounds (bytes) of the response size histogram buckets
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Histogram:
+    """Cumulative-bucket histogram with a running sum and count"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            yield f'{name}_bucket{{{labels},le="{le}"}} {cumulative}'
+        yield f'{name}_sum{{{labels}}} {self.sum:.6f}'
+        yield f'{name}_count{{{labels}}} {self.count}'
+
+
+class MetricsRegistry:
+    """Per-view request histograms and counters"""
+
+    HISTOGRAMS = {
+        'http_request_duration_seconds': ('Wall time of requests', LATENCY_BUCKETS),
+        'http_request_sql_duration_seconds': ('Time spent in SQL per request', LATENCY_BUCKETS),
+        'http_request_render_duration_seconds': ('Time spent rendering responses', LATENCY_BUCKETS),
+        'http_request_sql_queries': ('SQL queries per request', QUERY_BUCKETS),
+        'http_response_size_bytes': ('Response body size', SIZE_BUCKETS),
+    }
+
+    COUNTERS = {
+        'http_requests_total': 'Requests handled',
+        'http_requests_slow_total': 'Requests slower than the slow request threshold',
+        'http_requests_over_query_budget_total': 'Requests exceeding the SQL query budget (likely N+1)',
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {name: {} for name in self.HISTOGRAMS}
+            self.counters = {name: {} for name in self.COUNTERS}
+
+    def record(self, view, method, status, duration, sql_time, queries, render_time, size, slow, over_budget):
+        labels = (view, method, str(status))
+        with self._lock:
+            self._observe('http_request_duration_seconds', labels, duration)
+            self._observe('http_request_sql_duration_seconds', labels, sql_time)
+            self._observe('http_request_sql_queries', labels, queries)
+            if render_time is not None:
+                self._observe('http_request_render_duration_seconds', labels, render_time)
+            if size is not None:
+                self._observe('http_response_size_bytes', labels, size)
+            self._increment('http_requests_total', labels)
+            if slow:
+                self._increment('http_requests_slow_total', labels)
+            if over_budget:
+                self._increment('http_requests_over_query_budget_total', labels)
+
+    def _observe(self, name, labels, value):
+        histograms = self.histograms[name]
+        if labels not in histograms:
+            histograms[labels] = Histogram(self.HISTOGRAMS[name][1])
+        histograms[labels].observe(value)
+
+    def _increment(self, name, labels):
+        counters = self.counters[name]
+        counters[labels] = counters.get(labels, 0) + 1
+
+    def exposition(self):
+        """Render every metric in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name, (help_text, _) in self.HISTOGRAMS.items():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for labels, histogram in sorted(self.histograms[name].items()):
+                    lines.extend(histogram.samples(name, format_labels(labels)))
+            for name, help_text in self.COUNTERS.items():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} counter')
+                for labels, value in sorted(self.counters[name].items()):
+                    lines.append(f'{name}{{{format_labels(labels)}}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(labels):
+    view, method, status = labels
+    view = view.replace('\\', '\\\\').replace('"', '\\"')
+    return f'view="{view}",method="{method}",status="{status}"'
+
+
+registry = MetricsRegistry()
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. When ``METRICS_TOKEN`` is set, scrapers must
+    send it as ``Authorization: Bearer <token>``.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        supplied = request.META.get('HTTP_AUTHORIZATION', '').removeprefix('Bearer ')
+        if not hmac.compare_digest(supplied.encode('utf-8'), token.encode('utf-8')):
+            return HttpResponseForbidden()
+    return HttpResponse(registry.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
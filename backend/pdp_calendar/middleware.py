@@ -0,0 +1,209 @@
+"""
+Project middleware: request instrumentation and static files.
+
+``RequestMetricsMiddleware`` times every request and, through
+``connection.execute_wrapper``, counts and times the SQL it runs. Rendering
+of DRF/template responses is timed separately. Results go to
+``pdp_calendar.metrics.registry`` under the resolved view name; requests over
+``METRICS_SLOW_REQUEST_MS`` or over the ``METRICS_QUERY_BUDGET`` are logged,
+the latter with the most repeated statement, which is usually the N+1.
+
+``WhiteNoiseMiddleware`` extends WhiteNoise's with async support. Both
+middleware classes run natively in an async (ASGI) stack, so that they do not
+force async views back onto a thread.
+
+The session, CSRF, authentication and messages middleware are Django's,
+except that public reads (anonymous GET/HEAD/OPTIONS requests under
+``API_PUBLIC_READ_PREFIXES``) pass straight through them: the read endpoints
+use none of what they set up. A request carrying a session cookie always
+takes the full path.
+"""
+import logging
+import time
+from asyncio import iscoroutinefunction
+from collections import Counter
+from contextlib import ExitStack
+from asgiref.sync import markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware as BaseAuthenticationMiddleware
+from django.contrib.messages.middleware import MessageMiddleware as BaseMessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware as BaseSessionMiddleware
+from django.db import connections
+from django.middleware.csrf import CsrfViewMiddleware as BaseCsrfViewMiddleware
+from whitenoise.middleware import WhiteNoiseMiddleware as BaseWhiteNoiseMiddleware
+from .metrics import registry
+
+logger = logging.getLogger('pdp_calendar.requests')
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class QueryRecorder:
+    """``execute_wrapper`` callable counting and timing the queries of a request"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+
+def install_recorder(stack, recorder):
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(recorder))
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            install_recorder(stack, recorder)
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+        self.record(request, response, recorder, duration)
+        return response
+
+    async def __acall__(self, request):
+        # Connections are per thread and the async ORM runs queries in the
+        # request's thread-sensitive executor, so the wrappers go there too
+        recorder = QueryRecorder()
+        stack = ExitStack()
+        started = time.perf_counter()
+        await sync_to_async(install_recorder)(stack, recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        duration = time.perf_counter() - started
+        self.record(request, response, recorder, duration)
+        return response
+
+    def process_template_response(self, request, response):
+        # Called right before the handler renders the response, so the
+        # post-render callback brackets serialization
+        started = time.perf_counter()
+
+        def rendered(response):
+            request.metrics_render_time = time.perf_counter() - started
+        response.add_post_render_callback(rendered)
+        return response
+
+    def record(self, request, response, recorder, duration):
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name or match._func_path) if match else '<unresolved>'
+        if response.streaming:
+            size = int(response['Content-Length']) if response.has_header('Content-Length') else None
+        else:
+            size = len(response.content)
+
+        slow_ms = getattr(settings, 'METRICS_SLOW_REQUEST_MS', 500)
+        budget = getattr(settings, 'METRICS_QUERY_BUDGET', 20)
+        slow = duration * 1000 >= slow_ms
+        over_budget = recorder.count > budget
+
+        registry.record(
+            view, request.method, response.status_code, duration, recorder.duration, recorder.count,
+            getattr(request, 'metrics_render_time', None), size, slow, over_budget,
+        )
+
+        if over_budget:
+            statement, repeats = recorder.statements.most_common(1)[0]
+            logger.warning(
+                'Query budget exceeded: %s %s (%s) ran %d queries (budget %d); '
+                'most repeated (%dx): %s',
+                request.method, request.get_full_path(), view, recorder.count, budget, repeats,
+                statement[:300],
+            )
+        if slow:
+            logger.warning(
+                'Slow request: %s %s (%s) took %.0f ms, %d queries in %.0f ms',
+                request.method, request.get_full_path(), view, duration * 1000,
+                recorder.count, recorder.duration * 1000,
+            )
+
+
+class WhiteNoiseMiddleware(BaseWhiteNoiseMiddleware):
+    """WhiteNoise that can also sit in an async middleware stack"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+
+def is_public_read(request):
+    """Whether a request is an anonymous read of a public API path"""
+    public = getattr(request, '_public_read', None)
+    if public is None:
+        public = request._public_read = (
+            request.method in SAFE_METHODS
+            and request.path_info.startswith(tuple(getattr(settings, 'API_PUBLIC_READ_PREFIXES', ())))
+            and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        )
+    return public
+
+
+class PublicReadBypassMixin:
+    """Pass public reads straight to the next middleware"""
+
+    def __call__(self, request):
+        if is_public_read(request):
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class SessionMiddleware(PublicReadBypassMixin, BaseSessionMiddleware):
+    pass
+
+
+class CsrfViewMiddleware(PublicReadBypassMixin, BaseCsrfViewMiddleware):
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        # Registered with the handler separately from __call__
+        if is_public_read(request):
+            return None
+        return super().process_view(request, callback, callback_args, callback_kwargs)
+
+
+class AuthenticationMiddleware(PublicReadBypassMixin, BaseAuthenticationMiddleware):
+    pass
+
+
+class MessageMiddleware(PublicReadBypassMixin, BaseMessageMiddleware):
+    pass
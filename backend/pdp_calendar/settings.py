@@ -5,14 +5,19 @@ Django settings for pdp_calendar project.
 import os
 import dj_database_url
 from pathlib import Path
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Load environment variables from backend/.env or the repository's .env. On
+# hosts that set the environment directly there is no file, and python-dotenv
+# is not even imported.
+for env_file in (BASE_DIR / '.env', BASE_DIR.parent / '.env'):
+    if env_file.is_file():
+        from dotenv import load_dotenv
+        load_dotenv(env_file)
+        break
+
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.getenv('SECRET_KEY', 'django-insecure-pdp-akinyele-calendar-dev-key-change-in-production')
 
@@ -45,19 +50,24 @@ INSTALLED_APPS = [
     'wards',
 ]
 
+# Sessions, CSRF, authentication and messages are skipped for anonymous
+# GET/HEAD/OPTIONS requests under API_PUBLIC_READ_PREFIXES (see
+# pdp_calendar.middleware)
 MIDDLEWARE = [
+    'pdp_calendar.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'pdp_calendar.middleware.WhiteNoiseMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
-    'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
+    'pdp_calendar.middleware.SessionMiddleware',
+    'pdp_calendar.middleware.CsrfViewMiddleware',
+    'pdp_calendar.middleware.AuthenticationMiddleware',
+    'pdp_calendar.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+API_PUBLIC_READ_PREFIXES = ['/api/']
+
 ROOT_URLCONF = 'pdp_calendar.urls'
 
 TEMPLATES = [
@@ -88,13 +98,20 @@ DATABASES = {
     }
 }
 
-# Use PostgreSQL on Render if DATABASE_URL is set
+# Use PostgreSQL on Render if DATABASE_URL is set. Connections persist for
+# DATABASE_CONN_MAX_AGE seconds, one per gunicorn thread (see gunicorn.conf.py).
 if os.getenv('DATABASE_URL'):
     DATABASES['default'] = dj_database_url.config(
-        conn_max_age=600,
+        conn_max_age=int(os.getenv('DATABASE_CONN_MAX_AGE', '600')),
         conn_health_checks=True,
     )
 
+    # Behind PgBouncer in transaction pooling mode, consecutive queries may
+    # run on different server connections, so named (server-side) cursors
+    # used by QuerySet.iterator() cannot be kept open
+    if os.getenv('DATABASE_POOLER') == 'pgbouncer':
+        DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -155,3 +172,87 @@ REST_FRAMEWORK = {
 
 # WhiteNoise configuration for serving static files efficiently
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+
+# Cache hashed files forever: Django's manifest names (app.0123456789ab.css)
+# and Vite's bundles copied to static/assets/ (index-Ab12_cD3.js)
+WHITENOISE_IMMUTABLE_FILE_TEST = r'\.[0-9a-f]{12}\.\w+$|/assets/.+-[\w-]{8}\.\w+$'
+
+# Seconds between checks of dist/index.html for a new build (see pdp_calendar.spa)
+SPA_SHELL_CHECK_INTERVAL = int(os.getenv('SPA_SHELL_CHECK_INTERVAL', '2' if DEBUG else '60'))
+
+# Materialized meeting occurrences (see wards.materialize)
+WARDS_MATERIALIZE_OCCURRENCES = os.getenv('WARDS_MATERIALIZE_OCCURRENCES', 'False') == 'True'
+WARDS_OCCURRENCE_WINDOW_DAYS = int(os.getenv('WARDS_OCCURRENCE_WINDOW_DAYS', '365'))
+
+# Caching: local memory by default, Redis when REDIS_URL is set (requires the
+# ``redis`` package). Use Redis when running more than one worker process, so
+# that invalidations reach every process.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'pdp-calendar',
+    }
+}
+
+if os.getenv('REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('REDIS_URL'),
+    }
+
+# Response cache for the ward endpoints (see wards.cache)
+WARDS_CACHE_ALIAS = 'default'
+WARDS_CACHE_TIMEOUT = int(os.getenv('WARDS_CACHE_TIMEOUT', '300'))
+
+# Serve GETs of the hot ward endpoints from async views (see wards.async_views).
+# Enabled by pdp_calendar.asgi; only useful under an ASGI server.
+WARDS_ASYNC_VIEWS = os.getenv('WARDS_ASYNC_VIEWS', 'False') == 'True'
+
+# Calendar exports and feeds
+WARDS_CALENDAR_TIMEZONE = os.getenv('WARDS_CALENDAR_TIMEZONE', 'Africa/Lagos')
+WARDS_MEETING_DURATION_MINUTES = int(os.getenv('WARDS_MEETING_DURATION_MINUTES', '120'))
+
+# Delta sync (see wards.sync): how far behind "now" sync positions stay, and
+# how long deletions are remembered
+WARDS_SYNC_LAG_SECONDS = int(os.getenv('WARDS_SYNC_LAG_SECONDS', '10'))
+WARDS_SYNC_RETENTION_DAYS = int(os.getenv('WARDS_SYNC_RETENTION_DAYS', '30'))
+
+# Background jobs (see wards.jobs). When enabled, derived data and
+# notifications are queued for ``python manage.py run_jobs`` instead of being
+# produced inside the request.
+WARDS_BACKGROUND_JOBS = os.getenv('WARDS_BACKGROUND_JOBS', 'False') == 'True'
+WARDS_JOB_TIMEOUT_SECONDS = int(os.getenv('WARDS_JOB_TIMEOUT_SECONDS', '600'))
+WARDS_JOB_RETENTION_DAYS = int(os.getenv('WARDS_JOB_RETENTION_DAYS', '7'))
+
+# Outgoing email (meeting cancellation notices): sent over SMTP, or printed to
+# the console in development
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', (
+    'django.core.mail.backends.console.EmailBackend' if DEBUG else 'django.core.mail.backends.smtp.EmailBackend'
+))
+EMAIL_HOST = os.getenv('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.getenv('EMAIL_PORT', '25'))
+EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'False') == 'True'
+DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'webmaster@localhost')
+
+# Request metrics (see pdp_calendar.middleware), scraped from /api/metrics
+METRICS_SLOW_REQUEST_MS = int(os.getenv('METRICS_SLOW_REQUEST_MS', '500'))
+METRICS_QUERY_BUDGET = int(os.getenv('METRICS_QUERY_BUDGET', '20'))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {'format': '%(asctime)s %(levelname)s %(name)s: %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'simple'},
+    },
+    'root': {'handlers': ['console'], 'level': 'WARNING'},
+    'loggers': {
+        'pdp_calendar': {'handlers': ['console'], 'level': os.getenv('LOG_LEVEL', 'INFO'), 'propagate': False},
+        'wards': {'handlers': ['console'], 'level': os.getenv('LOG_LEVEL', 'INFO'), 'propagate': False},
+    },
+}
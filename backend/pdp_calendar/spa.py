@@ -0,0 +1,163 @@
+"""
+In-memory serving of the React app shell (dist/index.html).
+
+The shell is read, has its asset paths rewritten and is compressed once, then
+served from memory with an ETag. The file's mtime is re-checked at most every
+``SPA_SHELL_CHECK_INTERVAL`` seconds, so a rebuilt frontend is picked up
+without a restart while steady-state requests do no disk I/O.
+"""
+import gzip
+import hashlib
+import logging
+import threading
+import time
+from pathlib import Path
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # Optional: only gzip variants are built without it
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Render's path structure first, then the local build output
+SHELL_PATHS = [
+    Path('/opt/render/project/src/dist/index.html'),
+    Path(settings.BASE_DIR).parent / 'dist' / 'index.html',
+]
+
+FALLBACK_HTML = '''
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>PDP Calendar</title>
+        <meta charset="utf-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1">
+        <script src="https://cdn.tailwindcss.com"></script>
+    </head>
+    <body class="flex items-center justify-center h-screen bg-gray-100">
+        <div class="text-center">
+            <h1 class="text-3xl font-bold text-green-700 mb-4">🔧 Initializing...</h1>
+            <p class="text-gray-600 mb-4">Please wait while the app starts up...</p>
+        </div>
+    </body>
+    </html>
+    '''
+
+
+def rewrite_asset_paths(content):
+    """
+    Point asset URLs at /static/assets/. Vite outputs /assets/ but Django
+    serves the copied build from /static/.
+    """
+    content = content.replace('src="/assets/', 'src="/static/assets/')
+    return content.replace('href="/assets/', 'href="/static/assets/')
+
+
+class ShellVariant:
+    """One encoding of the shell, ready to be sent"""
+
+    def __init__(self, body, encoding, etag):
+        self.body = body
+        self.encoding = encoding
+        self.etag = etag
+
+
+class AppShell:
+    """The rewritten shell and its compressed variants, cached in memory"""
+
+    def __init__(self, paths, check_interval=None):
+        self.paths = paths
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._source = None
+        self._variants = {}
+        self._checked_at = None
+
+    def get_check_interval(self):
+        if self.check_interval is not None:
+            return self.check_interval
+        return getattr(settings, 'SPA_SHELL_CHECK_INTERVAL', 2 if settings.DEBUG else 60)
+
+    def variants(self):
+        """Return the current variants by encoding, reloading if the file changed"""
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.get_check_interval():
+            return self._variants
+        with self._lock:
+            if self._checked_at is None or now - self._checked_at >= self.get_check_interval():
+                self._refresh()
+                self._checked_at = now
+        return self._variants
+
+    def _refresh(self):
+        source = None
+        for path in self.paths:
+            try:
+                source = (path, path.stat().st_mtime_ns)
+                break
+            except OSError:
+                continue
+        if source == self._source:
+            return
+        try:
+            content = source[0].read_text(encoding='utf-8') if source else None
+        except OSError as exc:
+            logger.error('Error reading %s: %s', source[0], exc)
+            content = None
+        self._source = source
+        self._variants = self._build(content) if content is not None else {}
+
+    @staticmethod
+    def _build(content):
+        body = rewrite_asset_paths(content).encode('utf-8')
+        digest = hashlib.sha256(body).hexdigest()[:16]
+        variants = {'identity': ShellVariant(body, None, f'"{digest}"')}
+        variants['gzip'] = ShellVariant(gzip.compress(body, compresslevel=9, mtime=0), 'gzip', f'"{digest}-gz"')
+        if brotli is not None:
+            variants['br'] = ShellVariant(brotli.compress(body), 'br', f'"{digest}-br"')
+        return variants
+
+    def response(self, request):
+        """Serve the best variant for the request's Accept-Encoding"""
+        variants = self.variants()
+        if not variants:
+            return HttpResponse(FALLBACK_HTML, content_type='text/html; charset=utf-8')
+
+        variant = variants[choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), variants)]
+        response = get_conditional_response(request, etag=variant.etag)
+        if response is None:
+            response = HttpResponse(variant.body, content_type='text/html; charset=utf-8')
+            if variant.encoding:
+                response['Content-Encoding'] = variant.encoding
+        response['ETag'] = variant.etag
+        patch_vary_headers(response, ['Accept-Encoding'])
+        # Revalidate every time: the shell names the current hashed bundles
+        patch_cache_control(response, no_cache=True, public=True)
+        return response
+
+
+def choose_encoding(accept_encoding, variants):
+    """Pick 'br', 'gzip' or 'identity' from an Accept-Encoding header"""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        token, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if token:
+            accepted[token.lower()] = quality
+    for encoding in ('br', 'gzip'):
+        if encoding in variants and accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+    return 'identity'
+
+
+app_shell = AppShell(SHELL_PATHS)
@@ -1,7 +1,29 @@
 from django.contrib import admin
-from django.forms import ModelForm
+from datetime import date
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Max, Min, Q, QuerySet
+from django.utils import timezone
+from django.utils.text import smart_split, unescape_string_literal
+from django.forms import ModelForm, TimeField, ValidationError
 from django.forms.widgets import DateInput
-from .models import Ward, Meeting
+from .conflicts import describe, meeting_conflicts
+from .models import Job, Ward, Meeting
+from .pagination import EstimatedCountPaginator
+from .times import parse_meeting_time
+
+class MeetingTimeField(TimeField):
+    """Time field accepting the same spellings as the API ("5:00 PM", "5pm", "17:00")"""
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        parsed = parse_meeting_time(value)
+        if parsed is None:
+            raise ValidationError(self.error_messages['invalid'], code='invalid')
+        return parsed
+
+# Admin time inputs parse like the API
+TIME_OVERRIDES = {models.TimeField: {'form_class': MeetingTimeField}}
 
 class MeetingForm(ModelForm):
     """Custom form for Meeting with improved date widget"""
@@ -16,9 +38,87 @@ class MeetingForm(ModelForm):
             }),
         }
 
+    def clean(self):
+        """Reject a meeting that double-books its venue"""
+        cleaned_data = super().clean()
+        ward = cleaned_data.get('ward')
+        meeting_date = cleaned_data.get('meeting_date')
+        if ward and meeting_date and not cleaned_data.get('is_cancelled'):
+            clashes = meeting_conflicts(
+                ward, meeting_date, cleaned_data.get('meeting_time'), cleaned_data.get('venue', '')
+            )
+            if clashes:
+                raise ValidationError([describe(existing) for existing in clashes])
+        return cleaned_data
+
+class WardListFilter(admin.RelatedFieldListFilter):
+    """
+    Ward filter that lists wards only while there are few enough to render;
+    beyond ``max_choices`` the sidebar list is left out, and meetings are
+    filtered by ward through search or ``?ward__id__exact=``
+    """
+    max_choices = 200
+
+    def field_choices(self, field, request, model_admin):
+        if Ward.objects.count() > self.max_choices:
+            return []
+        return super().field_choices(field, request, model_admin)
+
+    def has_output(self):
+        # A filter without output is dropped, so keep it while it is in use
+        return bool(self.lookup_choices) or self.lookup_val is not None
+
+class DateHierarchyQuerySet(QuerySet):
+    """
+    QuerySet serving the admin date hierarchy from the date index instead of
+    truncating the date of every row in SQL: years with one probe per year,
+    months and days from the distinct dates
+    """
+    def aggregate(self, *args, **kwargs):
+        # The hierarchy asks for Min() and Max() of the date in one query,
+        # which SQLite cannot answer from an index; read each bound with an
+        # ordered LIMIT 1 query instead
+        if args or not kwargs or not all(
+            type(aggregate) in (Min, Max) and aggregate.filter is None
+            and isinstance(aggregate.source_expressions[0], F)
+            for aggregate in kwargs.values()
+        ):
+            return super().aggregate(*args, **kwargs)
+        result = {}
+        for name, aggregate in kwargs.items():
+            field_name = aggregate.source_expressions[0].name
+            ordering = field_name if isinstance(aggregate, Min) else f'-{field_name}'
+            result[name] = self.filter(**{f'{field_name}__isnull': False}).order_by(
+                ordering
+            ).values_list(field_name, flat=True).first()
+        return result
+
+    def dates(self, field_name, kind, order='ASC'):
+        if kind == 'year':
+            bounds = self.aggregate(first=Min(field_name), last=Max(field_name))
+            if bounds['first'] is None:
+                return []
+            found = [
+                start for start, end in years(bounds['first'], bounds['last'])
+                if self.filter(**{f'{field_name}__gte': start, f'{field_name}__lt': end}).exists()
+            ]
+        elif kind in ('month', 'day'):
+            days = self.order_by(field_name).values_list(field_name, flat=True).distinct()
+            found = sorted({day.replace(day=1) if kind == 'month' else day for day in days})
+        else:
+            return super().dates(field_name, kind, order)
+        return found[::-1] if order == 'DESC' else found
+
+
+def years(first, last):
+    """``(start, end)`` of every year from ``first`` to ``last``"""
+    return [(date(year, 1, 1), date(year + 1, 1, 1)) for year in range(first.year, last.year + 1)]
+
 @admin.register(Ward)
 class WardAdmin(admin.ModelAdmin):
+    formfield_overrides = TIME_OVERRIDES
     list_display = ['ward_name', 'meeting_day', 'meeting_time', 'venue', 'ward_admin']
+    list_select_related = ['ward_admin']
     list_filter = ['meeting_day', 'created_at']
     search_fields = ['ward_name', 'venue']
     fieldsets = (
@@ -36,9 +136,18 @@ class WardAdmin(admin.ModelAdmin):
 @admin.register(Meeting)
 class MeetingAdmin(admin.ModelAdmin):
     form = MeetingForm
+    formfield_overrides = TIME_OVERRIDES
     list_display = ['ward', 'meeting_date', 'meeting_time', 'is_cancelled']
-    list_filter = ['ward', 'meeting_date', 'is_cancelled']
+    list_select_related = ['ward']
+    list_filter = [('ward', WardListFilter), 'is_cancelled']
+    date_hierarchy = 'meeting_date'
     search_fields = ['ward__ward_name', 'venue']
+    autocomplete_fields = ['ward']
+    # Served by the (meeting_date, id) index, with no extra sort for the pk
+    ordering = ['-meeting_date', '-id']
+    # Large tables: estimated page counts and no second, unfiltered COUNT(*)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     fieldsets = (
         ('Meeting Details', {
             'fields': ('ward', 'meeting_date', 'meeting_time', 'venue'),
@@ -52,3 +161,45 @@ class MeetingAdmin(admin.ModelAdmin):
             'fields': ('is_cancelled',)
         }),
     )
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        return DateHierarchyQuerySet(self.model, query=queryset.query, using=queryset.db)
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Search like ``search_fields`` does, but look ward names up in the
+        (small) ward table first and filter meetings by the matching ids, so
+        the meetings query needs no join
+        """
+        conditions = Q()
+        for bit in smart_split(search_term):
+            if bit.startswith(('"', "'")) and bit[0] == bit[-1]:
+                bit = unescape_string_literal(bit)
+            ward_ids = Ward.objects.filter(ward_name__icontains=bit).values('id')
+            conditions &= Q(ward_id__in=ward_ids) | Q(venue__icontains=bit)
+        return queryset.filter(conditions), False
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'task', 'status', 'attempts', 'run_after', 'finished_at']
+    list_filter = ['status', 'task']
+    search_fields = ['idempotency_key']
+    readonly_fields = ['locked_by', 'locked_at', 'last_error', 'created_at', 'finished_at']
+    ordering = ['-id']
+    actions = ['retry_jobs']
+
+    @admin.action(description='Retry selected failed jobs')
+    def retry_jobs(self, request, queryset):
+        retried = 0
+        for job in queryset.filter(status=Job.FAILED):
+            try:
+                # Fails when a job with the same idempotency key is already queued
+                with transaction.atomic():
+                    Job.objects.filter(pk=job.pk).update(
+                        status=Job.QUEUED, attempts=0, run_after=timezone.now(), finished_at=None,
+                    )
+                retried += 1
+            except IntegrityError:
+                pass
+        self.message_user(request, f'{retried} job(s) queued again.')
@@ -1,5 +1,10 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 class WardsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'wards'
+
+    def ready(self):
+        from . import signals, tasks  # noqa: F401
+        post_migrate.connect(signals.repair_search_index, sender=self)
@@ -0,0 +1,205 @@
+"""
+Async versions of the read-heavy ward endpoints, for ASGI deployments.
+
+When ``WARDS_ASYNC_VIEWS`` is on (``pdp_calendar.asgi`` turns it on),
+``GET``/``HEAD`` on the ward list, ward detail, meetings, occurrences,
+summary and calendar feeds are answered by these coroutines using the async
+ORM, the async cache API and the same validators, cache keys and serializers
+as ``WardViewSet``. Every other method is handed to the viewset in a thread, so
+writes keep DRF's authentication, permissions and validation.
+
+JSON is always rendered with DRF's ``JSONRenderer``: the browsable API is
+only available on the sync views, and requests for a columnar format (see
+``wards.columnar``) are handed to them too.
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from . import conditional, feeds, materialize, summaries
+from .cache import LIST_SCOPE, response_cache
+from .models import Meeting, Ward
+from .pagination import MeetingKeysetPagination
+from .recurrence import Occurrence, expand_occurrences
+from .renderers import ICalendarRenderer, requests_columnar
+from .serializers import MeetingSerializer, OccurrenceSerializer
+from .views import (
+    WardViewSet, feed_querysets, filter_meetings, parse_date_range, parse_list_param, parse_time_range,
+    summary_response,
+)
+
+
+def read_async(async_view, sync_view):
+    """
+    Route ``GET``/``HEAD`` to ``async_view`` and any other method, or a
+    columnar format, to the sync DRF ``sync_view``
+    """
+    async def view(request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD') and not requests_columnar(request):
+            try:
+                response = await async_view(request, *args, **kwargs)
+            except APIException as exc:
+                response = error_response(exc)
+            # The format follows Accept, as on the viewset
+            patch_vary_headers(response, ['Accept'])
+            return response
+        return await sync_to_async(sync_view)(request, *args, **kwargs)
+    # Like DRF views: session authentication enforces CSRF itself
+    view.csrf_exempt = True
+    return view
+
+
+def json_response(data, status=200):
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+
+
+def error_response(exc):
+    data = exc.detail if isinstance(exc.detail, (dict, list)) else {'detail': exc.detail}
+    return json_response(data, status=exc.status_code)
+
+
+async def cached(endpoint, scope, request, produce):
+    """Serialized data from the response cache, or from ``produce()``"""
+    key = await response_cache.amake_key(endpoint, scope, request.GET)
+    data = await response_cache.aget(key)
+    if data is None:
+        data = await produce()
+        await response_cache.aset(key, data)
+    return data
+
+
+async def conditional_json(endpoint, scope, request, ward_id, produce):
+    """
+    ``conditional_response`` and ``cached_response`` for coroutines: 304 when
+    the client's copy is current, otherwise the JSON of ``produce()``, cached
+    under its ETag, with validators
+    """
+    evaluated = await conditional.aevaluate(request, endpoint, ward_id)
+    if evaluated is None:
+        if ward_id is not None:
+            raise NotFound()
+        return json_response(await cached(endpoint, scope, request, produce))
+    etag, last_modified, not_modified = evaluated
+    if not_modified is not None:
+        return not_modified
+
+    key = await response_cache.amake_key(endpoint, scope, request.GET, etag)
+    data = await response_cache.aget(key)
+    if data is None:
+        data = await produce()
+        if await conditional.acurrent_etag(request, endpoint, ward_id) != etag:
+            # Written to while it was built: the body matches neither ETag
+            return json_response(data)
+        await response_cache.aset(key, data)
+    response = json_response(data)
+    conditional.set_validators(response, etag, last_modified)
+    return response
+
+
+def viewset(request, action):
+    """A ``WardViewSet`` set up for ``action``, for its queryset and serializer logic"""
+    view = WardViewSet(action_map={'get': action}, args=(), kwargs={}, format_kwarg=None)
+    view.request = view.initialize_request(request)
+    return view
+
+
+async def ward_list(request):
+    view = viewset(request, 'list')
+
+    async def produce():
+        wards = view.filter_queryset(view.get_queryset())
+        # The page count and slice go through one thread hop together
+        page = await sync_to_async(view.paginate_queryset)(wards)
+        if page is None:
+            return view.get_serializer([ward async for ward in wards], many=True).data
+        return view.get_paginated_response(view.get_serializer(page, many=True).data).data
+
+    return await conditional_json('list', LIST_SCOPE, request, None, produce)
+
+
+async def ward_detail(request, pk):
+    view = viewset(request, 'retrieve')
+
+    async def produce():
+        wards = view.get_queryset()
+        if view.includes_meetings():
+            wards = wards.prefetch_related('meetings')
+        try:
+            ward = await wards.aget(pk=pk)
+        except Ward.DoesNotExist:
+            raise NotFound()
+        return view.get_serializer(ward).data
+
+    return await conditional_json('retrieve', str(pk), request, pk, produce)
+
+
+async def ward_meetings(request, pk):
+    async def produce():
+        paginator = MeetingKeysetPagination()
+        meetings = filter_meetings(Meeting.objects.filter(ward_id=pk), request.GET)
+        page = paginator.page_queryset(meetings, Request(request))
+        paginator.set_page([meeting async for meeting in page])
+        return paginator.get_paginated_response(MeetingSerializer(paginator.page, many=True).data).data
+
+    return await conditional_json('meetings', str(pk), request, pk, produce)
+
+
+async def occurrences(request):
+    async def produce():
+        from_date, to_date = parse_date_range(request.GET)
+        ward_ids = parse_list_param(request.GET, 'ward')
+        time_from, time_to = parse_time_range(request.GET)
+        if await materialize.acovers(from_date, to_date):
+            rows = materialize.rows(from_date, to_date, ward_ids, time_from, time_to)
+            found = [Occurrence(*row) async for row in rows]
+        else:
+            wards, meetings = materialize.occurrence_querysets(from_date, to_date, ward_ids)
+            wards = [ward async for ward in wards]
+            meetings = [meeting async for meeting in meetings]
+            found = materialize.select_times(
+                expand_occurrences(wards, meetings, from_date, to_date), time_from, time_to
+            )
+        return OccurrenceSerializer(found, many=True).data
+
+    return json_response(await cached('occurrences', LIST_SCOPE, request, produce))
+
+
+async def summary(request):
+    return summary_response(request, await summaries.apayload())
+
+
+async def calendar(request, pk=None):
+    evaluated = await conditional.aevaluate(request, 'calendar', pk)
+    if evaluated is None and pk is not None:
+        raise NotFound()
+    if evaluated is not None and evaluated[2] is not None:
+        return evaluated[2]
+
+    key = feeds.cache_key(evaluated[0]) if evaluated else None
+    content = await response_cache.aget(key) if key else None
+    if content is None:
+        wards, meetings = feed_querysets(pk)
+        wards = [ward async for ward in wards]
+        meetings = [meeting async for meeting in meetings]
+        content = feeds.render_feed(wards, meetings, feeds.feed_name(wards, pk))
+        if key:
+            await response_cache.aset(key, content)
+
+    response = HttpResponse(content, content_type='text/calendar; charset=utf-8')
+    if evaluated:
+        conditional.set_validators(response, evaluated[0], evaluated[1])
+    return response
+
+
+ward_list_view = read_async(ward_list, WardViewSet.as_view({'get': 'list', 'post': 'create'}))
+ward_detail_view = read_async(ward_detail, WardViewSet.as_view({
+    'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy',
+}))
+ward_meetings_view = read_async(ward_meetings, WardViewSet.as_view({'get': 'meetings'}))
+summary_view = read_async(summary, WardViewSet.as_view({'get': 'summary'}))
+occurrences_view = read_async(occurrences, WardViewSet.as_view({'get': 'occurrences'}))
+calendar_view = read_async(
+    calendar, WardViewSet.as_view({'get': 'calendar'}, renderer_classes=[ICalendarRenderer])
+)
@@ -0,0 +1,456 @@
+"""
+Benchmark harness for the wards API.
+
+``seed`` generates a reproducible synthetic dataset (N wards with M years of
+meeting history) and ``run_scenarios`` replays fixed request scenarios
+in-process through the Django test client, recording latency percentiles,
+throughput, SQL query counts and peak RSS for each. Results are plain JSON so
+runs can be diffed between releases with ``compare``.
+
+``measure_formats`` compares response size and CPU time of the JSON
+renderer with the columnar formats (see ``wards.columnar``) on the list
+endpoints.
+
+``measure_startup`` times cold starts in fresh interpreters (importing the
+WSGI application, then serving a first request) and the per-request overhead
+of the middleware stack on a trivial endpoint.
+
+``load_test`` instead drives a running server over HTTP from concurrent
+keep-alive clients, to measure the serving setup (gunicorn workers, database
+connections) rather than the code path.
+"""
+import http.client
+import io
+import json
+import math
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+from datetime import date, timedelta
+from urllib.parse import urlsplit
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from .cache import response_cache
+from .models import Meeting, Ward
+from .recurrence import schedule_dates
+from .renderers import COLUMNAR_RENDERERS
+from .signals import wards_changed
+from .times import parse_meeting_time
+
+WARD_PREFIX = 'bench-'
+ADMIN_USERNAME = 'bench-admin'
+
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+TIMES = [
+    parse_meeting_time(value)
+    for value in ('9:00 AM', '10:00 AM', '2:00 PM', '4:00 PM', '4:30 PM', '5:00 PM', '6:00 PM')
+]
+
+
+def seed(wards=1000, years=3, cancel_rate=0.05, random_seed=42, batch_size=5000, log=None):
+    """
+    Create ``wards`` synthetic wards, each with a meeting on every scheduled
+    date of the last ``years`` years. Returns ``(wards, meetings)`` created.
+    """
+    rng = random.Random(random_seed)
+    today = date.today()
+    first = today - timedelta(days=365 * years)
+    venues = [f'Benchmark Hall {number}' for number in range(max(wards // 4, 1))]
+
+    new_wards = []
+    for number in range(1, wards + 1):
+        start = first + timedelta(days=rng.randrange(14))
+        new_wards.append(Ward(
+            id=f'{WARD_PREFIX}{number}',
+            ward_name=f'Benchmark Ward {number}',
+            meeting_day=DAYS[start.weekday()],
+            meeting_time=rng.choice(TIMES),
+            venue=rng.choice(venues),
+            frequency_weeks=rng.choice([1, 2, 2, 2, 4]),
+            start_date=start,
+        ))
+    Ward.objects.bulk_create(new_wards, batch_size=batch_size, ignore_conflicts=True)
+
+    meeting_count = 0
+    batch = []
+    for ward in new_wards:
+        for meeting_date in schedule_dates(ward.start_date, ward.frequency_weeks, first, today):
+            batch.append(Meeting(
+                ward_id=ward.id,
+                meeting_date=meeting_date,
+                meeting_time=ward.meeting_time,
+                venue=ward.venue,
+                agenda='Quarterly review and member updates' if rng.random() < 0.3 else None,
+                is_cancelled=rng.random() < cancel_rate,
+            ))
+            if len(batch) >= batch_size:
+                meeting_count += _flush(batch, batch_size)
+                batch = []
+                if log:
+                    log(f'{meeting_count} meetings written')
+    meeting_count += _flush(batch, batch_size)
+
+    wards_changed(ward.id for ward in new_wards)
+    return len(new_wards), meeting_count
+
+
+def _flush(batch, batch_size):
+    Meeting.objects.bulk_create(batch, batch_size=batch_size, ignore_conflicts=True)
+    return len(batch)
+
+
+def clear():
+    """Delete every synthetic ward (meetings cascade)"""
+    ward_ids = list(Ward.objects.filter(id__startswith=WARD_PREFIX).values_list('id', flat=True))
+    Ward.objects.filter(id__in=ward_ids).delete()
+    User.objects.filter(username=ADMIN_USERNAME).delete()
+    response_cache.invalidate_all()
+    return len(ward_ids)
+
+
+def default_scenarios():
+    """Return ``(name, path, needs_admin)`` tuples exercising the hot endpoints"""
+    ward = Ward.objects.order_by('id').values_list('id', flat=True).first() or 'ward-1'
+    today = date.today()
+    next_quarter = today + timedelta(days=90)
+    month = today.replace(day=1)
+    next_month = (month + timedelta(days=31)).replace(day=1)
+    return [
+        ('ward_list', '/api/wards/', False),
+        ('ward_list_slim', '/api/wards/?fields=id,ward_name,start_date,frequency_weeks', False),
+        ('ward_summary', '/api/wards/summary/', False),
+        ('ward_retrieve', f'/api/wards/{ward}/', False),
+        ('ward_meetings', f'/api/wards/{ward}/meetings/', False),
+        ('ward_meetings_next_10', f'/api/wards/{ward}/meetings/?from={today}&ordering=meeting_date&limit=10', False),
+        ('occurrences_quarter', f'/api/wards/occurrences/?from={today}&to={next_quarter}', False),
+        ('occurrences_ward_year', f'/api/wards/occurrences/?ward={ward}&to={today + timedelta(days=365)}', False),
+        ('admin_meeting_changelist', '/admin/wards/meeting/', True),
+        ('admin_meeting_search', '/admin/wards/meeting/?q=Benchmark', True),
+        ('admin_meeting_ward', f'/admin/wards/meeting/?ward__id__exact={ward}', True),
+        ('admin_meeting_month', f'/admin/wards/meeting/?meeting_date__gte={month}&meeting_date__lt={next_month}', True),
+        ('admin_meeting_add', '/admin/wards/meeting/add/', True),
+    ]
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values), max(1, math.ceil(fraction * len(sorted_values)))) - 1
+    return sorted_values[index]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MiB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def run_scenario(client, path, iterations, warmup, cold_cache):
+    for _ in range(warmup):
+        client.get(path)
+
+    latencies = []
+    queries = []
+    status = None
+    started = time.perf_counter()
+    for _ in range(iterations):
+        if cold_cache:
+            response_cache.invalidate_all()
+        with CaptureQueriesContext(connection) as captured:
+            began = time.perf_counter()
+            response = client.get(path)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            latencies.append((time.perf_counter() - began) * 1000)
+        queries.append(len(captured))
+        status = response.status_code
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'path': path,
+        'status': status,
+        'iterations': iterations,
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'mean_ms': round(sum(latencies) / len(latencies), 3),
+        'throughput_rps': round(iterations / elapsed, 1) if elapsed else None,
+        'queries': max(queries),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def run_scenarios(iterations=50, warmup=3, cold_cache=True, only=None, log=None):
+    """Run the scenarios and return a JSON-serializable report"""
+    client = Client()
+    admin = None
+    results = {}
+    with override_settings(ALLOWED_HOSTS=['testserver']):
+        for name, path, needs_admin in default_scenarios():
+            if only and name not in only:
+                continue
+            if needs_admin and admin is None:
+                admin, _ = User.objects.get_or_create(
+                    username=ADMIN_USERNAME, defaults={'is_staff': True, 'is_superuser': True}
+                )
+                client.force_login(admin)
+            results[name] = run_scenario(client, path, iterations, warmup, cold_cache)
+            if log:
+                log(name, results[name])
+
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'database': connection.vendor,
+            'wards': Ward.objects.count(),
+            'meetings': Meeting.objects.count(),
+            'iterations': iterations,
+            'cold_cache': cold_cache,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        },
+        'scenarios': results,
+    }
+
+
+# Scenarios of ``default_scenarios`` whose responses are lists
+FORMAT_SCENARIOS = ('ward_list', 'ward_meetings', 'occurrences_quarter', 'occurrences_ward_year')
+
+
+def measure_formats(iterations=20, only=None, log=None):
+    """
+    Request each list scenario in JSON and in every columnar format, with a
+    cold response cache, recording response bytes and the p50 CPU time of
+    this process per request. Returns a JSON-serializable report.
+    """
+    media_types = {'json': 'application/json'}
+    media_types.update((renderer.format, renderer.media_type) for renderer in COLUMNAR_RENDERERS)
+    client = Client()
+    results = {}
+    with override_settings(ALLOWED_HOSTS=['testserver']):
+        for name, path, _ in default_scenarios():
+            if name not in FORMAT_SCENARIOS or (only and name not in only):
+                continue
+            results[name] = {'path': path}
+            for output, media_type in media_types.items():
+                client.get(path, HTTP_ACCEPT=media_type)
+                timings = []
+                for _ in range(iterations):
+                    response_cache.invalidate_all()
+                    began = time.process_time()
+                    response = client.get(path, HTTP_ACCEPT=media_type)
+                    timings.append((time.process_time() - began) * 1000)
+                timings.sort()
+                results[name][output] = {
+                    'status': response.status_code,
+                    'bytes': len(response.content),
+                    'cpu_ms': round(percentile(timings, 0.50), 3),
+                }
+                if log:
+                    log(name, output, results[name][output])
+
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'database': connection.vendor,
+            'wards': Ward.objects.count(),
+            'meetings': Meeting.objects.count(),
+            'iterations': iterations,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        },
+        'formats': results,
+        'scenarios': {},
+    }
+
+
+# Run in a fresh interpreter by ``measure_startup``: prints import and first
+# request times as JSON
+STARTUP_SCRIPT = '''
+import io, json, sys, time
+started = time.perf_counter()
+from pdp_calendar.wsgi import application
+imported = time.perf_counter()
+statuses = []
+environ = {
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': sys.argv[1], 'QUERY_STRING': '',
+    'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost',
+    'wsgi.input': io.BytesIO(), 'wsgi.url_scheme': 'http', 'wsgi.errors': sys.stderr,
+}
+b''.join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+served = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'first_request_ms': (served - imported) * 1000,
+    'status': int(statuses[0].split()[0]),
+}))
+'''
+
+
+def wsgi_environ(path, cookies=None):
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost',
+        'wsgi.input': io.BytesIO(), 'wsgi.url_scheme': 'http', 'wsgi.errors': sys.stderr,
+    }
+    if cookies:
+        environ['HTTP_COOKIE'] = '; '.join(f'{name}={value}' for name, value in cookies.items())
+    return environ
+
+
+def request_overhead(path='/api/', iterations=2000, cookies=None):
+    """p50/p95 in microseconds of serving ``path`` through the full WSGI handler"""
+    handler = WSGIHandler()
+    latencies = []
+    with override_settings(ALLOWED_HOSTS=['localhost']):
+        for _ in range(iterations):
+            began = time.perf_counter()
+            b''.join(handler(wsgi_environ(path, cookies), lambda status, headers, exc_info=None: None))
+            latencies.append((time.perf_counter() - began) * 1e6)
+    latencies.sort()
+    return {'p50_us': round(percentile(latencies, 0.50), 1), 'p95_us': round(percentile(latencies, 0.95), 1)}
+
+
+def measure_startup(runs=5, path='/api/wards/', overhead_path='/api/', log=None):
+    """
+    Time ``runs`` cold starts, each in a new interpreter, and the overhead of
+    the middleware stack for anonymous requests and requests carrying a
+    session cookie. Returns a JSON-serializable report.
+    """
+    env = dict(os.environ, ALLOWED_HOSTS='localhost')
+    starts = []
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, '-c', STARTUP_SCRIPT, path],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+        )
+        starts.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+        if log:
+            log('cold start', starts[-1])
+    imports = sorted(start['import_ms'] for start in starts)
+    firsts = sorted(start['first_request_ms'] for start in starts)
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'database': connection.vendor,
+            'runs': runs,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        },
+        'startup': {
+            'path': path,
+            'status': starts[-1]['status'],
+            'import_ms': round(percentile(imports, 0.50), 1),
+            'first_request_ms': round(percentile(firsts, 0.50), 1),
+            'total_ms': round(percentile(imports, 0.50) + percentile(firsts, 0.50), 1),
+        },
+        'overhead': {
+            'path': overhead_path,
+            'anonymous': request_overhead(overhead_path),
+            'session': request_overhead(overhead_path, cookies={settings.SESSION_COOKIE_NAME: 'benchmark'}),
+        },
+        'scenarios': {},
+    }
+
+
+def compare(baseline, current, threshold=0.2):
+    """
+    Compare two reports. Returns ``(name, metric, before, after, regressed)``
+    rows for p95 latency and query counts, and for startup times.
+    """
+    rows = []
+    for metric in ('import_ms', 'first_request_ms', 'total_ms'):
+        old = baseline.get('startup', {}).get(metric)
+        new = current.get('startup', {}).get(metric)
+        if old is not None and new is not None:
+            rows.append(('startup', metric, old, new, new > old * (1 + threshold)))
+    for name in ('anonymous', 'session'):
+        old = baseline.get('overhead', {}).get(name, {}).get('p50_us')
+        new = current.get('overhead', {}).get(name, {}).get('p50_us')
+        if old is not None and new is not None:
+            rows.append((f'overhead_{name}', 'p50_us', old, new, new > old * (1 + threshold)))
+    for name, result in current['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name)
+        if not before:
+            continue
+        for metric in ('p95_ms', 'queries'):
+            old, new = before.get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            regressed = new > old * (1 + threshold) if metric == 'p95_ms' else new > old
+            rows.append((name, metric, old, new, regressed))
+    return rows
+
+
+def load_test(base_url, paths, concurrency=16, duration=30.0):
+    """
+    Request ``paths`` round-robin from ``concurrency`` threads against the
+    server at ``base_url`` for ``duration`` seconds. Returns throughput,
+    latency percentiles and the number of failed requests.
+    """
+    target = urlsplit(base_url)
+    connection_class = http.client.HTTPSConnection if target.scheme == 'https' else http.client.HTTPConnection
+    deadline = time.monotonic() + duration
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def client(offset):
+        connection = connection_class(target.netloc, timeout=30)
+        mine, failed = [], 0
+        index = offset
+        while time.monotonic() < deadline:
+            path = target.path.rstrip('/') + paths[index % len(paths)]
+            index += 1
+            began = time.perf_counter()
+            try:
+                connection.request('GET', path)
+                response = connection.getresponse()
+                response.read()
+                if response.status >= 400:
+                    failed += 1
+                    continue
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                connection.close()
+                connection = connection_class(target.netloc, timeout=30)
+                continue
+            mine.append((time.perf_counter() - began) * 1000)
+        connection.close()
+        with lock:
+            latencies.extend(mine)
+            errors.append(failed)
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=client, args=(number,)) for number in range(concurrency)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'url': base_url,
+        'concurrency': concurrency,
+        'duration_s': round(elapsed, 1),
+        'requests': len(latencies),
+        'errors': sum(errors),
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50), 3) if latencies else None,
+        'p95_ms': round(percentile(latencies, 0.95), 3) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99), 3) if latencies else None,
+    }
@@ -0,0 +1,167 @@
+"""
+Batch meeting writes for ``POST /api/wards/meetings/bulk/`` and
+``POST /api/wards/<id>/meetings/bulk/``.
+
+A batch is a list of create, update and cancel operations, validated field by
+field with ``MeetingOperationSerializer(many=True)`` and then resolved against
+the database with one query each for the addressed meetings, their wards and
+the (ward, date) slots involved. Venue conflicts are checked for the whole
+batch at once. If every operation holds up, the batch is written with one
+``bulk_create`` and one ``bulk_update`` in a single transaction; otherwise
+nothing is written and errors are reported per operation.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from . import conflicts, jobs
+from .models import Meeting, Ward
+from .recurrence import Occurrence
+from .signals import wards_changed
+
+MAX_OPERATIONS = 500
+
+# Meeting fields an operation may set
+FIELDS = ('meeting_date', 'meeting_time', 'venue', 'agenda', 'notes', 'is_cancelled')
+
+
+class BatchConflict(Exception):
+    """The database changed under the batch (a slot was taken concurrently)"""
+
+
+def resolve(operations, ward_id=None):
+    """
+    Work out the meeting each validated operation leaves behind. Returns
+    ``(changes, errors)``: ``changes`` holds ``(status, meeting, was_cancelled)``
+    per operation and ``errors`` an error dict per operation (empty when fine).
+    """
+    by_id = Meeting.objects.in_bulk({op['id'] for op in operations if 'id' in op})
+    if ward_id is not None:
+        by_id = {pk: meeting for pk, meeting in by_id.items() if meeting.ward_id == ward_id}
+
+    # Every (ward, date) slot an operation addresses or writes to
+    slots = {(op['ward'], op['meeting_date']) for op in operations if 'ward' in op and 'meeting_date' in op}
+    for op in operations:
+        if op.get('id') in by_id and 'meeting_date' in op:
+            slots.add((by_id[op['id']].ward_id, op['meeting_date']))
+    ward_ids = {ward for ward, _ in slots} | {meeting.ward_id for meeting in by_id.values()}
+    wards = Ward.objects.only('id', 'ward_name', 'meeting_time', 'venue').in_bulk(ward_ids)
+    by_slot = {}
+    if slots:
+        condition = Q()
+        for ward, meeting_date in slots:
+            condition |= Q(ward_id=ward, meeting_date=meeting_date)
+        by_slot = {(meeting.ward_id, meeting.meeting_date): meeting for meeting in Meeting.objects.filter(condition)}
+
+    changes, errors = [], []
+    written_ids, written_slots = set(), set()
+    for op in operations:
+        change, error = _resolve_one(op, by_id, by_slot, wards)
+        if change is not None:
+            meeting = change[1]
+            slot = (meeting.ward_id, meeting.meeting_date)
+            if (meeting.pk and meeting.pk in written_ids) or slot in written_slots:
+                change, error = None, {'non_field_errors': ['Another operation in this batch writes the same meeting.']}
+            else:
+                written_ids.add(meeting.pk)
+                written_slots.add(slot)
+        changes.append(change)
+        errors.append(error)
+
+    if not any(errors):
+        candidates = [
+            Occurrence(
+                meeting.ward_id, wards[meeting.ward_id].ward_name, meeting.meeting_date,
+                meeting.meeting_time, meeting.venue, meeting.is_cancelled, meeting_id=meeting.pk,
+            )
+            for _, meeting, _ in changes
+        ]
+        clashes = conflicts.batch_conflicts(candidates, replaced=written_ids - {None})
+        errors = [
+            {'conflicts': list(dict.fromkeys(conflicts.describe(existing) for existing in found))} if found else {}
+            for found in clashes
+        ]
+    return changes, errors
+
+
+def _resolve_one(op, by_id, by_slot, wards):
+    if 'id' in op:
+        meeting = by_id.get(op['id'])
+        if meeting is None:
+            return None, {'id': [f'Meeting {op["id"]} not found.']}
+    else:
+        meeting = by_slot.get((op['ward'], op['meeting_date']))
+
+    if op['op'] == 'create':
+        ward = wards.get(op['ward'])
+        if ward is None:
+            return None, {'ward': [f'Unknown ward "{op["ward"]}".']}
+        if meeting is not None:
+            return None, {'meeting_date': [f'{ward.ward_name} already has a meeting on {op["meeting_date"]}.']}
+        meeting = Meeting(
+            ward_id=ward.id, meeting_date=op['meeting_date'],
+            meeting_time=op.get('meeting_time', ward.meeting_time), venue=op.get('venue') or ward.venue,
+            agenda=op.get('agenda'), notes=op.get('notes'), is_cancelled=op.get('is_cancelled', False),
+        )
+        return ('created', meeting, False), {}
+
+    if meeting is None and op['op'] == 'update':
+        return None, {'meeting_date': [f'No meeting of "{op["ward"]}" on {op["meeting_date"]}.']}
+    if meeting is None:
+        # Cancelling a scheduled date without a stored meeting stores a cancelled one
+        ward = wards.get(op['ward'])
+        if ward is None:
+            return None, {'ward': [f'Unknown ward "{op["ward"]}".']}
+        meeting = Meeting(
+            ward_id=ward.id, meeting_date=op['meeting_date'], meeting_time=ward.meeting_time,
+            venue=ward.venue, notes=op.get('notes'), is_cancelled=True,
+        )
+        return ('cancelled', meeting, False), {}
+
+    was_cancelled = meeting.is_cancelled
+    if op['op'] == 'cancel':
+        meeting.is_cancelled = True
+        if 'notes' in op:
+            meeting.notes = op['notes']
+        return ('cancelled', meeting, was_cancelled), {}
+
+    # Without an id, meeting_date addresses the meeting rather than moving it
+    for field in FIELDS:
+        if field in op and (field != 'meeting_date' or 'id' in op):
+            setattr(meeting, field, op[field])
+    occupant = by_slot.get((meeting.ward_id, meeting.meeting_date))
+    if occupant is not None and occupant.pk != meeting.pk:
+        return None, {'meeting_date': [f'There is already a meeting on {meeting.meeting_date}.']}
+    return ('updated', meeting, was_cancelled), {}
+
+
+def apply(operations, ward_id=None):
+    """
+    Resolve and write a batch. Returns ``(results, errors)``; when any
+    operation fails nothing is written and ``results`` is empty.
+    """
+    changes, errors = resolve(operations, ward_id)
+    if any(errors):
+        return [], errors
+
+    now = timezone.now()
+    created = [meeting for status, meeting, _ in changes if meeting.pk is None]
+    updated = [meeting for status, meeting, _ in changes if meeting.pk is not None]
+    for meeting in updated:
+        meeting.updated_at = now
+    try:
+        with transaction.atomic():
+            if created:
+                Meeting.objects.bulk_create(created)
+            if updated:
+                Meeting.objects.bulk_update(updated, FIELDS + ('updated_at',))
+    except IntegrityError as exc:
+        raise BatchConflict(str(exc)) from exc
+
+    wards_changed(meeting.ward_id for _, meeting, _ in changes)
+    cancelled = [meeting.pk for _, meeting, was_cancelled in changes if meeting.is_cancelled and not was_cancelled]
+    if cancelled:
+        jobs.defer('notify_cancellation', {'meeting_ids': cancelled})
+    return [
+        {'op': op['op'], 'status': status, 'ward': meeting.ward_id, 'meeting': meeting}
+        for op, (status, meeting, _) in zip(operations, changes)
+    ], errors
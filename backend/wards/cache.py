@@ -0,0 +1,182 @@
+"""
+Read-through response cache for the ward endpoints.
+
+Serialized response data is stored in the Django cache named by
+``WARDS_CACHE_ALIAS`` (local memory by default, Redis when ``REDIS_URL`` is
+set), keyed by endpoint, scope and query parameters. Every scope (one per
+ward, plus one for cross-ward endpoints such as the ward list) carries a
+generation counter that is part of the key; invalidating a ward bumps its own
+generation and the list generation, which makes exactly those entries
+unreachable without having to enumerate keys.
+
+Responses with conditional GET validators are also keyed by their ETag, so a
+cached body is only served under the ETag of the data it was built from,
+even when another process wrote the data without evicting this cache.
+"""
+import hashlib
+import threading
+from functools import partial, wraps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+KEY_PREFIX = 'wards:response'
+
+# Scope shared by every endpoint that reads more than one ward
+LIST_SCOPE = '*'
+
+# Generation included in every key, bumped to drop the whole cache
+EPOCH_SCOPE = 'epoch'
+
+
+class ResponseCache:
+    """Generation-keyed cache of serialized responses with hit/miss counters"""
+
+    def __init__(self, alias=None, timeout=None):
+        self.alias = alias
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def backend(self):
+        return caches[self.alias or getattr(settings, 'WARDS_CACHE_ALIAS', 'default')]
+
+    def get_timeout(self):
+        if self.timeout is not None:
+            return self.timeout
+        return getattr(settings, 'WARDS_CACHE_TIMEOUT', 300)
+
+    def generations(self, scope):
+        """Return the ``(epoch, scope)`` generation counters in one round trip"""
+        keys = [self._generation_key(EPOCH_SCOPE), self._generation_key(scope)]
+        values = self.backend.get_many(keys)
+        return values.get(keys[0], 0), values.get(keys[1], 0)
+
+    async def agenerations(self, scope):
+        keys = [self._generation_key(EPOCH_SCOPE), self._generation_key(scope)]
+        values = await self.backend.aget_many(keys)
+        return values.get(keys[0], 0), values.get(keys[1], 0)
+
+    def make_key(self, endpoint, scope, params, etag=None):
+        """
+        Build the cache key for an endpoint, scope and query parameters, and
+        the ETag of the response when it has one
+        """
+        return self._key(endpoint, scope, params, etag, self.generations(scope))
+
+    async def amake_key(self, endpoint, scope, params, etag=None):
+        return self._key(endpoint, scope, params, etag, await self.agenerations(scope))
+
+    def _key(self, endpoint, scope, params, etag, generations):
+        query = '&'.join(
+            f'{name}={value}' for name, values in sorted(params.lists()) for value in values
+        )
+        if etag is not None:
+            query = f'{query}|{etag}'
+        digest = hashlib.md5(query.encode('utf-8')).hexdigest()
+        epoch, generation = generations
+        return f'{KEY_PREFIX}:{endpoint}:{scope}:{epoch}.{generation}:{digest}'
+
+    def get(self, key):
+        return self._count(self.backend.get(key))
+
+    async def aget(self, key):
+        return self._count(await self.backend.aget(key))
+
+    def _count(self, data):
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return data
+
+    def set(self, key, data):
+        self.backend.set(key, data, self.get_timeout())
+
+    async def aset(self, key, data):
+        await self.backend.aset(key, data, self.get_timeout())
+
+    def invalidate(self, *ward_ids):
+        """Evict the entries of the given wards and every list entry"""
+        for scope in {str(ward_id) for ward_id in ward_ids} | {LIST_SCOPE}:
+            self._bump(scope)
+
+    def invalidate_on_commit(self, *ward_ids, using=None):
+        """
+        ``invalidate`` once the current transaction commits (at once outside
+        one). Evicting earlier lets a request that still sees the old rows
+        cache them under the new generation.
+        """
+        transaction.on_commit(partial(self.invalidate, *ward_ids), using=using)
+
+    def invalidate_all(self):
+        """Evict every entry, e.g. after bulk writes that bypass model signals"""
+        self._bump(EPOCH_SCOPE)
+
+    def _generation_key(self, scope):
+        return f'{KEY_PREFIX}:gen:{scope}'
+
+    def _bump(self, scope):
+        key = self._generation_key(scope)
+        # ``add`` is a no-op when the counter exists, so ``incr`` normally succeeds
+        self.backend.add(key, 0, None)
+        try:
+            self.backend.incr(key)
+        except ValueError:
+            # The counter was evicted between ``add`` and ``incr``
+            self.backend.set(key, 1, None)
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            'backend': self.backend.__class__.__name__,
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / total, 4) if total else None,
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+response_cache = ResponseCache()
+
+
+def cached_response(endpoint, per_ward=False):
+    """
+    Cache successful responses of a viewset action.
+
+    ``per_ward`` actions are scoped to the ``pk`` URL argument; everything
+    else is scoped to the list. Data built for the columnar renderers is
+    cached apart from serializer data. Under ``conditional_response``,
+    entries are also keyed by the ETag it computed (``request.etag``), and a
+    body built while the data changed is neither cached nor given that ETag.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            scope = str(kwargs.get('pk')) if per_ward else LIST_SCOPE
+            name = f'{endpoint}.columnar' if getattr(request.accepted_renderer, 'columnar', False) else endpoint
+            key = response_cache.make_key(name, scope, request.query_params, getattr(request, 'etag', None))
+            data = response_cache.get(key)
+            if data is not None:
+                return Response(data)
+            response = method(view, request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            if getattr(request, 'etag_is_current', lambda: True)():
+                response_cache.set(key, response.data)
+            else:
+                # Written to while it was built: the body matches neither ETag
+                request.etag = None
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,105 @@
+"""
+Columnar representation of ward, meeting and occurrence lists.
+
+Rows are read with ``.values_list()`` into a ``Table`` and sent as one array
+per column rather than one object per row, so keys are not repeated on every
+row. Repetitive strings (venues, ward names) are interned: their column holds
+indexes into a table of distinct values sent once. Values are converted a
+whole column at a time, without model instances or serializer fields, but
+to the values the serializers give: an unknown meeting time is null, as DRF
+renders a null attribute without calling its field.
+
+A list of three meetings looks like::
+
+    {"count": 3,
+     "columns": {"id": [7, 8, 9],
+                 "meeting_date": ["2026-01-05", "2026-01-12", "2026-01-19"],
+                 "venue": [0, 0, 1], ...},
+     "venues": ["Civic Centre", "Library"]}
+
+``ColumnarJSONRenderer`` and ``MessagePackRenderer`` (see ``wards.renderers``)
+encode tables this way and pass any other data through unchanged.
+"""
+from datetime import date, datetime, time
+from django.utils import timezone
+from .serializers import MeetingSerializer, MeetingTimeField, OccurrenceSerializer, WardSerializer
+from .times import format_meeting_time
+
+WARD_COLUMNS = tuple(field for field in WardSerializer.Meta.fields if field != 'meetings')
+MEETING_COLUMNS = tuple(MeetingSerializer.Meta.fields)
+OCCURRENCE_COLUMNS = tuple(OccurrenceSerializer().fields)
+
+# Columns that the serializers render with ``MeetingTimeField``
+TIME_COLUMNS = {
+    name for serializer in (WardSerializer, MeetingSerializer, OccurrenceSerializer)
+    for name, field in serializer().fields.items() if isinstance(field, MeetingTimeField)
+}
+
+# Interned columns and the key of their table of distinct values
+INTERNED = {'venue': 'venues', 'ward_name': 'ward_names'}
+
+
+class Table:
+    """
+    Rows of ``columns`` as tuples, plus nested tables (e.g. the meetings of
+    a page of wards) sent under their own keys
+    """
+
+    def __init__(self, columns, rows, children=None):
+        self.columns = tuple(columns)
+        self.rows = rows if isinstance(rows, list) else list(rows)
+        self.children = children or {}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def encode(self):
+        data = {}
+        interned = {}
+        values = zip(*self.rows) if self.rows else [()] * len(self.columns)
+        for name, column in zip(self.columns, values):
+            if name in INTERNED:
+                index = {}
+                data[name] = [index.setdefault(value, len(index)) for value in column]
+                interned[INTERNED[name]] = list(index)
+            elif name in TIME_COLUMNS:
+                # By name, as a column of unknown times has no value to tell its type by
+                data[name] = [None if value is None else format_meeting_time(value) for value in column]
+            else:
+                data[name] = encode_column(column)
+        encoded = {'count': len(self.rows), 'columns': data, **interned}
+        for name, child in self.children.items():
+            encoded[name] = child.encode()
+        return encoded
+
+
+def encode_column(column):
+    """JSON values of a column, converted as its first non-null value requires"""
+    sample = next((value for value in column if value is not None), None)
+    if isinstance(sample, datetime):
+        convert = _datetime
+    elif isinstance(sample, date):
+        convert = date.isoformat
+    elif isinstance(sample, time):
+        convert = format_meeting_time
+    else:
+        return list(column)
+    return [None if value is None else convert(value) for value in column]
+
+
+def _datetime(value):
+    # As DRF's DateTimeField renders it
+    value = timezone.localtime(value).isoformat() if timezone.is_aware(value) else value.isoformat()
+    return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+
+def encode(data):
+    """
+    ``data`` with a ``Table`` in it, at the top or as a value of the top level
+    dict (e.g. a paginated response's ``results``), in its columnar form
+    """
+    if isinstance(data, Table):
+        return data.encode()
+    if isinstance(data, dict) and any(isinstance(value, Table) for value in data.values()):
+        return {key: value.encode() if isinstance(value, Table) else value for key, value in data.items()}
+    return data
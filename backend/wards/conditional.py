@@ -0,0 +1,156 @@
+"""
+Conditional GET support for the ward endpoints.
+
+Validators are computed from ``Max('updated_at')`` and row counts of the
+wards and meetings behind a response, which are cheap aggregate queries, so a
+``304 Not Modified`` is answered before anything is serialized (or even
+looked up in the response cache). Deletions do not move ``updated_at``, so
+row counts and the latest ``Tombstone.deleted_at`` are part of the validators
+too.
+"""
+import hashlib
+from datetime import date
+from functools import wraps
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from .models import Meeting, Tombstone, Ward
+
+
+def validators(ward_id=None):
+    """
+    Return ``(fingerprint, last_modified)`` for one ward and its meetings,
+    or for every ward when ``ward_id`` is None. ``None`` means no such ward.
+    """
+    wards, meetings, tombstones = _querysets(ward_id)
+    ward_stats = wards.aggregate(last=Max('updated_at'), count=Count('pk'))
+    if not ward_stats['count']:
+        return None
+    meeting_stats = meetings.aggregate(last=Max('updated_at'), count=Count('pk'))
+    deleted = tombstones.aggregate(last=Max('deleted_at'))['last']
+    return _fingerprint(ward_stats, meeting_stats, deleted)
+
+
+async def avalidators(ward_id=None):
+    """Async version of ``validators``"""
+    wards, meetings, tombstones = _querysets(ward_id)
+    ward_stats = await wards.aaggregate(last=Max('updated_at'), count=Count('pk'))
+    if not ward_stats['count']:
+        return None
+    meeting_stats = await meetings.aaggregate(last=Max('updated_at'), count=Count('pk'))
+    deleted = (await tombstones.aaggregate(last=Max('deleted_at')))['last']
+    return _fingerprint(ward_stats, meeting_stats, deleted)
+
+
+def _querysets(ward_id):
+    wards = Ward.objects.order_by()
+    meetings = Meeting.objects.order_by()
+    tombstones = Tombstone.objects.order_by()
+    if ward_id is not None:
+        wards = wards.filter(pk=ward_id)
+        meetings = meetings.filter(ward_id=ward_id)
+        tombstones = tombstones.filter(ward_id=ward_id)
+    return wards, meetings, tombstones
+
+
+def _fingerprint(ward_stats, meeting_stats, deleted):
+    last_modified = max(filter(None, [ward_stats['last'], meeting_stats['last'], deleted]))
+    fingerprint = (
+        f"{ward_stats['count']}:{ward_stats['last'].isoformat()}:"
+        f"{meeting_stats['count']}:{meeting_stats['last'].isoformat() if meeting_stats['last'] else ''}:"
+        f"{deleted.isoformat() if deleted else ''}"
+    )
+    return fingerprint, last_modified
+
+
+def make_etag(endpoint, fingerprint, params):
+    """Strong ETag over the data fingerprint and the query parameters"""
+    query = '&'.join(
+        f'{name}={value}' for name, values in sorted(params.lists()) for value in values
+    )
+    # Today's date is included because some representations (e.g. the list's
+    # bounded meeting window) move with the calendar
+    raw = f'{endpoint}|{fingerprint}|{query}|{date.today().isoformat()}'
+    return '"%s"' % hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+def evaluate(request, endpoint, ward_id=None):
+    """
+    Compute the validators of a response and check the request's
+    preconditions against them.
+
+    Returns ``(etag, last_modified, not_modified)`` where ``not_modified`` is
+    a ready 304 response or None, or None when the ward does not exist.
+    """
+    return _check(request, endpoint, validators(ward_id), request.query_params)
+
+
+async def aevaluate(request, endpoint, ward_id=None):
+    """Async version of ``evaluate`` for plain Django requests"""
+    return _check(request, endpoint, await avalidators(ward_id), request.GET)
+
+
+def current_etag(request, endpoint, ward_id=None):
+    """
+    The ETag of the data as it is now. A body built after ``evaluate`` is
+    only described by its ETag when this still equals it.
+    """
+    current = validators(ward_id)
+    return current and make_etag(endpoint, current[0], request.query_params)
+
+
+async def acurrent_etag(request, endpoint, ward_id=None):
+    """Async version of ``current_etag`` for plain Django requests"""
+    current = await avalidators(ward_id)
+    return current and make_etag(endpoint, current[0], request.GET)
+
+
+def _check(request, endpoint, current, params):
+    if current is None:
+        return None
+    fingerprint, last_modified = current
+    etag = make_etag(endpoint, fingerprint, params)
+    last_modified = int(last_modified.timestamp())
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        set_validators(not_modified, etag, last_modified)
+    return etag, last_modified, not_modified
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, no_cache=True)
+
+
+def conditional_response(endpoint, per_ward=False):
+    """
+    Answer ``If-None-Match``/``If-Modified-Since`` on a viewset action with
+    ``304 Not Modified``, and add ``ETag``/``Last-Modified`` to successful
+    responses. Columnar formats get ETags of their own. A response built
+    while the data changed has no validators, as they describe neither the
+    data before nor after.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            renderer = request.accepted_renderer
+            name = f'{endpoint}.{renderer.format}' if getattr(renderer, 'columnar', False) else endpoint
+            evaluated = evaluate(request, name, kwargs.get('pk') if per_ward else None)
+            if evaluated is None:
+                return method(view, request, *args, **kwargs)
+
+            etag, last_modified, not_modified = evaluated
+            if not_modified is not None:
+                return not_modified
+            # Keys the response cache, so the body matches the ETag sent with it
+            request.etag = etag
+            ward_id = kwargs.get('pk') if per_ward else None
+            request.etag_is_current = lambda: current_etag(request, name, ward_id) == etag
+            response = method(view, request, *args, **kwargs)
+            # ``cached_response`` drops the ETag of a body built across a write
+            if response.status_code == 200 and request.etag is not None:
+                set_validators(response, etag, last_modified)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,226 @@
+"""
+Venue and time conflict detection across wards.
+
+Occurrences are turned into bookings (a venue, a date and a time interval) and
+grouped by normalized venue and date, so only bookings in the same hall on the
+same day are ever compared. Within a group a sweep over bookings sorted by
+start time finds every overlap in O(n log n + conflicts), instead of
+comparing all pairs. A meeting lasts ``WARDS_MEETING_DURATION_MINUTES``; a
+meeting without a time books the whole day, as in the calendar exports.
+"""
+import bisect
+import heapq
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, time, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from . import materialize
+from .ical import meeting_duration
+from .models import Meeting, Ward
+from .recurrence import DEFAULT_RANGE_DAYS, Occurrence, expand_occurrences
+from .times import format_meeting_time
+
+MINUTES_PER_DAY = 24 * 60
+
+# How far ahead a schedule edit is checked for conflicts
+CHECK_WINDOW_DAYS = DEFAULT_RANGE_DAYS
+
+# Ward fields that decide when and where its meetings are held
+SCHEDULE_FIELDS = ('meeting_time', 'venue', 'frequency_weeks', 'start_date')
+
+
+@dataclass
+class Booking:
+    """One meeting's hold on a venue"""
+    ward_id: str
+    ward_name: str
+    meeting_date: date
+    meeting_time: Optional[time]
+    venue: str
+    start: int  # Minutes after midnight
+    end: int
+    meeting_id: Optional[int] = None
+
+
+@dataclass
+class Conflict:
+    """Two bookings of the same venue that overlap in time"""
+    meeting_date: date
+    venue: str
+    first: Booking
+    second: Booking
+
+
+def normalize_venue(venue: str) -> str:
+    """Key under which spellings of the same venue compare equal"""
+    return ' '.join(re.sub(r'[^\w\s]', ' ', venue or '').casefold().split())
+
+
+def booking(occurrence) -> Booking:
+    """Turn an occurrence (or anything with the same fields) into a booking"""
+    start_time = occurrence.meeting_time
+    if start_time is None:
+        start, end = 0, MINUTES_PER_DAY
+    else:
+        start = start_time.hour * 60 + start_time.minute
+        end = start + int(meeting_duration().total_seconds() // 60)
+    return Booking(
+        ward_id=occurrence.ward_id,
+        ward_name=occurrence.ward_name,
+        meeting_date=occurrence.meeting_date,
+        meeting_time=occurrence.meeting_time,
+        venue=occurrence.venue,
+        start=start,
+        end=end,
+        meeting_id=getattr(occurrence, 'meeting_id', None),
+    )
+
+
+class ConflictIndex:
+    """Bookings grouped by (normalized venue, date), sorted by start time"""
+
+    def __init__(self, occurrences: Iterable = ()):
+        self.groups: Dict[Tuple[str, date], List[Booking]] = defaultdict(list)
+        for occurrence in occurrences:
+            if not occurrence.is_cancelled:
+                entry = booking(occurrence)
+                self.groups[(normalize_venue(entry.venue), entry.meeting_date)].append(entry)
+        self.starts = {}
+        for key, entries in self.groups.items():
+            entries.sort(key=lambda entry: (entry.start, entry.ward_id))
+            self.starts[key] = [entry.start for entry in entries]
+        # Longest booking, which bounds how far back an overlap can start
+        self.longest = max(
+            (entry.end - entry.start for entries in self.groups.values() for entry in entries), default=0
+        )
+
+    def conflicts(self) -> List[Conflict]:
+        """Every pair of overlapping bookings, ordered by date and venue"""
+        found = []
+        for venue, meeting_date in sorted(self.groups, key=lambda key: (key[1], key[0])):
+            entries = self.groups[(venue, meeting_date)]
+            active = []  # Min-heap of (end, position) of bookings still running
+            for position, entry in enumerate(entries):
+                while active and active[0][0] <= entry.start:
+                    heapq.heappop(active)
+                for _, other in sorted(active, key=lambda item: item[1]):
+                    found.append(Conflict(meeting_date, entries[other].venue, entries[other], entry))
+                heapq.heappush(active, (entry.end, position))
+        return found
+
+    def overlapping(self, candidate: Booking, exclude_ward: Optional[str] = None) -> List[Booking]:
+        """Bookings that overlap ``candidate``, ignoring those of ``exclude_ward``"""
+        key = (normalize_venue(candidate.venue), candidate.meeting_date)
+        if key not in self.groups:
+            return []
+        # Only bookings starting less than ``longest`` minutes earlier can still be running
+        low = bisect.bisect_left(self.starts[key], candidate.start - self.longest)
+        high = bisect.bisect_left(self.starts[key], candidate.end)
+        return [
+            entry for entry in self.groups[key][low:high]
+            if candidate.start < entry.end and entry.ward_id != exclude_ward
+        ]
+
+
+def find_conflicts(from_date: date, to_date: date) -> List[Conflict]:
+    """Every venue conflict between ``from_date`` and ``to_date``"""
+    return ConflictIndex(materialize.occurrences(from_date, to_date)).conflicts()
+
+
+def meeting_conflicts(ward, meeting_date, meeting_time, venue) -> List[Booking]:
+    """Other wards' bookings that a meeting of ``ward`` with these details would overlap"""
+    candidate = booking(Occurrence(ward.id, ward.ward_name, meeting_date, meeting_time, venue))
+    index = ConflictIndex(_occurrences_at({normalize_venue(venue)}, meeting_date, meeting_date, ward.pk))
+    return index.overlapping(candidate)
+
+
+def schedule_conflicts(ward, changes, days=CHECK_WINDOW_DAYS) -> List[Tuple[Booking, Booking]]:
+    """
+    ``(proposed, existing)`` overlaps that ``ward``'s schedule with ``changes``
+    applied would add over the next ``days`` days. Overlaps the current
+    schedule already has are not reported, and stored meetings of the ward
+    keep their own time and venue.
+    """
+    if all(changes.get(field, getattr(ward, field)) == getattr(ward, field) for field in SCHEDULE_FIELDS):
+        return []
+    proposed = Ward(**{
+        field: changes.get(field, getattr(ward, field)) for field in ('id', 'ward_name') + SCHEDULE_FIELDS
+    })
+    from_date = date.today()
+    to_date = from_date + timedelta(days=days)
+    meetings = list(ward.meetings.filter(meeting_date__range=(from_date, to_date)))
+    venues = {normalize_venue(proposed.venue), normalize_venue(ward.venue)}
+    venues.update(normalize_venue(meeting.venue) for meeting in meetings)
+    index = ConflictIndex(_occurrences_at(venues, from_date, to_date, ward.pk))
+
+    def overlaps(schedule):
+        for occurrence in expand_occurrences([schedule], meetings, from_date, to_date):
+            if not occurrence.is_cancelled:
+                candidate = booking(occurrence)
+                for existing in index.overlapping(candidate):
+                    yield candidate, existing
+
+    current = {(existing.ward_id, existing.meeting_date) for _, existing in overlaps(ward)}
+    return [
+        (candidate, existing) for candidate, existing in overlaps(proposed)
+        if (existing.ward_id, existing.meeting_date) not in current
+    ]
+
+
+def batch_conflicts(candidates: List[Occurrence], replaced=()) -> List[List[Booking]]:
+    """
+    For every candidate occurrence (a batch of meetings about to be written),
+    the other wards' bookings it would overlap, including other candidates.
+    Stored meetings whose ids are in ``replaced``, and whatever occupies the
+    candidates' own (ward, date) slots, are what the batch rewrites and are
+    left out. The whole batch is checked with one range expansion.
+    """
+    live = [candidate for candidate in candidates if not candidate.is_cancelled]
+    if not live:
+        return [[] for _ in candidates]
+    venues = {normalize_venue(candidate.venue) for candidate in live}
+    slots = {(candidate.ward_id, candidate.meeting_date) for candidate in candidates}
+    replaced = set(replaced)
+    stored = [
+        occurrence for occurrence in _occurrences_at(
+            venues, min(entry.meeting_date for entry in live), max(entry.meeting_date for entry in live), None
+        )
+        if occurrence.meeting_id not in replaced and (occurrence.ward_id, occurrence.meeting_date) not in slots
+    ]
+    index = ConflictIndex(stored + live)
+    return [
+        [] if candidate.is_cancelled else index.overlapping(booking(candidate), exclude_ward=candidate.ward_id)
+        for candidate in candidates
+    ]
+
+
+def describe(existing: Booking) -> str:
+    return (
+        f'{existing.venue} is already booked by {existing.ward_name} on '
+        f'{existing.meeting_date.isoformat()} at {format_meeting_time(existing.meeting_time) or "an unknown time"}.'
+    )
+
+
+def _occurrences_at(venues, from_date, to_date, exclude_ward):
+    """
+    Occurrences of the other wards that can be held at one of ``venues``:
+    only wards whose regular venue, or one of whose meetings in the range,
+    normalizes to one of them are expanded
+    """
+    ward_ids = {
+        ward_id for ward_id, venue in Ward.objects.exclude(pk=exclude_ward).values_list('id', 'venue')
+        if normalize_venue(venue) in venues
+    }
+    ward_ids.update(
+        ward_id for ward_id, venue in Meeting.objects.filter(
+            meeting_date__range=(from_date, to_date)
+        ).exclude(ward_id=exclude_ward).order_by().values_list('ward_id', 'venue')
+        if normalize_venue(venue) in venues
+    )
+    if not ward_ids:
+        return []
+    return [
+        occurrence for occurrence in materialize.occurrences(from_date, to_date, sorted(ward_ids))
+        if normalize_venue(occurrence.venue) in venues
+    ]
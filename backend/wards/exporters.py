@@ -0,0 +1,186 @@
+"""
+Streaming calendar exports (CSV, NDJSON, iCalendar).
+
+Rows are pulled from the database with ``.iterator(chunk_size=...)`` and
+encoded one at a time, and the encoded text is yielded in small buffers, so
+memory stays flat however many rows are exported and the first bytes go out
+before the query has finished.
+"""
+import csv
+import json
+from datetime import datetime, time, timezone
+from . import ical, materialize
+from .models import Meeting, MeetingOccurrence, Ward
+from .recurrence import expand_occurrences
+from .times import format_meeting_time
+
+OUTPUTS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson; charset=utf-8', 'ndjson'),
+    'ics': ('text/calendar; charset=utf-8', 'ics'),
+}
+
+SOURCES = ('meetings', 'occurrences')
+
+COLUMNS = [
+    'ward_id', 'ward_name', 'meeting_date', 'meeting_time', 'venue',
+    'is_cancelled', 'is_scheduled', 'agenda', 'notes',
+]
+
+CHUNK_SIZE = 2000
+
+# Encoded text is flushed once a buffer grows past this many characters
+BUFFER_SIZE = 64 * 1024
+
+
+def meeting_rows(from_date=None, to_date=None, ward_ids=None, chunk_size=CHUNK_SIZE):
+    """Yield stored meetings as row dicts, ordered by date and ward"""
+    meetings = Meeting.objects.order_by('meeting_date', 'ward_id')
+    if from_date:
+        meetings = meetings.filter(meeting_date__gte=from_date)
+    if to_date:
+        meetings = meetings.filter(meeting_date__lte=to_date)
+    if ward_ids:
+        meetings = meetings.filter(ward_id__in=ward_ids)
+    values = meetings.values_list(
+        'ward_id', 'ward__ward_name', 'meeting_date', 'meeting_time', 'venue',
+        'is_cancelled', 'agenda', 'notes',
+    )
+    columns = [column for column in COLUMNS if column != 'is_scheduled']
+    for row in values.iterator(chunk_size=chunk_size):
+        yield dict(zip(columns, row))
+
+
+def occurrence_rows(from_date, to_date, ward_ids=None, chunk_size=CHUNK_SIZE):
+    """
+    Yield expanded occurrences as row dicts.
+
+    Materialized occurrences stream in date order. Computed ones are expanded
+    ``chunk_size`` wards at a time, so they come out grouped by ward chunk.
+    """
+    if materialize.covers(from_date, to_date):
+        rows = MeetingOccurrence.objects.filter(meeting_date__range=(from_date, to_date))
+        if ward_ids:
+            rows = rows.filter(ward_id__in=ward_ids)
+        values = rows.order_by('meeting_date', 'ward_id').values_list(
+            'ward_id', 'ward__ward_name', 'meeting_date', 'meeting_time', 'venue',
+            'is_cancelled', 'is_scheduled',
+        )
+        for row in values.iterator(chunk_size=chunk_size):
+            yield dict(zip(COLUMNS, row))
+        return
+
+    wards = Ward.objects.filter(start_date__lte=to_date).order_by('id').only(
+        'id', 'ward_name', 'meeting_time', 'venue', 'frequency_weeks', 'start_date'
+    )
+    if ward_ids:
+        wards = wards.filter(id__in=ward_ids)
+    batch = []
+    for ward in wards.iterator(chunk_size=chunk_size):
+        batch.append(ward)
+        if len(batch) >= chunk_size:
+            yield from _expand_batch(batch, from_date, to_date)
+            batch = []
+    if batch:
+        yield from _expand_batch(batch, from_date, to_date)
+
+
+def _expand_batch(wards, from_date, to_date):
+    meetings = Meeting.objects.filter(
+        ward_id__in=[ward.id for ward in wards], meeting_date__range=(from_date, to_date)
+    ).order_by()
+    for occurrence in expand_occurrences(wards, meetings, from_date, to_date):
+        yield {
+            'ward_id': occurrence.ward_id,
+            'ward_name': occurrence.ward_name,
+            'meeting_date': occurrence.meeting_date,
+            'meeting_time': occurrence.meeting_time,
+            'venue': occurrence.venue,
+            'is_cancelled': occurrence.is_cancelled,
+            'is_scheduled': occurrence.is_scheduled,
+        }
+
+
+class _Echo:
+    """File-like object whose ``write`` returns what it was given"""
+
+    def write(self, value):
+        return value
+
+
+def encode_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(COLUMNS)
+    for row in rows:
+        yield writer.writerow([_csv_value(row.get(column)) for column in COLUMNS])
+
+
+def encode_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, default=_json_value, separators=(',', ':')) + '\n'
+
+
+def encode_ics(rows, name='Akinyele Ward Meetings'):
+    stamp = datetime.now(timezone.utc)
+    yield ical.calendar_header(name)
+    for row in rows:
+        yield ical.event(
+            ical.occurrence_uid(row['ward_id'], row['meeting_date']),
+            row['ward_name'], row['meeting_date'], row['meeting_time'], row['venue'],
+            is_cancelled=row['is_cancelled'],
+            description=row.get('agenda'),
+            stamp=stamp,
+        )
+    yield ical.calendar_footer()
+
+
+ENCODERS = {
+    'csv': encode_csv,
+    'ndjson': encode_ndjson,
+    'ics': encode_ics,
+}
+
+
+def buffered(chunks, size=BUFFER_SIZE):
+    """
+    Join small strings into buffers of about ``size`` characters. The first
+    chunk is passed through at once so clients get the first byte early.
+    """
+    buffer = []
+    length = 0
+    first = True
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if first or length >= size:
+            first = False
+            yield ''.join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def export(output, source, from_date=None, to_date=None, ward_ids=None):
+    """Return an iterator of encoded text chunks for an export"""
+    if source == 'occurrences':
+        rows = occurrence_rows(from_date, to_date, ward_ids)
+    else:
+        rows = meeting_rows(from_date, to_date, ward_ids)
+    return buffered(ENCODERS[output](rows))
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, time):
+        return format_meeting_time(value)
+    return value
+
+
+def _json_value(value):
+    if isinstance(value, time):
+        return format_meeting_time(value)
+    return str(value)
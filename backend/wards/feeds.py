@@ -0,0 +1,78 @@
+"""
+iCalendar subscription feeds.
+
+Each ward is published as one recurring VEVENT with
+``RRULE:FREQ=WEEKLY;INTERVAL=<frequency_weeks>`` instead of one event per
+date. Stored meetings are folded in as ``EXDATE`` (cancellations),
+``RECURRENCE-ID`` overrides (changed time, venue or an agenda) or standalone
+events (meetings outside the schedule).
+"""
+from collections import defaultdict
+from datetime import datetime, timezone
+from . import ical
+from .recurrence import is_scheduled_date
+
+
+def series_uid(ward_id):
+    return f'{ward_id}@{ical.UID_DOMAIN}'
+
+
+def ward_events(ward, meetings, stamp):
+    """Render the recurring series of one ward plus its meeting overrides"""
+    uid = series_uid(ward.id)
+    params, _ = ical.date_value(ward.start_date, ward.meeting_time)
+
+    exdates = []
+    overrides = []
+    extras = []
+    for meeting in sorted(meetings, key=lambda meeting: meeting.meeting_date):
+        if not is_scheduled_date(ward.start_date, ward.frequency_weeks, meeting.meeting_date):
+            extras.append(meeting)
+        elif meeting.is_cancelled:
+            exdates.append(ical.date_value(meeting.meeting_date, ward.meeting_time)[1])
+        elif (meeting.meeting_time, meeting.venue) != (ward.meeting_time, ward.venue) or meeting.agenda:
+            overrides.append(meeting)
+
+    rules = []
+    if ward.frequency_weeks > 0:
+        rules.append(f'RRULE:FREQ=WEEKLY;INTERVAL={ward.frequency_weeks}')
+    if exdates:
+        rules.append(f'EXDATE{params}:{",".join(exdates)}')
+
+    chunks = [ical.event(uid, ward.ward_name, ward.start_date, ward.meeting_time, ward.venue,
+                         stamp=stamp, extra=rules)]
+    for meeting in overrides:
+        original = ical.date_value(meeting.meeting_date, ward.meeting_time)[1]
+        chunks.append(ical.event(
+            uid, ward.ward_name, meeting.meeting_date, meeting.meeting_time, meeting.venue,
+            description=meeting.agenda, stamp=stamp, extra=[f'RECURRENCE-ID{params}:{original}'],
+        ))
+    for meeting in extras:
+        chunks.append(ical.event(
+            ical.occurrence_uid(ward.id, meeting.meeting_date),
+            ward.ward_name, meeting.meeting_date, meeting.meeting_time, meeting.venue,
+            is_cancelled=meeting.is_cancelled, description=meeting.agenda, stamp=stamp,
+        ))
+    return ''.join(chunks)
+
+
+def cache_key(etag):
+    """Response cache key of a rendered feed with the given ETag"""
+    return f'wards:feed:{etag}'
+
+
+def feed_name(wards, pk=None):
+    return wards[0].ward_name if pk is not None else 'Akinyele Ward Meetings'
+
+
+def render_feed(wards, meetings, name):
+    """Render a complete VCALENDAR for ``wards`` and their ``meetings``"""
+    stamp = datetime.now(timezone.utc)
+    by_ward = defaultdict(list)
+    for meeting in meetings:
+        by_ward[meeting.ward_id].append(meeting)
+    chunks = [ical.calendar_header(name)]
+    for ward in wards:
+        chunks.append(ward_events(ward, by_ward.get(ward.id, []), stamp))
+    chunks.append(ical.calendar_footer())
+    return ''.join(chunks)
@@ -0,0 +1,124 @@
+"""
+Minimal iCalendar (RFC 5545) writer for ward meetings
+"""
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+from django.conf import settings
+from .times import parse_meeting_time
+
+PRODID = '-//PDP Akinyele//Ward Meeting Calendar//EN'
+UID_DOMAIN = 'pdp-akinyele-calendar'
+
+
+def calendar_timezone():
+    return getattr(settings, 'WARDS_CALENDAR_TIMEZONE', 'Africa/Lagos')
+
+
+def meeting_duration():
+    return timedelta(minutes=getattr(settings, 'WARDS_MEETING_DURATION_MINUTES', 120))
+
+
+def escape(text):
+    """Escape a TEXT value"""
+    return (
+        str(text).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def fold(line):
+    """Fold a content line to 75 octets as required by RFC 5545"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts = []
+    while encoded:
+        limit = 75 if not parts else 74
+        cut = min(limit, len(encoded))
+        # Never split a multi-byte character
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def format_utc(moment):
+    return moment.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def calendar_header(name=None):
+    """Lines opening a VCALENDAR, including the VTIMEZONE used by events"""
+    tzid = calendar_timezone()
+    offset = datetime.now(ZoneInfo(tzid)).strftime('%z')
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+    ]
+    if name:
+        lines.append(f'X-WR-CALNAME:{escape(name)}')
+    lines += [
+        f'X-WR-TIMEZONE:{tzid}',
+        'BEGIN:VTIMEZONE',
+        f'TZID:{tzid}',
+        'BEGIN:STANDARD',
+        'DTSTART:19700101T000000',
+        f'TZOFFSETFROM:{offset}',
+        f'TZOFFSETTO:{offset}',
+        'END:STANDARD',
+        'END:VTIMEZONE',
+    ]
+    return ''.join(fold(line) for line in lines)
+
+
+def calendar_footer():
+    return fold('END:VCALENDAR')
+
+
+def date_value(meeting_date, meeting_time):
+    """
+    Return the ``(parameters, value)`` of a date-time property: a local time
+    in the calendar time zone when the meeting time parses, a date otherwise
+    """
+    start_time = parse_meeting_time(meeting_time)
+    if start_time is None:
+        return ';VALUE=DATE', meeting_date.strftime('%Y%m%d')
+    start = datetime.combine(meeting_date, start_time)
+    return f';TZID={calendar_timezone()}', start.strftime('%Y%m%dT%H%M%S')
+
+
+def event_times(meeting_date, meeting_time):
+    """Return the DTSTART and DTEND lines of an event"""
+    params, value = date_value(meeting_date, meeting_time)
+    start_time = parse_meeting_time(meeting_time)
+    if start_time is None:
+        end = (meeting_date + timedelta(days=1)).strftime('%Y%m%d')
+    else:
+        end = (datetime.combine(meeting_date, start_time) + meeting_duration()).strftime('%Y%m%dT%H%M%S')
+    return [f'DTSTART{params}:{value}', f'DTEND{params}:{end}']
+
+
+def event(uid, ward_name, meeting_date, meeting_time, venue, is_cancelled=False,
+          description=None, stamp=None, extra=()):
+    """Render a VEVENT for one meeting"""
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:{uid}',
+        f'DTSTAMP:{format_utc(stamp or datetime.now(timezone.utc))}',
+        *event_times(meeting_date, meeting_time),
+        *extra,
+        f'SUMMARY:{escape(f"{ward_name} meeting")}',
+        f'LOCATION:{escape(venue)}',
+    ]
+    if description:
+        lines.append(f'DESCRIPTION:{escape(description)}')
+    lines.append(f'STATUS:{"CANCELLED" if is_cancelled else "CONFIRMED"}')
+    lines.append('END:VEVENT')
+    return ''.join(fold(line) for line in lines)
+
+
+def occurrence_uid(ward_id, meeting_date):
+    return f'{ward_id}-{meeting_date.strftime("%Y%m%d")}@{UID_DOMAIN}'
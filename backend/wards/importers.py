@@ -0,0 +1,219 @@
+"""
+Streaming bulk import of wards and meetings.
+
+Records are read lazily from CSV, JSON or NDJSON files, validated a chunk at
+a time with the import serializers, and upserted with
+``bulk_create(update_conflicts=True)`` in one transaction per chunk. Progress
+can be recorded in a checkpoint file so an interrupted import resumes after
+the last committed chunk.
+"""
+import csv
+import json
+import os
+import time
+from itertools import islice
+from pathlib import Path
+from django.db import transaction
+from .models import Meeting, Ward
+from .serializers import MeetingImportSerializer, WardImportSerializer
+
+FORMATS = ('csv', 'json', 'ndjson')
+
+SUFFIX_FORMATS = {
+    '.csv': 'csv',
+    '.json': 'json',
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+}
+
+
+def detect_format(path):
+    """Guess the file format from its extension"""
+    fmt = SUFFIX_FORMATS.get(Path(path).suffix.lower())
+    if fmt is None:
+        raise ValueError(f'Cannot tell the format of "{path}", pass one of: {", ".join(FORMATS)}')
+    return fmt
+
+
+def read_records(path, fmt):
+    """
+    Yield records from a file one at a time.
+
+    CSV and NDJSON are streamed; a JSON file must hold a single array and is
+    parsed whole, so prefer NDJSON for very large imports.
+    """
+    if fmt == 'csv':
+        with open(path, newline='', encoding='utf-8-sig') as handle:
+            for row in csv.DictReader(handle):
+                # Empty cells mean "not given" so field defaults apply
+                yield {key: value for key, value in row.items() if value != ''}
+    elif fmt == 'ndjson':
+        with open(path, encoding='utf-8') as handle:
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+    elif fmt == 'json':
+        with open(path, encoding='utf-8') as handle:
+            data = json.load(handle)
+        if not isinstance(data, list):
+            raise ValueError(f'"{path}" must contain a JSON array of records')
+        yield from data
+    else:
+        raise ValueError(f'Unknown format "{fmt}", expected one of: {", ".join(FORMATS)}')
+
+
+def chunked(iterable, size):
+    """Yield lists of up to ``size`` items"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class WardImporter:
+    model = Ward
+    serializer_class = WardImportSerializer
+    unique_fields = ['id']
+    update_fields = ['ward_name', 'meeting_day', 'meeting_time', 'venue', 'frequency_weeks', 'start_date', 'updated_at']
+
+    def build(self, data):
+        return Ward(**data)
+
+    def key(self, data):
+        return data['id']
+
+    def ward_id(self, data):
+        return data['id']
+
+    def check(self, rows):
+        return {}
+
+
+class MeetingImporter:
+    model = Meeting
+    serializer_class = MeetingImportSerializer
+    unique_fields = ['ward', 'meeting_date']
+    update_fields = ['meeting_time', 'venue', 'agenda', 'notes', 'is_cancelled', 'updated_at']
+
+    def build(self, data):
+        data = dict(data)
+        return Meeting(ward_id=data.pop('ward'), **data)
+
+    def key(self, data):
+        return data['ward'], data['meeting_date']
+
+    def ward_id(self, data):
+        return data['ward']
+
+    def check(self, rows):
+        """Reject rows for unknown wards, with one query for the whole chunk"""
+        ward_ids = {data['ward'] for _, data in rows}
+        known = set(Ward.objects.filter(id__in=ward_ids).values_list('id', flat=True))
+        return {
+            row_number: {'ward': [f'Unknown ward "{data["ward"]}".']}
+            for row_number, data in rows if data['ward'] not in known
+        }
+
+
+IMPORTERS = {
+    'wards': WardImporter(),
+    'meetings': MeetingImporter(),
+}
+
+
+class ChunkResult:
+    def __init__(self, rows, written, errors, ward_ids):
+        self.rows = rows
+        self.written = written
+        self.errors = errors
+        self.ward_ids = ward_ids
+
+
+def import_chunk(importer, records, first_row, dry_run=False):
+    """
+    Validate and upsert one chunk of records. ``first_row`` is the 1-based
+    record number of the first record, used in error reports.
+    """
+    serializer = importer.serializer_class(data=records, many=True)
+    if serializer.is_valid():
+        validated = list(enumerate(serializer.validated_data, start=first_row))
+        errors = {}
+    else:
+        # Keep the rows that passed; the list serializer drops everything on any error
+        child = serializer.child
+        validated = [
+            (first_row + index, child.run_validation(record))
+            for index, (record, error) in enumerate(zip(records, serializer.errors)) if not error
+        ]
+        errors = {
+            first_row + index: {field: [str(message) for message in messages] for field, messages in error.items()}
+            for index, error in enumerate(serializer.errors) if error
+        }
+
+    errors.update(importer.check(validated))
+    # Later rows win when the same record appears twice in a chunk
+    unique = {}
+    for row_number, data in validated:
+        if row_number not in errors:
+            unique[importer.key(data)] = data
+
+    ward_ids = {importer.ward_id(data) for data in unique.values()}
+    if not dry_run and unique:
+        with transaction.atomic():
+            importer.model.objects.bulk_create(
+                [importer.build(data) for data in unique.values()],
+                update_conflicts=True,
+                unique_fields=importer.unique_fields,
+                update_fields=importer.update_fields,
+            )
+    return ChunkResult(len(records), len(unique), sorted(errors.items()), ward_ids)
+
+
+class Checkpoint:
+    """Number of committed records per input file, stored as JSON"""
+
+    def __init__(self, path):
+        self.path = Path(path) if path else None
+        self.positions = {}
+        if self.path and self.path.exists():
+            self.positions = json.loads(self.path.read_text(encoding='utf-8'))
+
+    def position(self, source):
+        return self.positions.get(str(Path(source).resolve()), 0)
+
+    def save(self, source, position):
+        if not self.path:
+            return
+        self.positions[str(Path(source).resolve())] = position
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        tmp.write_text(json.dumps(self.positions, indent=2), encoding='utf-8')
+        os.replace(tmp, self.path)
+
+
+def run_import(kind, path, fmt=None, chunk_size=1000, dry_run=False, checkpoint=None, progress=None):
+    """
+    Import ``kind`` ('wards' or 'meetings') records from ``path``.
+
+    ``progress`` is called with ``(ChunkResult, rows_done, elapsed)`` after each
+    chunk. Returns the set of ward ids that were written.
+    """
+    importer = IMPORTERS[kind]
+    fmt = fmt or detect_format(path)
+    checkpoint = checkpoint or Checkpoint(None)
+    skip = checkpoint.position(path)
+
+    records = islice(read_records(path, fmt), skip, None)
+    position = skip
+    ward_ids = set()
+    started = time.perf_counter()
+    for chunk in chunked(records, chunk_size):
+        result = import_chunk(importer, chunk, position + 1, dry_run=dry_run)
+        position += result.rows
+        ward_ids |= result.ward_ids
+        if not dry_run:
+            checkpoint.save(path, position)
+        if progress:
+            progress(result, position, time.perf_counter() - started)
+    return ward_ids
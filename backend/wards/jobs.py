@@ -0,0 +1,259 @@
+"""
+Database-backed background job queue.
+
+Tasks are registered with ``@task`` (see ``wards.tasks``) and queued as
+``Job`` rows with ``enqueue``, in the same transaction as the write that
+caused them, so no broker is needed and a rolled back write queues nothing.
+``python manage.py run_jobs`` claims due jobs in batches and runs them; jobs of
+a ``batch=True`` task claimed together run as one call with every payload.
+Failed jobs are retried with exponential backoff up to ``max_attempts``, and
+jobs left running by a worker that died are queued again after
+``WARDS_JOB_TIMEOUT_SECONDS``.
+
+An ``idempotency_key`` is held by at most one queued job: enqueueing with a
+key that is already queued returns that job instead of adding another.
+
+``defer`` is what request code calls: it enqueues when
+``WARDS_BACKGROUND_JOBS`` is enabled, and otherwise runs the task in the
+process once the write commits, so a deployment without a worker behaves as
+before. Inline failures are logged, not retried.
+"""
+import logging
+import os
+import socket
+import time
+import traceback
+import uuid
+from dataclasses import dataclass
+from datetime import timedelta
+from functools import partial
+from typing import Callable, Dict
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Job
+
+logger = logging.getLogger('wards')
+
+# Longest wait between retries, in seconds
+MAX_RETRY_DELAY = 3600
+
+
+@dataclass
+class Task:
+    name: str
+    func: Callable
+    batch: bool = False
+    max_attempts: int = 3
+    retry_delay: int = 30  # Seconds before the first retry, doubled for each later one
+
+    def run(self, payloads):
+        if self.batch:
+            self.func(payloads)
+        else:
+            for payload in payloads:
+                self.func(**payload)
+
+
+TASKS: Dict[str, Task] = {}
+
+
+def task(name=None, batch=False, max_attempts=3, retry_delay=30):
+    """
+    Register a task. A plain task is called with a job's payload as keyword
+    arguments; a ``batch`` task is called with the list of payloads of every
+    job claimed together.
+    """
+    def decorator(func):
+        task_name = name or func.__name__
+        TASKS[task_name] = Task(task_name, func, batch, max_attempts, retry_delay)
+        return func
+    return decorator
+
+
+def is_enabled():
+    return getattr(settings, 'WARDS_BACKGROUND_JOBS', False)
+
+
+def get_task(name):
+    try:
+        return TASKS[name]
+    except KeyError:
+        raise ValueError(f'Unknown task "{name}".')
+
+
+def enqueue(name, payload=None, key=None, delay=None, max_attempts=None):
+    """
+    Queue a job for the task ``name`` and return it. With a ``key`` already
+    held by a queued job, that job is returned and nothing is added.
+    """
+    registered = get_task(name)
+    if key:
+        existing = Job.objects.filter(idempotency_key=key, status=Job.QUEUED).first()
+        if existing is not None:
+            return existing
+    try:
+        with transaction.atomic():
+            return Job.objects.create(
+                task=name,
+                payload=payload or {},
+                idempotency_key=key,
+                max_attempts=max_attempts or registered.max_attempts,
+                run_after=timezone.now() + (delay or timedelta()),
+            )
+    except IntegrityError:
+        # Another process queued the same key in between
+        existing = Job.objects.filter(idempotency_key=key, status=Job.QUEUED).first() if key else None
+        if existing is None:
+            raise
+        return existing
+
+
+def defer(name, payload=None, key=None):
+    """
+    Queue a job when background jobs are enabled. Otherwise run the task once
+    the current transaction commits (at once outside one), so that neither
+    the task's failure nor its side effects (emails) outlive a rolled back
+    write, and a failure cannot undo or fail the write.
+    """
+    if is_enabled():
+        return enqueue(name, payload, key)
+    transaction.on_commit(partial(run_inline, get_task(name), payload or {}))
+    return None
+
+
+def run_inline(registered, payload):
+    """Run a deferred task in the process, logging a failure instead of raising it"""
+    try:
+        with transaction.atomic():
+            registered.run([payload])
+    except Exception:
+        logger.exception(
+            'Task %s failed and will not be retried (set WARDS_BACKGROUND_JOBS=True to retry failed tasks)',
+            registered.name,
+        )
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+
+def claim(worker, limit):
+    """Mark up to ``limit`` due jobs as running for ``worker`` and return them"""
+    now = timezone.now()
+    ids = list(
+        Job.objects.filter(status=Job.QUEUED, run_after__lte=now)
+        .order_by('run_after', 'id').values_list('id', flat=True)[:limit]
+    )
+    if not ids:
+        return []
+    # Only rows still queued are taken, so concurrent workers never share a job
+    Job.objects.filter(id__in=ids, status=Job.QUEUED).update(
+        status=Job.RUNNING, locked_by=worker, locked_at=now, attempts=F('attempts') + 1,
+    )
+    return list(Job.objects.filter(id__in=ids, status=Job.RUNNING, locked_by=worker, locked_at=now))
+
+
+def run_jobs(jobs):
+    """
+    Run claimed jobs, grouping those of each batch task into one call, and
+    record the outcome. Returns the number of jobs that succeeded.
+    """
+    groups = {}
+    for job in jobs:
+        registered = TASKS.get(job.task)
+        if registered is None:
+            _fail(job, f'Unknown task "{job.task}".', retry=False)
+        elif registered.batch:
+            groups.setdefault(job.task, []).append(job)
+        else:
+            groups[job.pk] = [job]
+
+    succeeded = 0
+    for group in groups.values():
+        registered = TASKS[group[0].task]
+        try:
+            with transaction.atomic():
+                registered.run([job.payload for job in group])
+        except Exception:
+            error = traceback.format_exc()
+            logger.warning('Job %s failed: %s', ', '.join(str(job) for job in group), error.splitlines()[-1])
+            for job in group:
+                _fail(job, error, delay=_retry_delay(registered, job.attempts))
+        else:
+            Job.objects.filter(id__in=[job.pk for job in group]).update(
+                status=Job.DONE, finished_at=timezone.now(), locked_by='',
+            )
+            succeeded += len(group)
+    return succeeded
+
+
+def requeue_stale(timeout=None):
+    """Release jobs whose worker has held them longer than ``timeout`` seconds"""
+    timeout = timeout or getattr(settings, 'WARDS_JOB_TIMEOUT_SECONDS', 600)
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    stale = list(Job.objects.filter(status=Job.RUNNING, locked_at__lt=cutoff))
+    for job in stale:
+        _fail(job, f'Worker {job.locked_by} did not finish within {timeout} seconds.')
+    return len(stale)
+
+
+def purge(days=None):
+    """Delete jobs that finished successfully more than ``days`` days ago"""
+    days = days if days is not None else getattr(settings, 'WARDS_JOB_RETENTION_DAYS', 7)
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = Job.objects.filter(status=Job.DONE, finished_at__lt=cutoff).delete()
+    return deleted
+
+
+def work(batch_size=20, sleep=1.0, once=False, should_stop=None, log=None):
+    """
+    Claim and run jobs until ``should_stop()`` returns true, or with
+    ``once`` until no job is due. Returns the number of jobs run.
+    """
+    worker = worker_name()
+    processed = 0
+    housekeeping = 0.0
+    while not (should_stop and should_stop()):
+        close_old_connections()
+        if time.monotonic() - housekeeping > 60:
+            requeue_stale()
+            purge()
+            housekeeping = time.monotonic()
+        jobs = claim(worker, batch_size)
+        if jobs:
+            succeeded = run_jobs(jobs)
+            processed += len(jobs)
+            if log:
+                log(len(jobs), succeeded)
+        elif once:
+            break
+        else:
+            time.sleep(sleep)
+    return processed
+
+
+def _retry_delay(registered, attempts):
+    return timedelta(seconds=min(registered.retry_delay * 2 ** max(attempts - 1, 0), MAX_RETRY_DELAY))
+
+
+def _fail(job, error, retry=True, delay=None):
+    """Queue a failed job again after ``delay``, or fail it for good once out of attempts"""
+    now = timezone.now()
+    job.last_error = error
+    job.locked_by = ''
+    job.locked_at = None
+    if retry and job.attempts < job.max_attempts:
+        job.status = Job.QUEUED
+        job.run_after = now + (delay or timedelta())
+        try:
+            with transaction.atomic():
+                job.save(update_fields=['status', 'run_after', 'last_error', 'locked_by', 'locked_at'])
+            return
+        except IntegrityError:
+            # A newer job with the same key is queued and will do the same work
+            job.last_error = f'{error}\nSuperseded by a queued job with the same key.'
+    job.status = Job.FAILED
+    job.finished_at = now
+    job.save(update_fields=['status', 'finished_at', 'last_error', 'locked_by', 'locked_at'])
@@ -0,0 +1,35 @@
+import sys
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from wards import exporters
+from wards.recurrence import default_range
+
+class Command(BaseCommand):
+    help = 'Export meetings or expanded occurrences as CSV, NDJSON or iCalendar'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', choices=sorted(exporters.OUTPUTS), default='csv', help='Output format')
+        parser.add_argument('--source', choices=exporters.SOURCES, default='meetings', help='Stored meetings or expanded occurrences')
+        parser.add_argument('--from', dest='from_date', type=date.fromisoformat, help='First date (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='to_date', type=date.fromisoformat, help='Last date (YYYY-MM-DD)')
+        parser.add_argument('--ward', action='append', dest='wards', help='Only export this ward id (repeatable)')
+        parser.add_argument('--file', help='Write to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        from_date, to_date = options['from_date'], options['to_date']
+        if options['source'] == 'occurrences':
+            default_from, default_to = default_range()
+            from_date = from_date or default_from
+            to_date = to_date or default_to
+        if from_date and to_date and to_date < from_date:
+            raise CommandError('--to must not be before --from')
+
+        chunks = exporters.export(options['output'], options['source'], from_date, to_date, options['wards'])
+        if options['file']:
+            with open(options['file'], 'w', encoding='utf-8', newline='') as handle:
+                for chunk in chunks:
+                    handle.write(chunk)
+            self.stderr.write(self.style.SUCCESS(f'Export written to {options["file"]}'))
+        else:
+            for chunk in chunks:
+                sys.stdout.write(chunk)
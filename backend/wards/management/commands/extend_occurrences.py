@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from wards import materialize
+from wards.models import Ward
+
+class Command(BaseCommand):
+    help = 'Extend the materialized meeting occurrence window (run nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ward', action='append', dest='wards', help='Only regenerate this ward id (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Wards regenerated per transaction')
+
+    def handle(self, *args, **options):
+        if not materialize.is_enabled():
+            raise CommandError('Set WARDS_MATERIALIZE_OCCURRENCES=True to materialize occurrences.')
+
+        from_date, to_date = materialize.window()
+        wards = Ward.objects.order_by('id')
+        if options['wards']:
+            wards = wards.filter(id__in=options['wards'])
+
+        batch_size = options['batch_size']
+        totals = [0, 0, 0]
+        batch = []
+        for ward in wards.iterator(chunk_size=batch_size):
+            batch.append(ward)
+            if len(batch) >= batch_size:
+                totals = [a + b for a, b in zip(totals, materialize.regenerate(batch, from_date, to_date))]
+                batch = []
+        if batch:
+            totals = [a + b for a, b in zip(totals, materialize.regenerate(batch, from_date, to_date))]
+
+        if not options['wards']:
+            materialize.record_window(from_date, to_date)
+
+        created, updated, deleted = totals
+        self.stdout.write(self.style.SUCCESS(
+            f'Occurrences materialized through {to_date}: '
+            f'{created} created, {updated} updated, {deleted} deleted'
+        ))
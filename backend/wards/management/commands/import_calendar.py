@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+from wards.importers import FORMATS, IMPORTERS, Checkpoint, run_import
+from wards.signals import wards_changed
+
+class Command(BaseCommand):
+    help = 'Bulk import wards or meetings from CSV, JSON or NDJSON files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(IMPORTERS), help='What the files contain')
+        parser.add_argument('paths', nargs='+', help='Files to import, in order')
+        parser.add_argument('--format', choices=FORMATS, help='File format (default: from the file extension)')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Records validated and written per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Validate only, write nothing')
+        parser.add_argument('--checkpoint', help='JSON file recording progress, to resume an interrupted import')
+        parser.add_argument('--max-errors', type=int, default=20, help='Row errors to print per chunk')
+
+    def handle(self, *args, **options):
+        checkpoint = Checkpoint(None if options['dry_run'] else options['checkpoint'])
+        ward_ids = set()
+        totals = {'rows': 0, 'written': 0, 'errors': 0}
+
+        try:
+            for path in options['paths']:
+                self.import_file(path, options, checkpoint, ward_ids, totals)
+        finally:
+            # Chunks written before a failure are committed, so refresh their wards too
+            if not options['dry_run']:
+                wards_changed(ward_ids)
+
+        verb = 'validated' if options['dry_run'] else 'written'
+        self.stdout.write(self.style.SUCCESS(
+            f'{totals["rows"]} records read, {totals["written"]} {verb}, {totals["errors"]} rejected'
+        ))
+
+    def import_file(self, path, options, checkpoint, ward_ids, totals):
+        processed = {'rows': 0}
+
+        def progress(result, position, elapsed):
+            processed['rows'] += result.rows
+            totals['written'] += result.written
+            totals['errors'] += len(result.errors)
+            ward_ids.update(result.ward_ids)
+            for row_number, error in result.errors[:options['max_errors']]:
+                self.stderr.write(f'{path}: record {row_number}: {error}')
+            rate = processed['rows'] / elapsed if elapsed else 0
+            self.stdout.write(f'{path}: {position} records read, {rate:,.0f} rows/sec')
+
+        self.stdout.write(f'Importing {options["kind"]} from {path}')
+        try:
+            run_import(
+                options['kind'], path,
+                fmt=options['format'],
+                chunk_size=options['chunk_size'],
+                dry_run=options['dry_run'],
+                checkpoint=checkpoint,
+                progress=progress,
+            )
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+        except DatabaseError as exc:
+            raise CommandError(
+                f'{path}: a chunk failed to write and was rolled back ({exc}). '
+                f'Earlier chunks are committed; rerun with the same --checkpoint to resume.'
+            )
+        finally:
+            totals['rows'] += processed['rows']
@@ -0,0 +1,32 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from wards import benchmarking
+
+DEFAULT_PATHS = ['/api/wards/', '/api/wards/occurrences/', '/api/wards/ward-1/meetings/']
+
+class Command(BaseCommand):
+    help = 'Load-test a running server over HTTP with concurrent keep-alive clients'
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', nargs='?', default='http://127.0.0.1:8000', help='Base URL of the server')
+        parser.add_argument('--path', action='append', dest='paths', help='Path to request (repeatable)')
+        parser.add_argument('--concurrency', type=int, default=16, help='Concurrent clients')
+        parser.add_argument('--duration', type=float, default=30.0, help='Seconds to run')
+        parser.add_argument('--output', help='Write the JSON result to this file')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency must be at least 1')
+        result = benchmarking.load_test(
+            options['url'], options['paths'] or DEFAULT_PATHS,
+            concurrency=options['concurrency'], duration=options['duration'],
+        )
+        self.stdout.write(
+            f'{result["requests"]} requests in {result["duration_s"]}s: {result["throughput_rps"]} req/s, '
+            f'p50 {result["p50_ms"]}ms  p95 {result["p95_ms"]}ms  p99 {result["p99_ms"]}ms, '
+            f'{result["errors"]} errors'
+        )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as handle:
+                json.dump(result, handle, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Result written to {options["output"]}'))
@@ -1,5 +1,7 @@
 from django.core.management.base import BaseCommand
 from wards.models import Ward
+from wards.signals import wards_changed
+from wards.times import parse_meeting_time
 from datetime import date
 
 class Command(BaseCommand):
@@ -117,15 +119,22 @@ class Command(BaseCommand):
             }
         ]
         
+        existing = set(Ward.objects.filter(
+            id__in=[ward_data['id'] for ward_data in wards_data]
+        ).values_list('id', flat=True))
+
+        new_wards = []
         for ward_data in wards_data:
+            if ward_data['id'] in existing:
+                self.stdout.write(f'Ward already exists: {ward_data["ward_name"]}')
+                continue
             start_date = date.fromisoformat(ward_data.pop('start_date'))
-            ward, created = Ward.objects.get_or_create(
-                id=ward_data['id'],
-                defaults={**ward_data, 'start_date': start_date}
-            )
-            if created:
-                self.stdout.write(self.style.SUCCESS(f'Created ward: {ward.ward_name}'))
-            else:
-                self.stdout.write(f'Ward already exists: {ward.ward_name}')
+            meeting_time = parse_meeting_time(ward_data.pop('meeting_time'))
+            new_wards.append(Ward(**ward_data, start_date=start_date, meeting_time=meeting_time))
+
+        Ward.objects.bulk_create(new_wards, ignore_conflicts=True)
+        wards_changed(ward.id for ward in new_wards)
+        for ward in new_wards:
+            self.stdout.write(self.style.SUCCESS(f'Created ward: {ward.ward_name}'))
         
         self.stdout.write(self.style.SUCCESS('Ward data loaded successfully'))
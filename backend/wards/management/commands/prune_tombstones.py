@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from wards import sync
+
+class Command(BaseCommand):
+    help = 'Delete delta sync tombstones older than WARDS_SYNC_RETENTION_DAYS (run nightly)'
+
+    def handle(self, *args, **options):
+        deleted = sync.prune()
+        self.stdout.write(self.style.SUCCESS(f'{deleted} tombstone(s) deleted'))
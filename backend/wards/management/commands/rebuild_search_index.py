@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from wards import search
+
+class Command(BaseCommand):
+    help = 'Create the full-text search index if missing and refill it from the ward and meeting tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Database to index')
+
+    def handle(self, *args, **options):
+        backend = search.get_backend(connections[options['database']])
+        backend.install()
+        if not backend.indexed or not backend.is_available():
+            raise CommandError(f'No full-text search on {backend.connection.vendor}; searches stay unindexed.')
+        backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Search index rebuilt ({type(backend).__name__})'))
@@ -0,0 +1,82 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from wards import benchmarking
+
+class Command(BaseCommand):
+    help = 'Run the wards API benchmark scenarios and write a JSON report'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50, help='Timed requests per scenario')
+        parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per scenario')
+        parser.add_argument('--warm-cache', action='store_true', help='Keep the response cache between requests')
+        parser.add_argument('--scenario', action='append', dest='scenarios', help='Only run this scenario (repeatable)')
+        parser.add_argument('--startup', action='store_true',
+                            help='Measure cold start and middleware overhead instead of the scenarios')
+        parser.add_argument('--runs', type=int, default=5, help='Cold starts measured with --startup')
+        parser.add_argument('--formats', action='store_true',
+                            help='Compare response size and CPU time of JSON and the columnar formats')
+        parser.add_argument('--output', help='Write the JSON report to this file')
+        parser.add_argument('--compare', help='Previous JSON report to compare against')
+        parser.add_argument('--threshold', type=float, default=0.2, help='p95 slowdown counted as a regression')
+
+    def handle(self, *args, **options):
+        def log(name, result):
+            self.stdout.write(
+                f'{name:<26} p50 {result["p50_ms"]:>8.2f}ms  p95 {result["p95_ms"]:>8.2f}ms  '
+                f'p99 {result["p99_ms"]:>8.2f}ms  {result["throughput_rps"]:>8.1f} req/s  '
+                f'{result["queries"]:>3} queries  {result["peak_rss_mb"]:>7.1f} MiB  [{result["status"]}]'
+            )
+
+        if options['startup']:
+            report = benchmarking.measure_startup(
+                runs=options['runs'],
+                log=lambda name, result: self.stdout.write(
+                    f'{name:<26} import {result["import_ms"]:>8.1f}ms  '
+                    f'first request {result["first_request_ms"]:>8.1f}ms  [{result["status"]}]'
+                ),
+            )
+            startup = report['startup']
+            self.stdout.write(
+                f'{"median":<26} import {startup["import_ms"]:>8.1f}ms  '
+                f'first request {startup["first_request_ms"]:>8.1f}ms  total {startup["total_ms"]:.1f}ms'
+            )
+            for name in ('anonymous', 'session'):
+                result = report['overhead'][name]
+                self.stdout.write(
+                    f'{"overhead " + name:<26} p50 {result["p50_us"]:>8.1f}us  p95 {result["p95_us"]:>8.1f}us'
+                )
+        elif options['formats']:
+            report = benchmarking.measure_formats(
+                iterations=options['iterations'],
+                only=options['scenarios'],
+                log=lambda name, output, result: self.stdout.write(
+                    f'{name:<26} {output:<9} {result["bytes"]:>10} bytes  '
+                    f'cpu p50 {result["cpu_ms"]:>8.2f}ms  [{result["status"]}]'
+                ),
+            )
+        else:
+            report = benchmarking.run_scenarios(
+                iterations=options['iterations'],
+                warmup=options['warmup'],
+                cold_cache=not options['warm_cache'],
+                only=options['scenarios'],
+                log=log,
+            )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as handle:
+                json.dump(report, handle, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Report written to {options["output"]}'))
+
+        if options['compare']:
+            try:
+                with open(options['compare'], encoding='utf-8') as handle:
+                    baseline = json.load(handle)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f'Cannot read {options["compare"]}: {exc}')
+            regressions = 0
+            for name, metric, before, after, regressed in benchmarking.compare(baseline, report, options['threshold']):
+                marker = 'REGRESSION' if regressed else ''
+                regressions += regressed
+                self.stdout.write(f'{name:<26} {metric:<8} {before:>10} -> {after:<10} {marker}')
+            if regressions:
+                raise CommandError(f'{regressions} regression(s) against {options["compare"]}')
@@ -0,0 +1,34 @@
+import signal
+from django.core.management.base import BaseCommand
+from wards import jobs
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (WARDS_BACKGROUND_JOBS) until stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=20, help='Jobs claimed at a time')
+        parser.add_argument('--sleep', type=float, default=1.0, help='Seconds to wait when no job is due')
+        parser.add_argument('--once', action='store_true', help='Exit once no job is due')
+
+    def handle(self, *args, **options):
+        stopping = []
+
+        def stop(signum, frame):
+            # Finish the jobs in hand, then exit
+            stopping.append(signum)
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        def log(claimed, succeeded):
+            if options['verbosity'] > 1 or succeeded < claimed:
+                self.stdout.write(f'{claimed} job(s) run, {claimed - succeeded} failed')
+
+        processed = jobs.work(
+            batch_size=options['batch_size'],
+            sleep=options['sleep'],
+            once=options['once'],
+            should_stop=lambda: bool(stopping),
+            log=log,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Worker stopped after {processed} job(s)'))
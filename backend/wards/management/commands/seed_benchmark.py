@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from wards import benchmarking
+
+class Command(BaseCommand):
+    help = 'Seed synthetic wards and meeting history for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wards', type=int, default=1000, help='Number of wards to create')
+        parser.add_argument('--years', type=int, default=3, help='Years of meeting history per ward')
+        parser.add_argument('--cancel-rate', type=float, default=0.05, help='Fraction of meetings marked cancelled')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed, for reproducible datasets')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk insert')
+        parser.add_argument('--clear', action='store_true', help='Delete previously seeded data first')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            removed = benchmarking.clear()
+            self.stdout.write(f'Removed {removed} benchmark wards')
+        if options['wards'] <= 0:
+            return
+        wards, meetings = benchmarking.seed(
+            wards=options['wards'],
+            years=options['years'],
+            cancel_rate=options['cancel_rate'],
+            random_seed=options['seed'],
+            batch_size=options['batch_size'],
+            log=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Seeded {wards} wards and {meetings} meetings'))
@@ -0,0 +1,195 @@
+"""
+Materialized meeting occurrences.
+
+When ``WARDS_MATERIALIZE_OCCURRENCES`` is enabled, expanded occurrences are
+stored in ``MeetingOccurrence`` for a rolling window of
+``WARDS_OCCURRENCE_WINDOW_DAYS`` days from today. Schedule edits regenerate
+only the affected ward's future rows, and ``extend_occurrences`` moves the
+window forward nightly and records the range it covered in
+``OccurrenceWindow``. Range reads inside that range are then a single scan of
+the ``(meeting_date, ward)`` index.
+"""
+from dataclasses import fields
+from datetime import date, timedelta
+from operator import attrgetter
+from django.conf import settings
+from django.db import transaction
+from .models import Meeting, MeetingOccurrence, OccurrenceWindow, Ward
+from .recurrence import Occurrence, expand_occurrences
+from .times import filter_time_range, in_time_range
+
+# Ward fields that change the expanded occurrences
+SCHEDULE_FIELDS = ('meeting_day', 'meeting_time', 'venue', 'frequency_weeks', 'start_date')
+
+# Occurrence fields copied onto materialized rows
+ROW_FIELDS = ('meeting_id', 'meeting_time', 'venue', 'is_cancelled', 'is_scheduled')
+
+
+def is_enabled():
+    return getattr(settings, 'WARDS_MATERIALIZE_OCCURRENCES', False)
+
+
+def window(today=None):
+    """Return the ``(from_date, to_date)`` window kept materialized"""
+    today = today or date.today()
+    days = getattr(settings, 'WARDS_OCCURRENCE_WINDOW_DAYS', 365)
+    return today, today + timedelta(days=days)
+
+
+def record_window(from_date, to_date):
+    """Record that every ward is materialized from ``from_date`` to ``to_date``"""
+    OccurrenceWindow.objects.update_or_create(pk=1, defaults={'from_date': from_date, 'to_date': to_date})
+
+
+def covers(from_date, to_date):
+    """Whether a range can be answered from the materialized table"""
+    if not is_enabled():
+        return False
+    return _within(OccurrenceWindow.objects.filter(pk=1).first(), from_date, to_date)
+
+
+async def acovers(from_date, to_date):
+    """Async ``covers``"""
+    if not is_enabled():
+        return False
+    return _within(await OccurrenceWindow.objects.filter(pk=1).afirst(), from_date, to_date)
+
+
+def _within(recorded, from_date, to_date):
+    # Edits only regenerate rows from today on, so earlier rows may be stale
+    if recorded is None:
+        return False
+    return max(recorded.from_date, date.today()) <= from_date and to_date <= recorded.to_date
+
+
+def regenerate(wards, from_date=None, to_date=None):
+    """
+    Bring materialized rows for ``wards`` between ``from_date`` and
+    ``to_date`` (defaulting to the rolling window) in line with their
+    schedules and meetings.
+
+    Rows are diffed against what is stored and written with
+    ``bulk_create``/``bulk_update``/one delete, so unchanged occurrences cost
+    nothing. Returns ``(created, updated, deleted)`` counts.
+    """
+    wards = list(wards)
+    if not wards:
+        return 0, 0, 0
+    default_from, default_to = window()
+    from_date = from_date or default_from
+    to_date = to_date or default_to
+    ward_ids = [ward.id for ward in wards]
+
+    meetings = Meeting.objects.filter(
+        ward_id__in=ward_ids, meeting_date__range=(from_date, to_date)
+    ).only('id', 'ward_id', 'meeting_date', 'meeting_time', 'venue', 'is_cancelled').order_by()
+    expected = {
+        (occurrence.ward_id, occurrence.meeting_date): occurrence
+        for occurrence in expand_occurrences(wards, meetings, from_date, to_date)
+    }
+
+    with transaction.atomic():
+        existing = MeetingOccurrence.objects.select_for_update().filter(
+            ward_id__in=ward_ids, meeting_date__range=(from_date, to_date)
+        ).order_by()
+
+        to_update = []
+        stale_ids = []
+        for row in existing:
+            occurrence = expected.pop((row.ward_id, row.meeting_date), None)
+            if occurrence is None:
+                stale_ids.append(row.id)
+            elif _apply(row, occurrence):
+                to_update.append(row)
+
+        to_create = [
+            MeetingOccurrence(ward_id=occurrence.ward_id, meeting_date=occurrence.meeting_date)
+            for occurrence in expected.values()
+        ]
+        for row, occurrence in zip(to_create, expected.values()):
+            _apply(row, occurrence)
+
+        if stale_ids:
+            MeetingOccurrence.objects.filter(id__in=stale_ids).delete()
+        if to_update:
+            MeetingOccurrence.objects.bulk_update(to_update, ROW_FIELDS, batch_size=500)
+        if to_create:
+            MeetingOccurrence.objects.bulk_create(to_create, batch_size=500)
+
+    return len(to_create), len(to_update), len(stale_ids)
+
+
+def rows(from_date, to_date, ward_ids=None, time_from=None, time_to=None):
+    """Materialized rows for a range as ``Occurrence`` argument tuples"""
+    queryset = MeetingOccurrence.objects.filter(meeting_date__range=(from_date, to_date))
+    if ward_ids:
+        queryset = queryset.filter(ward_id__in=ward_ids)
+    queryset = filter_time_range(queryset, time_from, time_to)
+    return queryset.values_list(
+        'ward_id', 'ward__ward_name', 'meeting_date', 'meeting_time', 'venue',
+        'is_cancelled', 'is_scheduled', 'meeting_id',
+    ).order_by('meeting_date', 'ward_id')
+
+
+def load(from_date, to_date, ward_ids=None, time_from=None, time_to=None):
+    """Read materialized occurrences for a range as ``Occurrence`` objects"""
+    return [Occurrence(*row) for row in rows(from_date, to_date, ward_ids, time_from, time_to)]
+
+
+_as_row = attrgetter(*(field.name for field in fields(Occurrence)))
+
+
+def occurrence_rows(from_date, to_date, ward_ids=None, time_from=None, time_to=None):
+    """Like ``occurrences``, as ``Occurrence`` argument tuples"""
+    if covers(from_date, to_date):
+        return list(rows(from_date, to_date, ward_ids, time_from, time_to))
+    wards, meetings = occurrence_querysets(from_date, to_date, ward_ids)
+    occurrences = select_times(expand_occurrences(wards, meetings, from_date, to_date), time_from, time_to)
+    return [_as_row(occurrence) for occurrence in occurrences]
+
+
+def occurrence_querysets(from_date, to_date, ward_ids):
+    """Wards and stored meetings needed to expand occurrences for a range"""
+    wards = Ward.objects.filter(start_date__lte=to_date).only(
+        'id', 'ward_name', 'meeting_time', 'venue', 'frequency_weeks', 'start_date'
+    )
+    meetings = Meeting.objects.filter(meeting_date__range=(from_date, to_date)).only(
+        'id', 'ward_id', 'meeting_date', 'meeting_time', 'venue', 'is_cancelled'
+    ).order_by()
+    if ward_ids:
+        wards = wards.filter(id__in=ward_ids)
+        meetings = meetings.filter(ward_id__in=ward_ids)
+    return wards, meetings
+
+
+def occurrences(from_date, to_date, ward_ids=None, time_from=None, time_to=None):
+    """
+    Expanded occurrences for a range, optionally limited to meeting times
+    from ``time_from`` to ``time_to``: read from the table (filtering times
+    in the database) when it covers the range, and computed otherwise
+    """
+    if covers(from_date, to_date):
+        return load(from_date, to_date, ward_ids, time_from, time_to)
+    wards, meetings = occurrence_querysets(from_date, to_date, ward_ids)
+    return select_times(expand_occurrences(wards, meetings, from_date, to_date), time_from, time_to)
+
+
+def select_times(occurrences, time_from=None, time_to=None):
+    """Computed occurrences with meeting times from ``time_from`` to ``time_to``"""
+    if time_from is None and time_to is None:
+        return occurrences
+    return [
+        occurrence for occurrence in occurrences
+        if in_time_range(occurrence.meeting_time, time_from, time_to)
+    ]
+
+
+def _apply(row, occurrence):
+    """Copy occurrence fields onto a row, returning whether anything changed"""
+    changed = False
+    for field in ROW_FIELDS:
+        value = getattr(occurrence, field)
+        if getattr(row, field) != value:
+            setattr(row, field, value)
+            changed = True
+    return changed
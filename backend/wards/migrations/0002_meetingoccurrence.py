@@ -0,0 +1,38 @@
+# Generated by Django 4.2 on 2026-10-18 12:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wards', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MeetingOccurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('meeting_date', models.DateField()),
+                ('meeting_time', models.CharField(max_length=20)),
+                ('venue', models.CharField(max_length=255)),
+                ('is_cancelled', models.BooleanField(default=False)),
+                ('is_scheduled', models.BooleanField(default=True)),
+                ('meeting', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='wards.meeting')),
+                ('ward', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occurrences', to='wards.ward')),
+            ],
+            options={
+                'ordering': ['meeting_date', 'ward'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='meetingoccurrence',
+            index=models.Index(fields=['meeting_date', 'ward'], name='wards_occ_date_ward_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='meetingoccurrence',
+            unique_together={('ward', 'meeting_date')},
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-18 12:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wards', '0002_meetingoccurrence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='meeting',
+            index=models.Index(fields=['ward', 'meeting_date', 'id'], name='wards_meeting_ward_date_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    Add TimeField copies of the free-text meeting times (filled by 0005).
+    The old columns become nullable so that migrating backwards can re-add
+    them before their values are restored.
+    """
+
+    dependencies = [
+        ('wards', '0003_meeting_ward_date_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ward',
+            name='meeting_time',
+            field=models.CharField(max_length=20, null=True),
+        ),
+        migrations.AlterField(
+            model_name='meeting',
+            name='meeting_time',
+            field=models.CharField(max_length=20, null=True),
+        ),
+        migrations.AlterField(
+            model_name='meetingoccurrence',
+            name='meeting_time',
+            field=models.CharField(max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='ward',
+            name='meeting_start',
+            field=models.TimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='meeting',
+            name='meeting_start',
+            field=models.TimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='meetingoccurrence',
+            name='meeting_start',
+            field=models.TimeField(null=True),
+        ),
+    ]
@@ -0,0 +1,86 @@
+import re
+from datetime import datetime
+from django.db import migrations
+
+# Copies of wards.times as of this migration, so later changes there cannot
+# change what it does
+TIME_FORMATS = ('%I:%M %p', '%I:%M%p', '%I %p', '%I%p', '%H:%M', '%H:%M:%S')
+
+
+def parse_meeting_time(value):
+    if not value:
+        return None
+    text = re.sub(r'(?<=\d)\.(?=\d)', ':', str(value))
+    text = ' '.join(text.replace('.', '').upper().split())
+    for fmt in TIME_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).time()
+        except ValueError:
+            continue
+    return None
+
+
+def format_meeting_time(value):
+    if value is None:
+        return ''
+    return value.strftime('%I:%M %p').lstrip('0')
+
+
+# Models whose times are entered by people; an unparseable one stops the
+# migration instead of being lost. Materialized occurrences are derived from
+# them and regenerated, so theirs simply become NULL.
+SOURCE_MODELS = ('Ward', 'Meeting')
+DERIVED_MODELS = ('MeetingOccurrence',)
+
+
+def parse_times(apps, schema_editor):
+    """
+    Parse the free-text times with one UPDATE per distinct spelling, which is
+    a handful of statements however many rows there are. Blank times become
+    NULL (an all-day meeting).
+    """
+    spellings = {}
+    for name in SOURCE_MODELS + DERIVED_MODELS:
+        model = apps.get_model('wards', name)
+        values = model.objects.order_by().values_list('meeting_time', flat=True).distinct()
+        spellings[name] = {text: parse_meeting_time(text) for text in values}
+
+    unparsed = [
+        f'{name} "{text}" ({apps.get_model("wards", name).objects.filter(meeting_time=text).count()} rows)'
+        for name in SOURCE_MODELS
+        for text, value in sorted(spellings[name].items(), key=lambda item: str(item[0]))
+        if value is None and text and text.strip()
+    ]
+    if unparsed:
+        raise RuntimeError(
+            'Cannot parse these meeting times: ' + ', '.join(unparsed) + '. '
+            'Correct them (or blank them for an all-day meeting) and migrate again.'
+        )
+
+    for name, parsed in spellings.items():
+        model = apps.get_model('wards', name)
+        for text, value in parsed.items():
+            if value is not None:
+                model.objects.filter(meeting_time=text).update(meeting_start=value)
+
+
+def format_times(apps, schema_editor):
+    for name in SOURCE_MODELS + DERIVED_MODELS:
+        model = apps.get_model('wards', name)
+        times = model.objects.order_by().values_list('meeting_start', flat=True).distinct()
+        for value in list(times):
+            if value is None:
+                model.objects.filter(meeting_start__isnull=True).update(meeting_time='')
+            else:
+                model.objects.filter(meeting_start=value).update(meeting_time=format_meeting_time(value))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wards', '0004_meeting_time_timefield'),
+    ]
+
+    operations = [
+        migrations.RunPython(parse_times, format_times),
+    ]
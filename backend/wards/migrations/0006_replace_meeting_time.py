@@ -0,0 +1,30 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Replace the free-text meeting times with the parsed TimeFields"""
+
+    dependencies = [
+        ('wards', '0005_parse_meeting_times'),
+    ]
+
+    operations = [
+        migrations.RemoveField(model_name='ward', name='meeting_time'),
+        migrations.RemoveField(model_name='meeting', name='meeting_time'),
+        migrations.RemoveField(model_name='meetingoccurrence', name='meeting_time'),
+        migrations.RenameField(model_name='ward', old_name='meeting_start', new_name='meeting_time'),
+        migrations.RenameField(model_name='meeting', old_name='meeting_start', new_name='meeting_time'),
+        migrations.RenameField(model_name='meetingoccurrence', old_name='meeting_start', new_name='meeting_time'),
+        migrations.AddIndex(
+            model_name='ward',
+            index=models.Index(fields=['meeting_time'], name='wards_ward_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='meeting',
+            index=models.Index(fields=['meeting_date', 'meeting_time'], name='wards_meeting_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='meetingoccurrence',
+            index=models.Index(fields=['meeting_date', 'meeting_time'], name='wards_occ_date_time_idx'),
+        ),
+    ]
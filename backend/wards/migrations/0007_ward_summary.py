@@ -0,0 +1,33 @@
+# Generated by Django 4.2 on 2026-10-18 12:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wards', '0006_replace_meeting_time'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WardSummary',
+            fields=[
+                ('ward', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='wards.ward')),
+                ('ward_name', models.CharField(max_length=255)),
+                ('venue', models.CharField(max_length=255)),
+                ('meeting_day', models.CharField(max_length=10)),
+                ('meeting_time', models.TimeField(null=True)),
+                ('frequency_weeks', models.IntegerField()),
+                ('next_meeting', models.DateField(null=True)),
+                ('upcoming_count', models.PositiveIntegerField(default=0)),
+                ('cancelled_count', models.PositiveIntegerField(default=0)),
+                ('as_of', models.DateField()),
+            ],
+            options={
+                'verbose_name_plural': 'ward summaries',
+                'ordering': ['ward'],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-18 12:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wards', '0007_ward_summary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='meeting',
+            index=models.Index(fields=['meeting_date', 'id'], name='wards_meeting_date_id_idx'),
+        ),
+    ]
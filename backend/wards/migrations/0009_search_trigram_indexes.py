@@ -0,0 +1,44 @@
+import logging
+from django.db import DatabaseError, migrations, transaction
+
+logger = logging.getLogger('wards')
+
+# Expression indexes matching the SQL of ``icontains`` on PostgreSQL
+# (``UPPER(column::text) LIKE UPPER(%s)``), used by the admin searches
+INDEXES = [
+    ('wards_ward_name_trgm_idx', 'wards_ward', 'ward_name'),
+    ('wards_meeting_venue_trgm_idx', 'wards_meeting', 'venue'),
+]
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except DatabaseError as exc:
+        logger.warning('pg_trgm is not available, admin search stays unindexed: %s', exc)
+        return
+    for name, table, column in INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (UPPER({column}::text) gin_trgm_ops)'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wards', '0008_meeting_date_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2 on 2026-10-18 12:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wards', '0010_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('ward', 'Ward'), ('meeting', 'Meeting')], max_length=10)),
+                ('object_id', models.CharField(max_length=50)),
+                ('ward_id', models.CharField(max_length=50)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['deleted_at', 'id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='meeting',
+            index=models.Index(fields=['updated_at', 'id'], name='wards_meeting_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ward',
+            index=models.Index(fields=['updated_at', 'id'], name='wards_ward_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['deleted_at', 'id'], name='wards_tombstone_deleted_idx'),
+        ),
+    ]
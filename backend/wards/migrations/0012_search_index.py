@@ -0,0 +1,96 @@
+import logging
+from django.db import DatabaseError, migrations, transaction
+
+logger = logging.getLogger('wards')
+
+# Copies of the DDL in wards.search as of this migration, so later changes
+# there cannot change what it does
+
+# SQLite: FTS5 tables kept in step by triggers
+SQLITE_TABLES = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS wards_ward_fts USING fts5("
+    "ward_id UNINDEXED, ward_name, venue, tokenize='unicode61 remove_diacritics 2')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS wards_meeting_fts USING fts5("
+    "venue, agenda, notes, content='wards_meeting', content_rowid='id', "
+    "tokenize='porter unicode61 remove_diacritics 2')",
+]
+SQLITE_TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS wards_ward_fts_insert AFTER INSERT ON wards_ward BEGIN "
+    "INSERT INTO wards_ward_fts (ward_id, ward_name, venue) VALUES (new.id, new.ward_name, new.venue); END",
+    "CREATE TRIGGER IF NOT EXISTS wards_ward_fts_delete AFTER DELETE ON wards_ward BEGIN "
+    "DELETE FROM wards_ward_fts WHERE ward_id = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS wards_ward_fts_update AFTER UPDATE OF id, ward_name, venue ON wards_ward BEGIN "
+    "DELETE FROM wards_ward_fts WHERE ward_id = old.id; "
+    "INSERT INTO wards_ward_fts (ward_id, ward_name, venue) VALUES (new.id, new.ward_name, new.venue); END",
+    "CREATE TRIGGER IF NOT EXISTS wards_meeting_fts_insert AFTER INSERT ON wards_meeting BEGIN "
+    "INSERT INTO wards_meeting_fts (rowid, venue, agenda, notes) "
+    "VALUES (new.id, new.venue, new.agenda, new.notes); END",
+    "CREATE TRIGGER IF NOT EXISTS wards_meeting_fts_delete AFTER DELETE ON wards_meeting BEGIN "
+    "INSERT INTO wards_meeting_fts (wards_meeting_fts, rowid, venue, agenda, notes) "
+    "VALUES ('delete', old.id, old.venue, old.agenda, old.notes); END",
+    "CREATE TRIGGER IF NOT EXISTS wards_meeting_fts_update AFTER UPDATE OF id, venue, agenda, notes "
+    "ON wards_meeting BEGIN "
+    "INSERT INTO wards_meeting_fts (wards_meeting_fts, rowid, venue, agenda, notes) "
+    "VALUES ('delete', old.id, old.venue, old.agenda, old.notes); "
+    "INSERT INTO wards_meeting_fts (rowid, venue, agenda, notes) "
+    "VALUES (new.id, new.venue, new.agenda, new.notes); END",
+]
+SQLITE_FILL = [
+    'INSERT INTO wards_ward_fts (ward_id, ward_name, venue) SELECT id, ward_name, venue FROM wards_ward',
+    "INSERT INTO wards_meeting_fts (wards_meeting_fts) VALUES ('rebuild')",
+]
+SQLITE_DROP = [
+    f'DROP TRIGGER IF EXISTS wards_{kind}_fts_{event}'
+    for kind in ('ward', 'meeting') for event in ('insert', 'delete', 'update')
+] + ['DROP TABLE IF EXISTS wards_ward_fts', 'DROP TABLE IF EXISTS wards_meeting_fts']
+
+# PostgreSQL: GIN indexes on the tsvector documents the search queries use
+POSTGRES_INDEXES = [
+    (
+        'wards_ward_search_idx', 'wards_ward',
+        "setweight(to_tsvector('simple', ward_name), 'A') || setweight(to_tsvector('simple', venue), 'B')",
+    ),
+    (
+        'wards_meeting_search_idx', 'wards_meeting',
+        "setweight(to_tsvector('english', coalesce(agenda, '') || ' ' || coalesce(notes, '')), 'A') || "
+        "setweight(to_tsvector('english', venue), 'B')",
+    ),
+]
+
+
+def create_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for name, table, document in POSTGRES_INDEXES:
+            schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (({document}))')
+    elif vendor == 'sqlite':
+        try:
+            with transaction.atomic(using=schema_editor.connection.alias):
+                for sql in SQLITE_TABLES:
+                    schema_editor.execute(sql)
+        except DatabaseError as exc:
+            logger.warning('SQLite has no FTS5, search stays unindexed: %s', exc)
+            return
+        for sql in SQLITE_TRIGGERS + SQLITE_FILL:
+            schema_editor.execute(sql)
+
+
+def drop_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for name, _, _ in POSTGRES_INDEXES:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+    elif vendor == 'sqlite':
+        for sql in SQLITE_DROP:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wards', '0011_sync_tombstones'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2 on 2026-10-18 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wards', '0012_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OccurrenceWindow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_date', models.DateField()),
+                ('to_date', models.DateField()),
+                ('materialized_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-18 13:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wards', '0013_occurrence_window'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['ward_id', 'deleted_at'], name='wards_tombstone_ward_idx'),
+        ),
+    ]
@@ -18,7 +18,7 @@ class Ward(models.Model):
     id = models.CharField(max_length=50, primary_key=True)  # ward-1, ward-2, etc.
     ward_name = models.CharField(max_length=255, unique=True)
     meeting_day = models.CharField(max_length=10, choices=DAYS_CHOICES)
-    meeting_time = models.CharField(max_length=20)  # e.g., "5:00 PM"
+    meeting_time = models.TimeField(null=True)  # Shown as "5:00 PM"; null when unknown
     venue = models.CharField(max_length=255)
     frequency_weeks = models.IntegerField(default=2)  # Every 2 weeks
     start_date = models.DateField()  # ISO format: YYYY-MM-DD
@@ -31,6 +31,11 @@ class Ward(models.Model):
     
     class Meta:
         ordering = ['id']
+        indexes = [
+            models.Index(fields=['meeting_time'], name='wards_ward_time_idx'),
+            # Serves the delta sync's (updated_at, id) keyset
+            models.Index(fields=['updated_at', 'id'], name='wards_ward_updated_idx'),
+        ]
     
     def __str__(self):
         return self.ward_name
@@ -42,7 +47,7 @@ class Meeting(models.Model):
     """
     ward = models.ForeignKey(Ward, on_delete=models.CASCADE, related_name='meetings')
     meeting_date = models.DateField()
-    meeting_time = models.CharField(max_length=20)
+    meeting_time = models.TimeField(null=True)
     venue = models.CharField(max_length=255)
     agenda = models.TextField(blank=True, null=True)
     notes = models.TextField(blank=True, null=True)
@@ -54,6 +59,154 @@ class Meeting(models.Model):
     class Meta:
         ordering = ['-meeting_date']
         unique_together = ['ward', 'meeting_date']
+        indexes = [
+            # Serves keyset pages over (meeting_date, id) within a ward
+            models.Index(fields=['ward', 'meeting_date', 'id'], name='wards_meeting_ward_date_idx'),
+            # Serves time-of-day windows over a date range
+            models.Index(fields=['meeting_date', 'meeting_time'], name='wards_meeting_date_time_idx'),
+            # Serves the admin changelist's date order and date hierarchy
+            models.Index(fields=['meeting_date', 'id'], name='wards_meeting_date_id_idx'),
+            # Serves the delta sync's (updated_at, id) keyset
+            models.Index(fields=['updated_at', 'id'], name='wards_meeting_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.ward.ward_name} - {self.meeting_date}"
+
+
+class MeetingOccurrence(models.Model):
+    """
+    Materialized meeting occurrence, pre-expanded from a ward's schedule and
+    its meeting overrides for a rolling window (see ``wards.materialize``)
+    """
+    ward = models.ForeignKey(Ward, on_delete=models.CASCADE, related_name='occurrences')
+    meeting = models.ForeignKey(Meeting, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    meeting_date = models.DateField()
+    meeting_time = models.TimeField(null=True)
+    venue = models.CharField(max_length=255)
+    is_cancelled = models.BooleanField(default=False)
+    is_scheduled = models.BooleanField(default=True)
+
+    class Meta:
+        ordering = ['meeting_date', 'ward']
+        unique_together = ['ward', 'meeting_date']
+        indexes = [
+            models.Index(fields=['meeting_date', 'ward'], name='wards_occ_date_ward_idx'),
+            models.Index(fields=['meeting_date', 'meeting_time'], name='wards_occ_date_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.ward_id} - {self.meeting_date}"
+
+
+class OccurrenceWindow(models.Model):
+    """
+    Date range ``MeetingOccurrence`` was last materialized for across every
+    ward, written by ``extend_occurrences``. A single row with ``id`` 1.
+    """
+    from_date = models.DateField()
+    to_date = models.DateField()
+    materialized_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.from_date} - {self.to_date}"
+
+
+class WardSummary(models.Model):
+    """
+    Denormalized summary of a ward and its upcoming meetings, recomputed by
+    ``wards.summaries`` whenever the ward or one of its meetings changes
+    """
+    ward = models.OneToOneField(Ward, on_delete=models.CASCADE, primary_key=True, related_name='summary')
+    ward_name = models.CharField(max_length=255)
+    venue = models.CharField(max_length=255)
+    meeting_day = models.CharField(max_length=10)
+    meeting_time = models.TimeField(null=True)
+    frequency_weeks = models.IntegerField()
+    next_meeting = models.DateField(null=True)
+    upcoming_count = models.PositiveIntegerField(default=0)
+    cancelled_count = models.PositiveIntegerField(default=0)
+    as_of = models.DateField()  # Day the meeting fields were computed for
+
+    class Meta:
+        ordering = ['ward']
+        verbose_name_plural = 'ward summaries'
+
+    def __str__(self):
+        return f"{self.ward_id} summary"
+
+
+class Tombstone(models.Model):
+    """
+    Record of a deleted ward or meeting, so delta sync clients (see
+    ``wards.sync``) learn about deletions
+    """
+    WARD = 'ward'
+    MEETING = 'meeting'
+    KIND_CHOICES = [
+        (WARD, 'Ward'),
+        (MEETING, 'Meeting'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.CharField(max_length=50)
+    ward_id = models.CharField(max_length=50)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['deleted_at', 'id']
+        indexes = [
+            models.Index(fields=['deleted_at', 'id'], name='wards_tombstone_deleted_idx'),
+            # Serves a ward's latest deletion in the conditional GET validators
+            models.Index(fields=['ward_id', 'deleted_at'], name='wards_tombstone_ward_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} deleted"
+
+
+class Job(models.Model):
+    """
+    Background job in the database-backed queue (see ``wards.jobs``). A
+    queued job with an ``idempotency_key`` stands in for every later enqueue
+    with the same key until a worker picks it up.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    task = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    idempotency_key = models.CharField(max_length=255, null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField()
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            # Serves the worker's claim query over due jobs
+            models.Index(fields=['status', 'run_after', 'id'], name='wards_job_due_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['idempotency_key'], condition=models.Q(status='queued'), name='wards_job_queued_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
@@ -0,0 +1,155 @@
+"""
+Pagination classes for the wards app (API and admin)
+"""
+import base64
+from datetime import date
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class MeetingKeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination over ``(meeting_date, id)``.
+
+    Each page is fetched with ``WHERE (meeting_date, id) > cursor ... LIMIT n``
+    instead of an OFFSET, so any page costs the same no matter how much
+    history precedes it. ``?ordering=meeting_date`` walks forwards in time,
+    the default ``-meeting_date`` walks backwards.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    ordering_query_param = 'ordering'
+    page_size = api_settings.PAGE_SIZE or 100
+    max_page_size = 500
+    invalid_cursor_message = 'Invalid cursor.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.page_queryset(queryset, request)))
+
+    def page_queryset(self, queryset, request):
+        """
+        Order, filter and slice ``queryset`` to the requested page plus one
+        row, which tells whether there is a next page. Evaluate it and pass
+        the rows to ``set_page``, with a ``cursor`` function returning the
+        ``(meeting_date, id)`` of a row unless the rows are meetings.
+        """
+        self.request = request
+        self.descending = request.query_params.get(self.ordering_query_param, '-meeting_date') != 'meeting_date'
+        self.limit = self.get_page_size(request)
+
+        if self.descending:
+            queryset = queryset.order_by('-meeting_date', '-id')
+        else:
+            queryset = queryset.order_by('meeting_date', 'id')
+
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            meeting_date, meeting_id = cursor
+            if self.descending:
+                queryset = queryset.filter(
+                    Q(meeting_date__lt=meeting_date) | Q(meeting_date=meeting_date, id__lt=meeting_id)
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(meeting_date__gt=meeting_date) | Q(meeting_date=meeting_date, id__gt=meeting_id)
+                )
+
+        return queryset[:self.limit + 1]
+
+    def set_page(self, rows, cursor=None):
+        self.cursor = cursor or (lambda meeting: (meeting.meeting_date, meeting.id))
+        self.has_next = len(rows) > self.limit
+        self.page = rows[:self.limit]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded.encode('ascii')).decode('ascii')
+            meeting_date, meeting_id = raw.split('|')
+            return date.fromisoformat(meeting_date), int(meeting_id)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, meeting_date, meeting_id):
+        raw = f'{meeting_date.isoformat()}|{meeting_id}'
+        return base64.urlsafe_b64encode(raw.encode('ascii')).decode('ascii')
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(*self.cursor(self.page[-1])))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Django paginator that, for unfiltered querysets over large tables, takes
+    the row count from the database's statistics instead of ``COUNT(*)``,
+    which has to read the whole table. Counts below ``threshold`` rows, of
+    filtered querysets, or without statistics (PostgreSQL before its first
+    ``ANALYZE``; SQLite without ``ANALYZE``) are exact.
+    """
+    threshold = 100000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.where:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= self.threshold:
+                return estimate
+        return super().count
+
+
+def estimated_count(model, using='default'):
+    """Row count of a model's table from planner statistics, or None"""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [table])
+        elif connection.vendor == 'sqlite':
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            # The first number of an index's stat is the table's row count
+            cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None or row[0] is None:
+        return None
+    estimate = int(float(str(row[0]).split()[0]))
+    return estimate if estimate >= 0 else None
@@ -0,0 +1,196 @@
+"""
+Recurrence engine for ward meeting schedules.
+
+Every ward meets once every ``frequency_weeks`` weeks, starting on its
+``start_date``. Occurrences are expanded arithmetically on date ordinals, so
+jumping to the first meeting inside a range is O(1) and every following
+occurrence costs one addition. Stored ``Meeting`` rows are then merged in as
+overrides (cancellations, venue/time changes, extra meetings).
+
+``next_meeting_dates`` computes the next few meetings of many wards at once,
+as one NumPy array operation (NumPy is a requirement; without it a pure Python
+path gives the same result). NumPy is imported on first use, as it is slow to
+import and most processes never need it.
+"""
+from dataclasses import dataclass
+from datetime import date, time, timedelta
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+DAYS_PER_WEEK = 7
+
+# Default window used when a client does not pass ``to``
+DEFAULT_RANGE_DAYS = 90
+
+# Upper bound on a single range request, to keep responses bounded
+MAX_RANGE_DAYS = 366 * 3
+
+
+@dataclass
+class Occurrence:
+    """A single (possibly overridden) meeting of a ward on a given date"""
+    ward_id: str
+    ward_name: str
+    meeting_date: date
+    meeting_time: Optional[time]
+    venue: str
+    is_cancelled: bool = False
+    is_scheduled: bool = True
+    meeting_id: Optional[int] = None
+
+
+def schedule_ordinals(start_date: date, frequency_weeks: int,
+                      from_date: date, to_date: date) -> range:
+    """
+    Return the date ordinals of scheduled meetings between ``from_date`` and
+    ``to_date`` (both inclusive) as a ``range``.
+
+    A non-positive ``frequency_weeks`` is treated as a one-off meeting on
+    ``start_date``.
+    """
+    start = start_date.toordinal()
+    first = max(from_date.toordinal(), start)
+    last = to_date.toordinal()
+
+    if frequency_weeks <= 0:
+        return range(start, start + 1) if first <= start <= last else range(0)
+
+    step = frequency_weeks * DAYS_PER_WEEK
+    # Ceiling division finds the first occurrence on or after ``first``
+    intervals = -(-(first - start) // step)
+    return range(start + intervals * step, last + 1, step)
+
+
+def is_scheduled_date(start_date: date, frequency_weeks: int, meeting_date: date) -> bool:
+    """Whether a ward's regular schedule has a meeting on ``meeting_date``"""
+    days = (meeting_date - start_date).days
+    if frequency_weeks <= 0:
+        return days == 0
+    return days >= 0 and days % (frequency_weeks * DAYS_PER_WEEK) == 0
+
+
+def schedule_dates(start_date: date, frequency_weeks: int,
+                   from_date: date, to_date: date) -> Iterator[date]:
+    """Yield scheduled meeting dates between ``from_date`` and ``to_date``"""
+    for ordinal in schedule_ordinals(start_date, frequency_weeks, from_date, to_date):
+        yield date.fromordinal(ordinal)
+
+
+@lru_cache(maxsize=None)
+def _numpy():
+    try:
+        import numpy
+    except ImportError:  # Optional: next_meeting_dates falls back to pure Python
+        return None
+    return numpy
+
+
+def next_meeting_dates(start_ordinals: Sequence[int], frequencies: Sequence[int],
+                       as_of: int, count: int) -> List[List[str]]:
+    """
+    Return, for every ward, the ISO dates of its next ``count`` scheduled
+    meetings on or after the ordinal ``as_of``. Ward ``i`` is described by
+    ``start_ordinals[i]`` and ``frequencies[i]`` (weeks); a one-off schedule
+    yields at most its start date.
+
+    Wards share most of their dates, so each distinct date is formatted once.
+    """
+    numpy = _numpy() if len(start_ordinals) else None
+    if numpy is None:
+        labels = {}
+        return [
+            [labels.get(ordinal) or labels.setdefault(ordinal, date.fromordinal(ordinal).isoformat())
+             for ordinal in _next_ordinals(start, frequency_weeks, as_of, count)]
+            for start, frequency_weeks in zip(start_ordinals, frequencies)
+        ]
+
+    starts = numpy.asarray(start_ordinals, dtype=numpy.int64)
+    steps = numpy.asarray(frequencies, dtype=numpy.int64) * DAYS_PER_WEEK
+    recurring = steps > 0
+    safe_steps = numpy.where(recurring, steps, 1)
+    # Ceiling division, as in schedule_ordinals; wards not started yet begin at their start
+    intervals = numpy.maximum(-((starts - as_of) // safe_steps), 0)
+    firsts = starts + intervals * safe_steps
+    grid = firsts[:, None] + safe_steps[:, None] * numpy.arange(count, dtype=numpy.int64)
+
+    # Format every date of the covered span once, then gather the labels
+    first, last = int(grid.min()), int(grid.max())
+    labels = numpy.array(
+        [date.fromordinal(ordinal).isoformat() for ordinal in range(first, last + 1)], dtype=object
+    )
+    dates = labels[grid - first].tolist()
+
+    for index in numpy.flatnonzero(~recurring).tolist():
+        dates[index] = [
+            date.fromordinal(ordinal).isoformat()
+            for ordinal in _next_ordinals(start_ordinals[index], 0, as_of, count)
+        ]
+    return dates
+
+
+def _next_ordinals(start: int, frequency_weeks: int, as_of: int, count: int) -> List[int]:
+    if frequency_weeks <= 0:
+        return [start] if start >= as_of and count > 0 else []
+    step = frequency_weeks * DAYS_PER_WEEK
+    first = start + max(-((start - as_of) // step), 0) * step
+    return list(range(first, first + count * step, step))
+
+
+def expand_occurrences(wards: Iterable, meetings: Iterable,
+                       from_date: date, to_date: date) -> List[Occurrence]:
+    """
+    Expand ward schedules between ``from_date`` and ``to_date`` and merge in
+    stored meetings.
+
+    ``meetings`` should already be restricted to the same date range. A
+    meeting that falls on a scheduled date replaces that occurrence; a meeting
+    on any other date is added as an unscheduled occurrence. The result is
+    ordered by date, then ward id.
+    """
+    overrides = {}
+    for meeting in meetings:
+        overrides[(meeting.ward_id, meeting.meeting_date)] = meeting
+
+    occurrences = []
+    ward_names = {}
+    for ward in wards:
+        ward_names[ward.id] = ward.ward_name
+        for meeting_date in schedule_dates(ward.start_date, ward.frequency_weeks, from_date, to_date):
+            meeting = overrides.pop((ward.id, meeting_date), None)
+            if meeting is None:
+                occurrences.append(Occurrence(
+                    ward_id=ward.id,
+                    ward_name=ward.ward_name,
+                    meeting_date=meeting_date,
+                    meeting_time=ward.meeting_time,
+                    venue=ward.venue,
+                ))
+            else:
+                occurrences.append(_from_meeting(meeting, ward.ward_name, is_scheduled=True))
+
+    # Whatever is left are meetings held outside the regular schedule
+    for (ward_id, _), meeting in overrides.items():
+        if ward_id in ward_names:
+            occurrences.append(_from_meeting(meeting, ward_names[ward_id], is_scheduled=False))
+
+    occurrences.sort(key=lambda occurrence: (occurrence.meeting_date, occurrence.ward_id))
+    return occurrences
+
+
+def default_range(today: Optional[date] = None):
+    """Return the default ``(from_date, to_date)`` window starting today"""
+    today = today or date.today()
+    return today, today + timedelta(days=DEFAULT_RANGE_DAYS)
+
+
+def _from_meeting(meeting, ward_name: str, is_scheduled: bool) -> Occurrence:
+    return Occurrence(
+        ward_id=meeting.ward_id,
+        ward_name=ward_name,
+        meeting_date=meeting.meeting_date,
+        meeting_time=meeting.meeting_time,
+        venue=meeting.venue,
+        is_cancelled=meeting.is_cancelled,
+        is_scheduled=is_scheduled,
+        meeting_id=meeting.id,
+    )
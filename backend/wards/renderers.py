@@ -0,0 +1,74 @@
+"""
+Renderers for the wards app
+"""
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+from . import columnar
+
+try:
+    import msgpack
+except ImportError:  # Optional: only the MessagePack format needs it
+    msgpack = None
+
+
+class ICalendarRenderer(BaseRenderer):
+    """
+    Passes pre-rendered iCalendar text through content negotiation. Errors
+    (e.g. 404 for an unknown ward) are data, not a calendar, and go out as
+    JSON like every other API error.
+    """
+    media_type = 'text/calendar'
+    format = 'ics'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, str):
+            return data.encode(self.charset)
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = JSONRenderer.media_type
+        return JSONRenderer().render(data)
+
+
+class ColumnarJSONRenderer(JSONRenderer):
+    """JSON with ward, meeting and occurrence lists in columns (see ``wards.columnar``)"""
+    media_type = 'application/vnd.pdp.columnar+json'
+    format = 'columnar'
+    # Views build ``columnar.Table`` data for renderers that set this
+    columnar = True
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(columnar.encode(data), accepted_media_type, renderer_context)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """MessagePack of the columnar form, for clients that can decode it"""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+    columnar = True
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(columnar.encode(data), default=JSONEncoder().default)
+
+
+COLUMNAR_RENDERERS = [ColumnarJSONRenderer] + ([MessagePackRenderer] if msgpack is not None else [])
+
+# Renderers of the ward endpoints: the defaults, then the columnar formats
+WARD_RENDERERS = list(api_settings.DEFAULT_RENDERER_CLASSES) + COLUMNAR_RENDERERS
+
+
+def is_columnar(renderer):
+    return getattr(renderer, 'columnar', False)
+
+
+def requests_columnar(request):
+    """Whether a plain Django request asks for a columnar format"""
+    if request.GET.get(api_settings.URL_FORMAT_OVERRIDE) in {renderer.format for renderer in COLUMNAR_RENDERERS}:
+        return True
+    accept = request.headers.get('Accept', '')
+    return any(renderer.media_type in accept for renderer in COLUMNAR_RENDERERS)
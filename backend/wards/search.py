@@ -0,0 +1,408 @@
+"""
+Full-text search over wards and meetings for ``GET /api/wards/search/?q=``.
+
+Each database vendor has a backend:
+
+- SQLite: FTS5 tables. ``wards_ward_fts`` holds ward names and venues, and
+  ``wards_meeting_fts`` indexes the venue, agenda and notes of
+  ``wards_meeting`` (an external content table, so the text is not stored
+  twice). Triggers on the ward and meeting tables keep them in step with
+  every write, including bulk writes and upserts that bypass model signals.
+- PostgreSQL: GIN indexes on the ``tsvector`` expressions ``WARD_DOCUMENT``
+  and ``MEETING_DOCUMENT``, which the database maintains itself.
+- Anything else, or SQLite without FTS5: unranked ``icontains`` filters.
+
+Every word of the query must match. Meeting text is stemmed ("meetings"
+finds "meeting"); words are not matched by prefix, as reading every word
+that starts with a prefix costs far more than looking one word up. Meetings
+are ranked among the ``CANDIDATES`` most recent matches, so a word that
+occurs in most meetings costs no more than a rare one. Highlights are
+HTML-escaped fragments with matches in ``<mark>``.
+
+Migration 0012 creates the tables and indexes, and ``python manage.py
+rebuild_search_index`` recreates and refills them.
+"""
+import html
+import logging
+import re
+from django.db import DatabaseError, connection as default_connection, transaction
+from django.db.models import Q
+from .models import Meeting, Ward
+from .times import format_meeting_time
+
+logger = logging.getLogger('wards')
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Words of a query beyond this many are ignored
+MAX_TERMS = 8
+
+# Most recent matching meetings that are ranked
+CANDIDATES = 1000
+
+# Around matches in highlights, replaced by <mark> after escaping (private use characters)
+START, STOP = '\ue000', '\ue001'
+
+# Fields of each kind that are highlighted
+WARD_FIELDS = ('ward_name', 'venue')
+MEETING_FIELDS = ('venue', 'agenda', 'notes')
+
+# Indexed PostgreSQL documents: queries must use the same expressions
+WARD_DOCUMENT = (
+    "setweight(to_tsvector('simple', ward_name), 'A') || setweight(to_tsvector('simple', venue), 'B')"
+)
+MEETING_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(agenda, '') || ' ' || coalesce(notes, '')), 'A') || "
+    "setweight(to_tsvector('english', venue), 'B')"
+)
+
+
+def terms(query):
+    """Words of a search query, lower-cased"""
+    return re.findall(r'\w+', (query or '').lower())[:MAX_TERMS]
+
+
+def highlight(text):
+    """Escape a fragment marked with ``START``/``STOP`` and mark its matches in HTML"""
+    return html.escape(text, quote=False).replace(START, '<mark>').replace(STOP, '</mark>')
+
+
+def highlights(fields, fragments):
+    """Highlighted fragments of the fields that matched"""
+    return {field: highlight(fragment) for field, fragment in zip(fields, fragments) if fragment and START in fragment}
+
+
+class Backend:
+    """Unindexed search with ``icontains``, unranked"""
+    vendor = None
+    indexed = False
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def is_available(self):
+        return True
+
+    def install(self):
+        pass
+
+    def repair(self):
+        pass
+
+    def uninstall(self):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def search_wards(self, words, ward_ids, limit):
+        """``(id, score, highlights)`` of the best matching wards"""
+        wards = Ward.objects.all()
+        for word in words:
+            wards = wards.filter(Q(ward_name__icontains=word) | Q(venue__icontains=word))
+        if ward_ids:
+            wards = wards.filter(id__in=ward_ids)
+        return [
+            (ward_id, None, _mark_words(dict(zip(WARD_FIELDS, texts)), words))
+            for ward_id, *texts in wards.values_list('id', *WARD_FIELDS)[:limit]
+        ]
+
+    def search_meetings(self, words, ward_ids, limit):
+        """``(id, score, highlights)`` of the best matching meetings"""
+        meetings = Meeting.objects.order_by('-meeting_date', '-id')
+        for word in words:
+            meetings = meetings.filter(
+                Q(venue__icontains=word) | Q(agenda__icontains=word) | Q(notes__icontains=word)
+            )
+        if ward_ids:
+            meetings = meetings.filter(ward_id__in=ward_ids)
+        return [
+            (meeting_id, None, _mark_words(dict(zip(MEETING_FIELDS, texts)), words))
+            for meeting_id, *texts in meetings.values_list('id', *MEETING_FIELDS)[:limit]
+        ]
+
+    def execute(self, statements):
+        with self.connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+
+    def fetch(self, sql, params):
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+
+def _mark_words(texts, words):
+    """Highlights of texts matching ``words``, around the first match of each"""
+    pattern = re.compile('|'.join(re.escape(word) for word in words), re.IGNORECASE)
+    fragments = []
+    for text in texts.values():
+        match = pattern.search(text or '')
+        if match is None:
+            fragments.append(None)
+            continue
+        start = max(match.start() - 60, 0)
+        fragment = pattern.sub(lambda found: f'{START}{found.group(0)}{STOP}', text[start:match.end() + 100])
+        fragments.append(('…' if start else '') + fragment + ('…' if match.end() + 100 < len(text) else ''))
+    return highlights(texts, fragments)
+
+
+class SQLiteBackend(Backend):
+    """FTS5 tables kept in step by triggers"""
+    vendor = 'sqlite'
+    indexed = True
+
+    TABLES = [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS wards_ward_fts USING fts5("
+        "ward_id UNINDEXED, ward_name, venue, tokenize='unicode61 remove_diacritics 2')",
+        "CREATE VIRTUAL TABLE IF NOT EXISTS wards_meeting_fts USING fts5("
+        "venue, agenda, notes, content='wards_meeting', content_rowid='id', "
+        "tokenize='porter unicode61 remove_diacritics 2')",
+    ]
+    TRIGGERS = [
+        "CREATE TRIGGER IF NOT EXISTS wards_ward_fts_insert AFTER INSERT ON wards_ward BEGIN "
+        "INSERT INTO wards_ward_fts (ward_id, ward_name, venue) VALUES (new.id, new.ward_name, new.venue); END",
+        "CREATE TRIGGER IF NOT EXISTS wards_ward_fts_delete AFTER DELETE ON wards_ward BEGIN "
+        "DELETE FROM wards_ward_fts WHERE ward_id = old.id; END",
+        "CREATE TRIGGER IF NOT EXISTS wards_ward_fts_update AFTER UPDATE OF id, ward_name, venue ON wards_ward BEGIN "
+        "DELETE FROM wards_ward_fts WHERE ward_id = old.id; "
+        "INSERT INTO wards_ward_fts (ward_id, ward_name, venue) VALUES (new.id, new.ward_name, new.venue); END",
+        "CREATE TRIGGER IF NOT EXISTS wards_meeting_fts_insert AFTER INSERT ON wards_meeting BEGIN "
+        "INSERT INTO wards_meeting_fts (rowid, venue, agenda, notes) "
+        "VALUES (new.id, new.venue, new.agenda, new.notes); END",
+        "CREATE TRIGGER IF NOT EXISTS wards_meeting_fts_delete AFTER DELETE ON wards_meeting BEGIN "
+        "INSERT INTO wards_meeting_fts (wards_meeting_fts, rowid, venue, agenda, notes) "
+        "VALUES ('delete', old.id, old.venue, old.agenda, old.notes); END",
+        "CREATE TRIGGER IF NOT EXISTS wards_meeting_fts_update AFTER UPDATE OF id, venue, agenda, notes "
+        "ON wards_meeting BEGIN "
+        "INSERT INTO wards_meeting_fts (wards_meeting_fts, rowid, venue, agenda, notes) "
+        "VALUES ('delete', old.id, old.venue, old.agenda, old.notes); "
+        "INSERT INTO wards_meeting_fts (rowid, venue, agenda, notes) "
+        "VALUES (new.id, new.venue, new.agenda, new.notes); END",
+    ]
+    TRIGGER_NAMES = [
+        f'wards_{kind}_fts_{event}' for kind in ('ward', 'meeting') for event in ('insert', 'delete', 'update')
+    ]
+
+    def is_available(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ('wards_ward_fts', 'wards_meeting_fts')"
+            )
+            return cursor.fetchone()[0] == 2
+
+    def install(self):
+        try:
+            with transaction.atomic(using=self.connection.alias):
+                self.execute(self.TABLES)
+        except DatabaseError as exc:
+            logger.warning('SQLite has no FTS5, search stays unindexed: %s', exc)
+            return
+        self.execute(self.TRIGGERS)
+
+    def repair(self):
+        """Recreate triggers dropped with their table (SQLite rebuilds tables to alter them)"""
+        if self.is_available():
+            self.execute(self.TRIGGERS)
+
+    def uninstall(self):
+        self.execute([f'DROP TRIGGER IF EXISTS {name}' for name in self.TRIGGER_NAMES] + [
+            'DROP TABLE IF EXISTS wards_ward_fts', 'DROP TABLE IF EXISTS wards_meeting_fts',
+        ])
+
+    def rebuild(self):
+        self.execute([
+            'DELETE FROM wards_ward_fts',
+            'INSERT INTO wards_ward_fts (ward_id, ward_name, venue) SELECT id, ward_name, venue FROM wards_ward',
+            "INSERT INTO wards_meeting_fts (wards_meeting_fts) VALUES ('rebuild')",
+        ])
+
+    def match(self, words):
+        # Quoted, words are taken literally rather than as FTS5 syntax
+        return ' '.join(f'"{word}"' for word in words)
+
+    def search_wards(self, words, ward_ids, limit):
+        where, params = self._in('ward_id', ward_ids)
+        rows = self.fetch(
+            f"SELECT ward_id, bm25(wards_ward_fts, 0.0, 2.0, 1.0) AS score, {self._snippets('wards_ward_fts', 1, 2)} "
+            f"FROM wards_ward_fts WHERE wards_ward_fts MATCH %s{where} ORDER BY score LIMIT %s",
+            [self.match(words), *params, limit],
+        )
+        return [(ward_id, -score, highlights(WARD_FIELDS, fragments)) for ward_id, score, *fragments in rows]
+
+    def search_meetings(self, words, ward_ids, limit):
+        where, params = self._in('m.ward_id', ward_ids)
+        join = ' JOIN wards_meeting m ON m.id = wards_meeting_fts.rowid' if ward_ids else ''
+        # Scored in rowid order, newest first, which FTS5 reads without sorting
+        ranked = self.fetch(
+            "SELECT id, score FROM ("
+            "SELECT wards_meeting_fts.rowid AS id, bm25(wards_meeting_fts, 1.0, 2.0, 2.0) AS score "
+            f"FROM wards_meeting_fts{join} WHERE wards_meeting_fts MATCH %s{where} "
+            "ORDER BY wards_meeting_fts.rowid DESC LIMIT %s"
+            ") ORDER BY score, id DESC LIMIT %s",
+            [self.match(words), *params, CANDIDATES, limit],
+        )
+        if not ranked:
+            return []
+        # FTS5 looks up ``rowid = ?`` directly but reads every match for ``rowid IN (...)``
+        select = (
+            f"SELECT rowid, {self._snippets('wards_meeting_fts', 0, 1, 2)} FROM wards_meeting_fts "
+            "WHERE wards_meeting_fts MATCH %s AND rowid = %s"
+        )
+        match = self.match(words)
+        fragments = {
+            row[0]: row[1:] for row in self.fetch(
+                ' UNION ALL '.join([select] * len(ranked)),
+                [param for meeting_id, _ in ranked for param in (match, meeting_id)],
+            )
+        }
+        return [
+            (meeting_id, -score, highlights(MEETING_FIELDS, fragments.get(meeting_id, ())))
+            for meeting_id, score in ranked
+        ]
+
+    def _snippets(self, table, *columns):
+        return ', '.join(f"snippet({table}, {column}, '{START}', '{STOP}', '…', 12)" for column in columns)
+
+    def _in(self, column, values):
+        if not values:
+            return '', []
+        return f" AND {column} IN ({', '.join(['%s'] * len(values))})", list(values)
+
+
+class PostgresBackend(Backend):
+    """GIN indexes on ``tsvector`` expressions of the ward and meeting tables"""
+    vendor = 'postgresql'
+    indexed = True
+
+    INDEXES = [
+        ('wards_ward_search_idx', 'wards_ward', WARD_DOCUMENT),
+        ('wards_meeting_search_idx', 'wards_meeting', MEETING_DOCUMENT),
+    ]
+    HEADLINE_OPTIONS = f'StartSel={START}, StopSel={STOP}, MaxWords=24, MinWords=8, MaxFragments=2'
+
+    def install(self):
+        self.execute([
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (({document}))'
+            for name, table, document in self.INDEXES
+        ])
+
+    def uninstall(self):
+        self.execute([f'DROP INDEX IF EXISTS {name}' for name, _, _ in self.INDEXES])
+
+    def rebuild(self):
+        self.execute([f'REINDEX INDEX {name}' for name, _, _ in self.INDEXES])
+
+    def query(self, words):
+        return ' '.join(words)
+
+    def search_wards(self, words, ward_ids, limit):
+        where, params = self._in('id', ward_ids)
+        rows = self.fetch(
+            f"SELECT id, ts_rank_cd({WARD_DOCUMENT}, query) AS score, {self._headlines('simple', WARD_FIELDS)} "
+            f"FROM wards_ward, plainto_tsquery('simple', %s) query WHERE {WARD_DOCUMENT} @@ query{where} "
+            "ORDER BY score DESC, id LIMIT %s",
+            [self.query(words), *params, limit],
+        )
+        return [(ward_id, score, highlights(WARD_FIELDS, fragments)) for ward_id, score, *fragments in rows]
+
+    def search_meetings(self, words, ward_ids, limit):
+        where, params = self._in('ward_id', ward_ids)
+        query = self.query(words)
+        # Matches come from the index; only the newest CANDIDATES are ranked
+        ranked = self.fetch(
+            "SELECT id, ts_rank_cd(document, plainto_tsquery('english', %s)) AS score FROM ("
+            f"SELECT id, {MEETING_DOCUMENT} AS document FROM wards_meeting "
+            f"WHERE {MEETING_DOCUMENT} @@ plainto_tsquery('english', %s){where} ORDER BY id DESC LIMIT %s"
+            ") candidates ORDER BY score DESC, id DESC LIMIT %s",
+            [query, query, *params, CANDIDATES, limit],
+        )
+        if not ranked:
+            return []
+        fragments = {
+            row[0]: row[1:] for row in self.fetch(
+                f"SELECT id, {self._headlines('english', MEETING_FIELDS)} "
+                "FROM wards_meeting, plainto_tsquery('english', %s) query WHERE id = ANY(%s)",
+                [query, [meeting_id for meeting_id, _ in ranked]],
+            )
+        }
+        return [
+            (meeting_id, score, highlights(MEETING_FIELDS, fragments.get(meeting_id, ())))
+            for meeting_id, score in ranked
+        ]
+
+    def _headlines(self, config, fields):
+        return ', '.join(
+            f"ts_headline('{config}', coalesce({field}, ''), query, '{self.HEADLINE_OPTIONS}')" for field in fields
+        )
+
+    def _in(self, column, values):
+        if not values:
+            return '', []
+        return f' AND {column} = ANY(%s)', [list(values)]
+
+
+BACKENDS = {backend.vendor: backend for backend in (SQLiteBackend, PostgresBackend)}
+
+
+def get_backend(connection=None):
+    """The search backend for a connection (the default one unless given)"""
+    connection = connection or default_connection
+    return BACKENDS.get(connection.vendor, Backend)(connection)
+
+
+def search(query, ward_ids=None, limit=PAGE_SIZE):
+    """
+    Wards and meetings matching every word of ``query``, best first, as
+    JSON-ready dicts with a ``score`` (higher is better, None when unranked)
+    and ``highlights`` of the fields that matched
+    """
+    words = terms(query)
+    backend = get_backend()
+    if not backend.is_available():
+        backend = Backend(backend.connection)
+    found_wards = backend.search_wards(words, ward_ids, limit)
+    found_meetings = backend.search_meetings(words, ward_ids, limit)
+
+    wards = Ward.objects.in_bulk([ward_id for ward_id, _, _ in found_wards])
+    meetings = Meeting.objects.select_related('ward').only(
+        'id', 'ward_id', 'ward__ward_name', 'meeting_date', 'meeting_time', 'venue', 'is_cancelled'
+    ).in_bulk([meeting_id for meeting_id, _, _ in found_meetings])
+    return {
+        'query': ' '.join(words),
+        'wards': [
+            {
+                'id': ward.id,
+                'ward_name': ward.ward_name,
+                'venue': ward.venue,
+                'meeting_day': ward.meeting_day,
+                'meeting_time': format_meeting_time(ward.meeting_time),
+                'score': _score(score),
+                'highlights': marks,
+            }
+            for ward, score, marks in (
+                (wards.get(ward_id), score, marks) for ward_id, score, marks in found_wards
+            ) if ward is not None
+        ],
+        'meetings': [
+            {
+                'id': meeting.id,
+                'ward': meeting.ward_id,
+                'ward_name': meeting.ward.ward_name,
+                'meeting_date': meeting.meeting_date.isoformat(),
+                'meeting_time': format_meeting_time(meeting.meeting_time),
+                'venue': meeting.venue,
+                'is_cancelled': meeting.is_cancelled,
+                'score': _score(score),
+                'highlights': marks,
+            }
+            for meeting, score, marks in (
+                (meetings.get(meeting_id), score, marks) for meeting_id, score, marks in found_meetings
+            ) if meeting is not None
+        ],
+    }
+
+
+def _score(score):
+    return None if score is None else round(float(score), 4)
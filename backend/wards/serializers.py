@@ -1,17 +1,66 @@
 from rest_framework import serializers
 from .models import Ward, Meeting
+from .times import format_meeting_time, parse_meeting_time
 from datetime import datetime
 
+class MeetingTimeField(serializers.Field):
+    """
+    Meeting time stored as a ``TimeField`` and represented in the display
+    format ("5:00 PM"). Input may also be spelled "5pm" or "17:00"; null or
+    blank means the time is unknown.
+    """
+    default_error_messages = {
+        'invalid': 'Invalid time "{value}", expected a time like "5:00 PM".',
+    }
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('allow_null', True)
+        super().__init__(**kwargs)
+
+    def validate_empty_values(self, data):
+        # Exports write unknown times as '', so they must import again
+        if data == '':
+            data = None
+        return super().validate_empty_values(data)
+
+    def to_representation(self, value):
+        return format_meeting_time(value)
+
+    def to_internal_value(self, data):
+        value = parse_meeting_time(data)
+        if value is None:
+            self.fail('invalid', value=data)
+        return value
+
 class MeetingSerializer(serializers.ModelSerializer):
     meeting_date = serializers.DateField(format='%Y-%m-%d')
+    meeting_time = MeetingTimeField()
     
     class Meta:
         model = Meeting
         fields = ['id', 'meeting_date', 'meeting_time', 'venue', 'agenda', 'notes', 'is_cancelled']
 
-class WardSerializer(serializers.ModelSerializer):
+class SyncMeetingSerializer(MeetingSerializer):
+    """Meeting as sent by the delta sync, with its ward and change time"""
+    class Meta(MeetingSerializer.Meta):
+        fields = MeetingSerializer.Meta.fields + ['ward', 'updated_at']
+
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """
+    ModelSerializer that takes an additional ``fields`` argument restricting
+    which of its fields are serialized
+    """
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+class WardSerializer(DynamicFieldsModelSerializer):
     meetings = MeetingSerializer(many=True, read_only=True)
     start_date = serializers.DateField(format='%Y-%m-%d')
+    meeting_time = MeetingTimeField()
     
     class Meta:
         model = Ward
@@ -21,3 +70,88 @@ class WardSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at', 'meetings'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
+
+class OccurrenceSerializer(serializers.Serializer):
+    """Read-only representation of an expanded meeting occurrence"""
+    ward_id = serializers.CharField()
+    ward_name = serializers.CharField()
+    meeting_date = serializers.DateField(format='%Y-%m-%d')
+    meeting_time = MeetingTimeField()
+    venue = serializers.CharField()
+    is_cancelled = serializers.BooleanField()
+    is_scheduled = serializers.BooleanField()
+    meeting_id = serializers.IntegerField(allow_null=True)
+
+class BookingSerializer(serializers.Serializer):
+    """Read-only representation of one side of a venue conflict"""
+    ward_id = serializers.CharField()
+    ward_name = serializers.CharField()
+    meeting_time = MeetingTimeField()
+    venue = serializers.CharField()
+    meeting_id = serializers.IntegerField(allow_null=True)
+
+class ConflictSerializer(serializers.Serializer):
+    """Read-only representation of two overlapping bookings of a venue"""
+    meeting_date = serializers.DateField(format='%Y-%m-%d')
+    venue = serializers.CharField()
+    first = BookingSerializer()
+    second = BookingSerializer()
+
+class WardImportSerializer(serializers.ModelSerializer):
+    """
+    Validates ward rows for bulk import. Rows are upserted by id, so
+    uniqueness is left to the database instead of one query per row.
+    """
+    id = serializers.CharField(max_length=50)
+    # Blank CSV cells are dropped, so a missing time is an unknown one
+    meeting_time = MeetingTimeField(required=False)
+
+    class Meta:
+        model = Ward
+        fields = ['id', 'ward_name', 'meeting_day', 'meeting_time', 'venue', 'frequency_weeks', 'start_date']
+        extra_kwargs = {'ward_name': {'validators': []}}
+
+class MeetingImportSerializer(serializers.ModelSerializer):
+    """
+    Validates meeting rows for bulk import. Rows are upserted by
+    (ward, meeting_date) and ward ids are checked once per chunk.
+    """
+    ward = serializers.CharField(max_length=50)
+    meeting_time = MeetingTimeField(required=False)
+
+    class Meta:
+        model = Meeting
+        fields = ['ward', 'meeting_date', 'meeting_time', 'venue', 'agenda', 'notes', 'is_cancelled']
+        validators = []
+
+class MeetingOperationSerializer(serializers.Serializer):
+    """
+    One operation of a batch meeting write (see ``wards.bulk``). Meetings are
+    addressed by ``id`` or by ``ward`` and ``meeting_date``; the ward may come
+    from the URL instead (``context['ward']``).
+    """
+    OPERATIONS = ['create', 'update', 'cancel']
+
+    op = serializers.ChoiceField(choices=OPERATIONS)
+    id = serializers.IntegerField(required=False)
+    ward = serializers.CharField(max_length=50, required=False)
+    meeting_date = serializers.DateField(required=False)
+    meeting_time = MeetingTimeField(required=False)
+    venue = serializers.CharField(max_length=255, required=False)
+    agenda = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    notes = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    is_cancelled = serializers.BooleanField(required=False)
+
+    def validate(self, attrs):
+        ward = self.context.get('ward')
+        if ward is not None:
+            if attrs.setdefault('ward', ward) != ward:
+                raise serializers.ValidationError({'ward': f'Expected "{ward}" or nothing.'})
+        if attrs['op'] == 'create' or 'id' not in attrs:
+            missing = [field for field in ('ward', 'meeting_date') if field not in attrs]
+            if missing:
+                message = 'Required.' if attrs['op'] == 'create' else 'Required without an id.'
+                raise serializers.ValidationError({field: message for field in missing})
+        if attrs['op'] == 'create' and 'id' in attrs:
+            raise serializers.ValidationError({'id': 'New meetings cannot be given an id.'})
+        return attrs
@@ -0,0 +1,134 @@
+"""
+Model signal handlers for the wards app
+"""
+from django.db import connections
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from . import jobs, materialize, search
+from .cache import response_cache
+from .models import Meeting, Tombstone, Ward
+
+
+def wards_changed(ward_ids):
+    """
+    Refresh data derived from wards and meetings after bulk writes, which
+    bypass the model signals below
+    """
+    ward_ids = set(ward_ids)
+    if not ward_ids:
+        return
+    response_cache.invalidate_on_commit(*ward_ids)
+    jobs.defer('refresh_summaries', {'ward_ids': sorted(ward_ids)})
+    if materialize.is_enabled():
+        jobs.defer('regenerate_occurrences', {'ward_ids': sorted(ward_ids)})
+
+
+@receiver(pre_save, sender=Ward)
+def remember_schedule(sender, instance, raw=False, **kwargs):
+    """Keep the stored schedule so post_save can tell whether it changed"""
+    if raw or instance._state.adding or not materialize.is_enabled():
+        return
+    instance._stored_schedule = Ward.objects.filter(pk=instance.pk).values(*materialize.SCHEDULE_FIELDS).first()
+
+
+@receiver(post_save, sender=Ward)
+def regenerate_ward_occurrences(sender, instance, created=False, raw=False, **kwargs):
+    """Regenerate a ward's future occurrences when its schedule changes"""
+    if raw or not materialize.is_enabled():
+        return
+    stored = getattr(instance, '_stored_schedule', None)
+    if created or stored is None or any(
+        stored[field] != getattr(instance, field) for field in materialize.SCHEDULE_FIELDS
+    ):
+        jobs.defer('regenerate_occurrences', {'ward_ids': [instance.pk]}, key=f'occurrences:{instance.pk}')
+    instance._stored_schedule = None
+
+
+@receiver(pre_save, sender=Meeting)
+def remember_meeting(sender, instance, raw=False, **kwargs):
+    """
+    Keep the stored date, so a rescheduled meeting frees its old slot, and
+    whether it was cancelled, so cancelling it can be announced once
+    """
+    if raw or instance._state.adding:
+        return
+    stored = Meeting.objects.filter(pk=instance.pk).values_list('meeting_date', 'is_cancelled').first()
+    if stored is not None:
+        instance._stored_date, instance._stored_cancelled = stored
+
+
+@receiver(post_save, sender=Meeting)
+@receiver(post_delete, sender=Meeting)
+def regenerate_meeting_occurrence(sender, instance, raw=False, **kwargs):
+    """Refresh the materialized occurrences a meeting overrides"""
+    if raw or not materialize.is_enabled():
+        return
+    dates = {instance.meeting_date, getattr(instance, '_stored_date', None)} - {None}
+    dates = [meeting_date for meeting_date in dates if materialize.covers(meeting_date, meeting_date)]
+    instance._stored_date = None
+    if not dates:
+        return
+    dates = sorted(meeting_date.isoformat() for meeting_date in dates)
+    jobs.defer(
+        'regenerate_occurrences', {'ward_ids': [instance.ward_id], 'dates': dates},
+        key=f'occurrences:{instance.ward_id}:{",".join(dates)}',
+    )
+
+
+@receiver(post_save, sender=Meeting)
+def announce_cancellation(sender, instance, raw=False, **kwargs):
+    """Notify the ward admin when a meeting becomes cancelled"""
+    was_cancelled = getattr(instance, '_stored_cancelled', False)
+    instance._stored_cancelled = instance.is_cancelled
+    if raw or not instance.is_cancelled or was_cancelled:
+        return
+    jobs.defer('notify_cancellation', {'meeting_ids': [instance.pk]}, key=f'cancelled:{instance.pk}')
+
+
+@receiver(post_save, sender=Ward)
+@receiver(post_delete, sender=Ward)
+def invalidate_ward_responses(sender, instance, using=None, **kwargs):
+    """Evict cached responses for a ward and every ward list once the write commits"""
+    response_cache.invalidate_on_commit(instance.pk, using=using)
+
+
+@receiver(post_save, sender=Meeting)
+@receiver(post_delete, sender=Meeting)
+def invalidate_meeting_responses(sender, instance, using=None, **kwargs):
+    """Evict cached responses for the meeting's ward and every ward list once the write commits"""
+    response_cache.invalidate_on_commit(instance.ward_id, using=using)
+
+
+@receiver(post_save, sender=Ward)
+def refresh_ward_summary(sender, instance, raw=False, **kwargs):
+    """Recompute the ward's summary row"""
+    if not raw:
+        jobs.defer('refresh_summaries', {'ward_ids': [instance.pk]}, key=f'summary:{instance.pk}')
+
+
+@receiver(post_save, sender=Meeting)
+@receiver(post_delete, sender=Meeting)
+def refresh_meeting_summary(sender, instance, raw=False, **kwargs):
+    """Recompute the summary of the meeting's ward, if it has one"""
+    if not raw:
+        jobs.defer(
+            'refresh_summaries', {'ward_ids': [instance.ward_id], 'create': False},
+            key=f'summary:{instance.ward_id}:existing',
+        )
+
+
+@receiver(post_delete, sender=Ward)
+def record_ward_deletion(sender, instance, **kwargs):
+    """Leave a tombstone for delta sync clients"""
+    Tombstone.objects.create(kind=Tombstone.WARD, object_id=instance.pk, ward_id=instance.pk)
+
+
+@receiver(post_delete, sender=Meeting)
+def record_meeting_deletion(sender, instance, **kwargs):
+    """Leave a tombstone for delta sync clients"""
+    Tombstone.objects.create(kind=Tombstone.MEETING, object_id=str(instance.pk), ward_id=instance.ward_id)
+
+
+def repair_search_index(sender, using, **kwargs):
+    """Recreate search index triggers that a migration dropped (connected in ``apps``)"""
+    search.get_backend(connections[using]).repair()
@@ -0,0 +1,153 @@
+"""
+Precomputed ward summaries for ``/api/wards/summary/``.
+
+Each ward has a ``WardSummary`` row holding its name, venue and schedule plus
+its next meeting and counts of upcoming and cancelled meetings over the next
+``SUMMARY_WINDOW_DAYS`` days. Rows are recomputed by the model signals when a
+ward or one of its meetings changes, and by ``wards_changed`` after bulk
+writes. The endpoint serves one JSON document rendered from that table and
+kept in the response cache, so a request normally costs a cache lookup.
+
+Meeting counts move with the calendar: rows carry the day they were computed
+for, and rows from an earlier day (or wards without a row) are brought up to
+date the first time the payload is rendered on a new day.
+"""
+import hashlib
+from datetime import date, timedelta
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from django.http import QueryDict
+from rest_framework.renderers import JSONRenderer
+from .cache import LIST_SCOPE, response_cache
+from .models import Meeting, Ward, WardSummary
+from .recurrence import DEFAULT_RANGE_DAYS, expand_occurrences
+from .times import format_meeting_time
+
+SUMMARY_WINDOW_DAYS = DEFAULT_RANGE_DAYS
+
+# Summary fields copied from the ward
+WARD_FIELDS = ('ward_name', 'venue', 'meeting_day', 'meeting_time', 'frequency_weeks')
+
+UPDATE_FIELDS = WARD_FIELDS + ('next_meeting', 'upcoming_count', 'cancelled_count', 'as_of')
+
+BATCH_SIZE = 500
+
+
+def compute(wards, as_of=None):
+    """Build (unsaved) summaries of ``wards`` as of a day, with one meeting query"""
+    as_of = as_of or date.today()
+    to_date = as_of + timedelta(days=SUMMARY_WINDOW_DAYS)
+    summaries = {
+        ward.id: WardSummary(
+            ward_id=ward.id, as_of=as_of, **{field: getattr(ward, field) for field in WARD_FIELDS}
+        )
+        for ward in wards
+    }
+    meetings = Meeting.objects.filter(
+        ward_id__in=list(summaries), meeting_date__range=(as_of, to_date)
+    ).only('id', 'ward_id', 'meeting_date', 'meeting_time', 'venue', 'is_cancelled').order_by()
+    for occurrence in expand_occurrences(wards, meetings, as_of, to_date):
+        summary = summaries[occurrence.ward_id]
+        if occurrence.is_cancelled:
+            summary.cancelled_count += 1
+        else:
+            summary.upcoming_count += 1
+            if summary.next_meeting is None or occurrence.meeting_date < summary.next_meeting:
+                summary.next_meeting = occurrence.meeting_date
+    return list(summaries.values())
+
+
+def refresh(ward_ids=None, as_of=None, create=True):
+    """
+    Recompute the summaries of ``ward_ids`` (every ward when None), in
+    batches. With ``create=False`` only existing rows are updated, which is
+    what meeting signals use, so that meetings deleted along with their ward
+    cannot recreate its summary. Returns the number of wards summarized.
+    """
+    wards = Ward.objects.order_by('id').only('id', *WARD_FIELDS, 'start_date')
+    if ward_ids is not None:
+        ward_ids = sorted(set(ward_ids))
+        if not ward_ids:
+            return 0
+        wards = wards.filter(id__in=ward_ids)
+    if not create:
+        wards = wards.filter(summary__isnull=False)
+
+    count = 0
+    batch = []
+    for ward in wards.iterator(chunk_size=BATCH_SIZE):
+        batch.append(ward)
+        if len(batch) >= BATCH_SIZE:
+            count += _save(compute(batch, as_of))
+            batch = []
+    if batch:
+        count += _save(compute(batch, as_of))
+    return count
+
+
+def refresh_stale(as_of=None):
+    """Summarize wards without a summary, or whose summary is from an earlier day"""
+    as_of = as_of or date.today()
+    stale = Ward.objects.filter(Q(summary__isnull=True) | Q(summary__as_of__lt=as_of))
+    return refresh(stale.values_list('id', flat=True), as_of)
+
+
+def render(as_of=None):
+    """Render every summary into one JSON document, from the summary table alone"""
+    as_of = as_of or date.today()
+    refresh_stale(as_of)
+    rows = WardSummary.objects.order_by('ward_id').values_list('ward_id', *UPDATE_FIELDS[:-1])
+    results = [
+        {
+            'id': ward_id,
+            'ward_name': ward_name,
+            'venue': venue,
+            'meeting_day': meeting_day,
+            'meeting_time': format_meeting_time(meeting_time),
+            'frequency_weeks': frequency_weeks,
+            'next_meeting': next_meeting.isoformat() if next_meeting else None,
+            'upcoming_count': upcoming_count,
+            'cancelled_count': cancelled_count,
+        }
+        for (ward_id, ward_name, venue, meeting_day, meeting_time, frequency_weeks,
+             next_meeting, upcoming_count, cancelled_count) in rows
+    ]
+    content = JSONRenderer().render({
+        'as_of': as_of.isoformat(),
+        'window_days': SUMMARY_WINDOW_DAYS,
+        'results': results,
+    })
+    return {
+        'as_of': as_of.isoformat(),
+        'etag': '"%s"' % hashlib.md5(content).hexdigest(),
+        'content': content,
+    }
+
+
+def payload():
+    """Today's rendered summary document, from the response cache when possible"""
+    key = response_cache.make_key('summary', LIST_SCOPE, QueryDict())
+    cached = response_cache.get(key)
+    if cached is not None and cached['as_of'] == date.today().isoformat():
+        return cached
+    rendered = render()
+    response_cache.set(key, rendered)
+    return rendered
+
+
+async def apayload():
+    """Async version of ``payload``; rendering runs in a thread"""
+    key = await response_cache.amake_key('summary', LIST_SCOPE, QueryDict())
+    cached = await response_cache.aget(key)
+    if cached is not None and cached['as_of'] == date.today().isoformat():
+        return cached
+    rendered = await sync_to_async(render)()
+    await response_cache.aset(key, rendered)
+    return rendered
+
+
+def _save(summaries):
+    WardSummary.objects.bulk_create(
+        summaries, update_conflicts=True, unique_fields=['ward'], update_fields=UPDATE_FIELDS,
+    )
+    return len(summaries)
@@ -0,0 +1,138 @@
+"""
+Delta sync for ``GET /api/wards/changes/?since=<token>``.
+
+Wards and meetings are read in ``(updated_at, id)`` order from where the
+client's token left off, and deletions from the ``Tombstone`` table in
+``(deleted_at, id)`` order, each a keyset page over its own index. The token
+is a signed record of the three positions, so clients cannot forge one and
+the server keeps no per-client state.
+
+A row saved by a transaction that has not committed yet can carry an
+``updated_at`` earlier than rows already visible. So that such rows are not
+skipped, the positions never move past ``WARDS_SYNC_LAG_SECONDS`` ago: rows
+changed within that window are sent again on the next sync, and clients
+apply changes as upserts. Tombstones are kept for
+``WARDS_SYNC_RETENTION_DAYS``; older tokens are refused and the client starts
+over with a full sync.
+"""
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+from django.utils import timezone
+from .models import Meeting, Tombstone, Ward
+
+SALT = 'wards.sync'
+
+PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 5000
+
+KINDS = ('wards', 'meetings', 'deleted')
+
+
+class InvalidToken(Exception):
+    pass
+
+
+class TokenExpired(Exception):
+    pass
+
+
+def lag():
+    return timedelta(seconds=getattr(settings, 'WARDS_SYNC_LAG_SECONDS', 10))
+
+
+def retention():
+    return timedelta(days=getattr(settings, 'WARDS_SYNC_RETENTION_DAYS', 30))
+
+
+def issue(positions):
+    """Sign ``{kind: (timestamp, pk) or None}`` into a token"""
+    return signing.dumps({
+        kind: [position[0].isoformat(), position[1]] if position else None
+        for kind, position in positions.items()
+    }, salt=SALT, compress=True)
+
+
+def read(token, now=None):
+    """Positions recorded in a token"""
+    try:
+        data = signing.loads(token, salt=SALT)
+        positions = {
+            kind: (datetime.fromisoformat(data[kind][0]), data[kind][1]) if data[kind] else None
+            for kind in KINDS
+        }
+    except (signing.BadSignature, KeyError, TypeError, IndexError, ValueError):
+        raise InvalidToken()
+    deleted = positions['deleted']
+    if deleted is None or deleted[0] < (now or timezone.now()) - retention():
+        raise TokenExpired()
+    return positions
+
+
+def after(queryset, field, position):
+    """Rows of ``queryset`` past a ``(timestamp, pk)`` position"""
+    if position is None:
+        return queryset
+    timestamp, pk = position
+    if pk is None:
+        return queryset.filter(**{f'{field}__gte': timestamp})
+    return queryset.filter(Q(**{f'{field}__gt': timestamp}) | Q(**{field: timestamp, 'pk__gt': pk}))
+
+
+def page(queryset, field, position, limit, horizon):
+    """
+    Up to ``limit`` rows past ``position``. Returns ``(rows, position,
+    has_more)``: the new position is the last row while there are more rows
+    to page through, and ``horizon`` once there are not.
+    """
+    rows = list(after(queryset, field, position).order_by(field, 'pk')[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if has_more:
+        position = (getattr(rows[-1], field), rows[-1].pk)
+    elif position is None or position[0] < horizon:
+        position = (horizon, None)
+    return rows, position, has_more
+
+
+def changes(token=None, limit=PAGE_SIZE):
+    """
+    Wards, meetings and deletions since ``token``, or every ward and meeting
+    when there is none. Returns a dict with the rows, the deleted ward and
+    meeting ids, the next token and whether more pages follow.
+    """
+    now = timezone.now()
+    horizon = now - lag()
+    if token:
+        positions = read(token, now)
+    else:
+        # A full sync needs no deletions, only those from here on
+        positions = {'wards': None, 'meetings': None, 'deleted': (horizon, None)}
+
+    wards, positions['wards'], more_wards = page(
+        Ward.objects.all(), 'updated_at', positions['wards'], limit, horizon
+    )
+    meetings, positions['meetings'], more_meetings = page(
+        Meeting.objects.all(), 'updated_at', positions['meetings'], limit, horizon
+    )
+    tombstones, positions['deleted'], more_deleted = page(
+        Tombstone.objects.all(), 'deleted_at', positions['deleted'], limit, horizon
+    )
+    return {
+        'token': issue(positions),
+        'has_more': more_wards or more_meetings or more_deleted,
+        'wards': wards,
+        'meetings': meetings,
+        'deleted': {
+            'wards': [row.object_id for row in tombstones if row.kind == Tombstone.WARD],
+            'meetings': [int(row.object_id) for row in tombstones if row.kind == Tombstone.MEETING],
+        },
+    }
+
+
+def prune(now=None):
+    """Delete tombstones older than the retention period"""
+    cutoff = (now or timezone.now()) - retention()
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
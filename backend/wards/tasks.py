@@ -0,0 +1,97 @@
+"""
+Background tasks of the wards app (see ``wards.jobs``)
+"""
+import logging
+from datetime import date
+from django.core.mail import EmailMessage, get_connection
+from . import materialize, summaries
+from .cache import response_cache
+from .jobs import task
+from .models import Meeting, Ward
+from .times import format_meeting_time
+
+logger = logging.getLogger('wards')
+
+# Wards regenerated per transaction
+BATCH_SIZE = 500
+
+
+@task(batch=True)
+def regenerate_occurrences(payloads):
+    """
+    Regenerate materialized occurrences. Each payload names ``ward_ids`` and
+    optionally the ISO ``dates`` to refresh; without dates a ward's whole
+    window is regenerated.
+    """
+    if not materialize.is_enabled():
+        return
+    whole = set()
+    dated = {}
+    for payload in payloads:
+        for ward_id in payload['ward_ids']:
+            if payload.get('dates'):
+                dated.setdefault(ward_id, set()).update(date.fromisoformat(value) for value in payload['dates'])
+            else:
+                whole.add(ward_id)
+
+    wards = Ward.objects.in_bulk(whole | set(dated))
+    batch = [wards[ward_id] for ward_id in sorted(whole) if ward_id in wards]
+    for start in range(0, len(batch), BATCH_SIZE):
+        materialize.regenerate(batch[start:start + BATCH_SIZE])
+    for ward_id, dates in sorted(dated.items()):
+        if ward_id in whole or ward_id not in wards:
+            continue
+        for meeting_date in sorted(dates):
+            if materialize.covers(meeting_date, meeting_date):
+                materialize.regenerate([wards[ward_id]], meeting_date, meeting_date)
+    if wards:
+        response_cache.invalidate_on_commit(*wards)
+
+
+@task(batch=True)
+def refresh_summaries(payloads):
+    """
+    Recompute ward summaries. Payloads name ``ward_ids`` and whether missing
+    rows may be created (``create``, true unless given).
+    """
+    created, existing = set(), set()
+    for payload in payloads:
+        (created if payload.get('create', True) else existing).update(payload['ward_ids'])
+    if created:
+        summaries.refresh(created)
+    if existing - created:
+        summaries.refresh(existing - created, create=False)
+    if created or existing:
+        response_cache.invalidate_on_commit(*(created | existing))
+
+
+@task(batch=True, max_attempts=5, retry_delay=60)
+def notify_cancellation(payloads):
+    """
+    Email ward admins that meetings were cancelled, for the ``meeting_ids``
+    of every payload that are still cancelled, over one mail connection
+    """
+    meeting_ids = {meeting_id for payload in payloads for meeting_id in payload['meeting_ids']}
+    meetings = Meeting.objects.select_related('ward__ward_admin').filter(
+        pk__in=meeting_ids, is_cancelled=True
+    ).order_by('meeting_date', 'ward_id')
+    messages = []
+    unsent = []
+    for meeting in meetings:
+        admin = meeting.ward.ward_admin
+        if admin is None or not admin.email:
+            unsent.append(meeting.ward_id)
+            continue
+        when = meeting.meeting_date.strftime('%A %d %B %Y')
+        if meeting.meeting_time is not None:
+            when = f'{when} at {format_meeting_time(meeting.meeting_time)}'
+        messages.append(EmailMessage(
+            f'Cancelled: {meeting.ward.ward_name} meeting on {meeting.meeting_date.isoformat()}',
+            f'The {meeting.ward.ward_name} meeting at {meeting.venue} on {when} has been cancelled.',
+            to=[admin.email],
+        ))
+    if unsent:
+        logger.info('%d cancellation notice(s) not sent, no ward admin email for: %s',
+                    len(unsent), ', '.join(sorted(set(unsent))))
+    if messages:
+        get_connection().send_messages(messages)
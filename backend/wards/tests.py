@@ -0,0 +1,832 @@
+import base64
+import csv
+import os
+import tempfile
+from datetime import date, time, timedelta
+from io import StringIO
+from unittest import mock, skipUnless
+from urllib.parse import parse_qs, urlsplit
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.core.management.sql import emit_post_migrate_signal
+from django.db import DatabaseError, IntegrityError, connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.request import Request
+from pdp_calendar.metrics import registry
+from . import conditional, conflicts, importers, jobs, materialize, recurrence, search, sync
+from .cache import response_cache
+from .models import Job, Meeting, MeetingOccurrence, OccurrenceWindow, Ward
+from .pagination import MeetingKeysetPagination
+
+
+def create_wards(count, start=0, meetings=3):
+    """
+    Create ``count`` wards numbered from ``start``, each with ``meetings``
+    meetings in the last few weeks. Bulk inserts, so no signals fire.
+    """
+    today = date.today()
+    wards = Ward.objects.bulk_create(
+        Ward(
+            id=f'ward-{number}', ward_name=f'Ward {number}', meeting_day='Monday',
+            meeting_time=time(17), venue=f'Hall {number}', frequency_weeks=2,
+            start_date=today - timedelta(days=365),
+        )
+        for number in range(start, start + count)
+    )
+    Meeting.objects.bulk_create(
+        Meeting(ward=ward, meeting_date=today - timedelta(weeks=week), meeting_time=time(17), venue=ward.venue)
+        for ward in wards for week in range(meetings)
+    )
+    return wards
+
+
+class WardListQueryTests(TestCase):
+    """The ward list costs the same number of queries however many wards there are"""
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url):
+        # Skip the response cache so every request reaches the database
+        cache.clear()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def assertConstantQueries(self, url):
+        create_wards(2)
+        with CaptureQueriesContext(connection) as queries:
+            self.get(url)
+
+        create_wards(10, start=2)
+        with self.assertNumQueries(len(queries)):
+            response = self.get(url)
+        return response.json()['results']
+
+    def test_list(self):
+        results = self.assertConstantQueries('/api/wards/')
+        self.assertEqual(len(results), 12)
+        self.assertEqual(len(results[0]['meetings']), 3)
+
+    def test_list_expand_meetings(self):
+        results = self.assertConstantQueries('/api/wards/?fields=id,ward_name&expand=meetings')
+        self.assertEqual(len(results), 12)
+        self.assertEqual(set(results[0]), {'id', 'ward_name', 'meetings'})
+        self.assertEqual(len(results[0]['meetings']), 3)
+
+    def test_list_without_meetings(self):
+        results = self.assertConstantQueries('/api/wards/?fields=id,ward_name')
+        self.assertEqual(set(results[0]), {'id', 'ward_name'})
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        create_wards(1)
+
+    def ward_name(self):
+        return self.client.get('/api/wards/').json()['results'][0]['ward_name']
+
+    def test_invalidated_when_the_write_commits(self):
+        self.assertEqual(self.ward_name(), 'Ward 0')
+        generations = response_cache.generations('ward-0')
+        with self.captureOnCommitCallbacks(execute=True):
+            ward = Ward.objects.get(pk='ward-0')
+            ward.ward_name = 'Renamed'
+            ward.save()
+            # Not evicted before commit, so no request caches uncommitted data
+            self.assertEqual(response_cache.generations('ward-0'), generations)
+        self.assertNotEqual(response_cache.generations('ward-0'), generations)
+        self.assertEqual(self.ward_name(), 'Renamed')
+
+    def test_body_matches_etag_after_unsignalled_write(self):
+        # As when another process writes: no signal evicts this process's cache
+        first = self.client.get('/api/wards/ward-0/')
+        Ward.objects.filter(pk='ward-0').update(venue='New Hall', updated_at=timezone.now() + timedelta(seconds=1))
+        second = self.client.get('/api/wards/ward-0/')
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertEqual(second.json()['venue'], 'New Hall')
+        revalidated = self.client.get('/api/wards/ward-0/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(revalidated.status_code, 200)
+        self.assertEqual(revalidated.json()['venue'], 'New Hall')
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        create_wards(1)
+        # Last-Modified has whole seconds; move the rows well into the past
+        yesterday = timezone.now() - timedelta(days=1)
+        Ward.objects.update(updated_at=yesterday)
+        Meeting.objects.update(updated_at=yesterday)
+
+    def test_not_modified_since_last_modified(self):
+        response = self.client.get('/api/wards/ward-0/meetings/')
+        response = self.client.get(
+            '/api/wards/ward-0/meetings/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_deletion_moves_last_modified(self):
+        response = self.client.get('/api/wards/ward-0/meetings/')
+        with self.captureOnCommitCallbacks(execute=True):
+            Meeting.objects.filter(ward_id='ward-0').first().delete()
+        response = self.client.get(
+            '/api/wards/ward-0/meetings/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 2)
+
+
+    def test_no_validators_for_a_body_built_across_a_write(self):
+        make_etag = conditional.make_etag
+
+        def written_after_evaluate():
+            # The first ETag is computed before the write, the recheck after it
+            etags = iter(['"before"'])
+            return mock.patch.object(conditional, 'make_etag', lambda *args: next(etags, None) or make_etag(*args))
+
+        response_cache.reset_stats()
+        for _ in range(2):
+            with written_after_evaluate():
+                response = self.client.get('/api/wards/ward-0/')
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('ETag', response)
+        # Nor cached under the ETag of the data before the write
+        self.assertEqual(response_cache.stats()['hits'], 0)
+
+
+class ImportCalendarTests(TestCase):
+    def temporary_path(self):
+        handle = tempfile.NamedTemporaryFile(suffix='.csv', delete=False)
+        handle.close()
+        self.addCleanup(os.remove, handle.name)
+        return handle.name
+
+    def write_wards(self, count):
+        path = self.temporary_path()
+        with open(path, 'w', newline='') as handle:
+            writer = csv.writer(handle)
+            writer.writerow(['id', 'ward_name', 'meeting_day', 'meeting_time', 'venue', 'frequency_weeks', 'start_date'])
+            for number in range(count):
+                writer.writerow([f'ward-{number}', f'Ward {number}', 'Monday', '5:00 PM', 'Hall', 2, '2024-01-01'])
+        return path
+
+    def test_blank_times_are_unknown(self):
+        create_wards(1, meetings=0)
+        path = self.temporary_path()
+        with open(path, 'w', newline='') as handle:
+            writer = csv.writer(handle)
+            writer.writerow(['ward', 'meeting_date', 'meeting_time', 'venue'])
+            writer.writerow(['ward-0', '2024-01-01', '', 'Hall'])
+            writer.writerow(['ward-0', '2024-01-15', '6:30 PM', 'Hall'])
+
+        call_command('import_calendar', 'meetings', path, stdout=mock.Mock(), stderr=mock.Mock())
+        self.assertEqual(
+            list(Meeting.objects.order_by('meeting_date').values_list('meeting_time', flat=True)),
+            [None, time(18, 30)],
+        )
+
+    def test_failed_chunk_still_refreshes_written_wards(self):
+        path = self.write_wards(2)
+        import_chunk = importers.import_chunk
+
+        def fail_second_chunk(importer, chunk, *args, **kwargs):
+            if chunk[0]['id'] == 'ward-1':
+                raise DatabaseError('disk full')
+            return import_chunk(importer, chunk, *args, **kwargs)
+
+        with mock.patch.object(importers, 'import_chunk', fail_second_chunk), \
+                mock.patch('wards.management.commands.import_calendar.wards_changed') as wards_changed:
+            with self.assertRaises(CommandError):
+                call_command('import_calendar', 'wards', path, chunk_size=1, stdout=mock.Mock(), stderr=mock.Mock())
+
+        self.assertEqual(list(Ward.objects.values_list('id', flat=True)), ['ward-0'])
+        wards_changed.assert_called_once_with({'ward-0'})
+
+
+class CalendarFeedTests(TestCase):
+    def test_feed(self):
+        create_wards(1)
+        response = self.client.get('/api/wards/ward-0/calendar.ics')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        self.assertTrue(response.content.startswith(b'BEGIN:VCALENDAR'))
+
+    def test_unknown_ward(self):
+        with self.assertLogs('django.request', 'WARNING'):
+            response = self.client.get('/api/wards/nope/calendar.ics')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.json(), {'detail': 'Not found.'})
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        create_wards(2)
+
+    def scrape(self, **headers):
+        response = self.client.get('/api/metrics', **headers)
+        return response.status_code, response.content.decode()
+
+    def test_requests_are_recorded_per_view(self):
+        # A DRF view in both the sync and async URL confs, so rendering is timed
+        self.client.get('/api/wards/next/')
+        self.client.get('/api/wards/next/')
+        status, metrics = self.scrape()
+        self.assertEqual(status, 200)
+        labels = 'view="ward-next-meetings",method="GET",status="200"'
+        self.assertIn(f'http_requests_total{{{labels}}} 2\n', metrics)
+        self.assertIn(f'http_request_sql_queries_count{{{labels}}} 2\n', metrics)
+        self.assertIn(f'http_request_render_duration_seconds_count{{{labels}}} 2\n', metrics)
+        self.assertNotIn('http_requests_over_query_budget_total{', metrics)
+
+    @override_settings(METRICS_QUERY_BUDGET=1)
+    def test_query_budget(self):
+        with self.assertLogs('pdp_calendar.requests', 'WARNING') as logs:
+            self.client.get('/api/wards/')
+        self.assertIn('Query budget exceeded: GET /api/wards/ (ward-list)', logs.output[0])
+        _, metrics = self.scrape()
+        self.assertIn(
+            'http_requests_over_query_budget_total{view="ward-list",method="GET",status="200"} 1\n', metrics
+        )
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token(self):
+        with self.assertLogs('django.request', 'WARNING'):
+            self.assertEqual(self.scrape()[0], 403)
+            self.assertEqual(self.scrape(HTTP_AUTHORIZATION='Bearer wrong')[0], 403)
+        self.assertEqual(self.scrape(HTTP_AUTHORIZATION='Bearer secret')[0], 200)
+
+
+class RecurrenceTests(TestCase):
+    def setUp(self):
+        self.ward = Ward(
+            id='ward-0', ward_name='Ward 0', meeting_day='Monday', meeting_time=time(17),
+            venue='Hall', frequency_weeks=3, start_date=date(2024, 1, 1),
+        )
+
+    def expand(self, meetings, from_date, to_date):
+        return recurrence.expand_occurrences([self.ward], meetings, from_date, to_date)
+
+    def test_every_few_weeks(self):
+        dates = list(recurrence.schedule_dates(date(2024, 1, 1), 3, date(2024, 1, 2), date(2024, 3, 4)))
+        self.assertEqual(dates, [date(2024, 1, 22), date(2024, 2, 12), date(2024, 3, 4)])
+        self.assertTrue(recurrence.is_scheduled_date(date(2024, 1, 1), 3, date(2024, 2, 12)))
+        self.assertFalse(recurrence.is_scheduled_date(date(2024, 1, 1), 3, date(2024, 2, 5)))
+
+    def test_range_before_start(self):
+        dates = list(recurrence.schedule_dates(date(2024, 1, 1), 3, date(2023, 11, 1), date(2024, 1, 22)))
+        self.assertEqual(dates, [date(2024, 1, 1), date(2024, 1, 22)])
+        self.assertFalse(recurrence.is_scheduled_date(date(2024, 1, 1), 3, date(2023, 12, 11)))
+        one_off = recurrence.schedule_dates(date(2024, 1, 1), 0, date(2023, 12, 1), date(2024, 2, 1))
+        self.assertEqual(list(one_off), [date(2024, 1, 1)])
+        self.assertEqual(self.expand([], date(2023, 11, 1), date(2023, 12, 31)), [])
+
+    def test_meetings_override_the_schedule(self):
+        meetings = [
+            # Cancelled, held elsewhere at another time, and moved off the schedule
+            Meeting(id=1, ward_id='ward-0', meeting_date=date(2024, 1, 1), meeting_time=time(17), venue='Hall',
+                    is_cancelled=True),
+            Meeting(id=2, ward_id='ward-0', meeting_date=date(2024, 1, 22), meeting_time=time(18, 30),
+                    venue='Library'),
+            Meeting(id=3, ward_id='ward-0', meeting_date=date(2024, 2, 14), meeting_time=None, venue='Hall'),
+            # Another ward's meeting is not merged in
+            Meeting(id=4, ward_id='ward-1', meeting_date=date(2024, 1, 22), meeting_time=time(17), venue='Hall'),
+        ]
+        occurrences = self.expand(meetings, date(2024, 1, 1), date(2024, 2, 29))
+        self.assertEqual(
+            [
+                (o.meeting_date, o.meeting_time, o.venue, o.is_cancelled, o.is_scheduled, o.meeting_id)
+                for o in occurrences
+            ],
+            [
+                (date(2024, 1, 1), time(17), 'Hall', True, True, 1),
+                (date(2024, 1, 22), time(18, 30), 'Library', False, True, 2),
+                (date(2024, 2, 12), time(17), 'Hall', False, True, None),
+                (date(2024, 2, 14), None, 'Hall', False, False, 3),
+            ],
+        )
+
+    def test_next_dates_agree_with_the_schedule(self):
+        starts = [date(2024, 1, 1) + timedelta(days=days) for days in range(0, 60, 11)]
+        for frequency_weeks in (0, 1, 2, 5):
+            frequencies = [frequency_weeks] * len(starts)
+            ordinals = [start.toordinal() for start in starts]
+            for as_of in (date(2023, 12, 1), date(2024, 1, 1), date(2024, 2, 7), date(2024, 9, 30)):
+                with self.subTest(frequency_weeks=frequency_weeks, as_of=as_of):
+                    vectorized = recurrence.next_meeting_dates(ordinals, frequencies, as_of.toordinal(), 4)
+                    with mock.patch.object(recurrence, '_numpy', return_value=None):
+                        pure = recurrence.next_meeting_dates(ordinals, frequencies, as_of.toordinal(), 4)
+                    self.assertEqual(vectorized, pure)
+                    expected = [
+                        [found.isoformat() for found in recurrence.schedule_dates(
+                            start, frequency_weeks, as_of, date(2026, 1, 1)
+                        )][:4]
+                        for start in starts
+                    ]
+                    self.assertEqual(vectorized, expected)
+
+
+@override_settings(WARDS_MATERIALIZE_OCCURRENCES=True, WARDS_OCCURRENCE_WINDOW_DAYS=60)
+class MaterializedOccurrenceTests(TestCase):
+    def setUp(self):
+        self.ward, _ = create_wards(2, meetings=0)
+        call_command('extend_occurrences', stdout=StringIO())
+        self.from_date, self.to_date = materialize.window()
+
+    def computed(self, from_date, to_date):
+        wards, meetings = materialize.occurrence_querysets(from_date, to_date, None)
+        return recurrence.expand_occurrences(wards, meetings, from_date, to_date)
+
+    def assertMatchesComputed(self):
+        self.assertTrue(materialize.covers(self.from_date, self.to_date))
+        self.assertEqual(materialize.load(self.from_date, self.to_date), self.computed(self.from_date, self.to_date))
+
+    def scheduled_dates(self):
+        return list(recurrence.schedule_dates(
+            self.ward.start_date, self.ward.frequency_weeks, self.from_date, self.to_date
+        ))
+
+    def test_ward_edit(self):
+        self.assertMatchesComputed()
+        self.ward.frequency_weeks = 1
+        self.ward.venue = 'New Hall'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ward.save()
+        self.assertMatchesComputed()
+        rows = materialize.load(self.from_date, self.to_date, [self.ward.id])
+        self.assertEqual([row.meeting_date for row in rows], self.scheduled_dates())
+
+    def test_meeting_move_and_delete(self):
+        first, second = self.scheduled_dates()[:2]
+        with self.captureOnCommitCallbacks(execute=True):
+            meeting = Meeting.objects.create(
+                ward=self.ward, meeting_date=first, meeting_time=time(18), venue='Library'
+            )
+        self.assertMatchesComputed()
+
+        meeting.meeting_date = first + timedelta(days=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            meeting.save()
+        self.assertMatchesComputed()
+        moved = materialize.load(meeting.meeting_date, meeting.meeting_date)
+        self.assertEqual([(o.meeting_id, o.is_scheduled) for o in moved], [(meeting.id, False)])
+
+        meeting.meeting_date = second
+        with self.captureOnCommitCallbacks(execute=True):
+            meeting.save()
+        self.assertMatchesComputed()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            meeting.delete()
+        self.assertMatchesComputed()
+        self.assertIsNone(materialize.load(second, second, [self.ward.id])[0].meeting_id)
+
+    def test_reads_outside_the_window_are_computed(self):
+        # Emptied, so anything read from the table comes back empty
+        MeetingOccurrence.objects.all().delete()
+        self.assertEqual(materialize.occurrences(self.from_date, self.to_date), [])
+
+        for from_date, to_date in (
+            (self.from_date - timedelta(days=1), self.to_date),
+            (self.from_date, self.to_date + timedelta(days=1)),
+        ):
+            with self.subTest(from_date=from_date, to_date=to_date):
+                self.assertFalse(materialize.covers(from_date, to_date))
+                found = materialize.occurrences(from_date, to_date)
+                self.assertTrue(found)
+                self.assertEqual(found, self.computed(from_date, to_date))
+
+        OccurrenceWindow.objects.all().delete()
+        self.assertFalse(materialize.covers(self.from_date, self.to_date))
+
+
+class ConflictTests(TestCase):
+    def occurrence(self, ward_id, meeting_time, venue='Hall', meeting_date=date(2024, 1, 1)):
+        return recurrence.Occurrence(ward_id, f'Ward {ward_id}', meeting_date, meeting_time, venue)
+
+    def conflicts(self, *occurrences):
+        return [
+            (conflict.first.ward_id, conflict.second.ward_id)
+            for conflict in conflicts.ConflictIndex(occurrences).conflicts()
+        ]
+
+    def test_same_venue_overlap(self):
+        self.assertEqual(
+            self.conflicts(
+                self.occurrence('a', time(17)), self.occurrence('b', time(18)),
+                self.occurrence('c', time(18), venue='Library'),
+                self.occurrence('d', time(18), meeting_date=date(2024, 1, 2)),
+            ),
+            [('a', 'b')],
+        )
+        # Without a time, a meeting books the whole day
+        self.assertEqual(self.conflicts(self.occurrence('a', None), self.occurrence('b', time(8))), [('a', 'b')])
+
+    def test_back_to_back_meetings_do_not_overlap(self):
+        # Meetings last two hours
+        self.assertEqual(self.conflicts(self.occurrence('a', time(17)), self.occurrence('b', time(19))), [])
+        self.assertEqual(
+            self.conflicts(self.occurrence('a', time(17)), self.occurrence('b', time(18, 59))), [('a', 'b')]
+        )
+
+    def test_venue_spellings(self):
+        self.assertEqual(conflicts.normalize_venue("St. Jude's  Hall"), conflicts.normalize_venue('ST JUDE S HALL'))
+        self.assertEqual(
+            self.conflicts(
+                self.occurrence('a', time(17), venue="St. Jude's Hall"),
+                self.occurrence('b', time(17), venue='st jude s hall'),
+            ),
+            [('a', 'b')],
+        )
+
+    def test_update_details_rejects_a_double_booking(self):
+        create_wards(2, meetings=0)
+        url = '/api/wards/ward-1/update_details/'
+        with self.assertLogs('django.request', 'WARNING'):
+            response = self.client.post(url, {'venue': 'hall 0'}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertRegex(
+            response.json()['conflicts'][0], r'^Hall 0 is already booked by Ward 0 on \d{4}-\d\d-\d\d at 5:00 PM\.$'
+        )
+        self.assertEqual(Ward.objects.get(pk='ward-1').venue, 'Hall 1')
+
+        # Right after the other ward's meeting is free
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                url, {'venue': 'hall 0', 'meeting_time': '7:00 PM'}, content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Ward.objects.get(pk='ward-1').venue, 'hall 0')
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.ward, _ = create_wards(2, meetings=0)
+        self.budget = Meeting.objects.create(
+            ward=self.ward, meeting_date=date(2024, 3, 4), meeting_time=time(17), venue='Hall 0',
+            agenda='Budget review', notes='Budget figures for the budget year',
+        )
+        self.roads = Meeting.objects.create(
+            ward=self.ward, meeting_date=date(2024, 3, 18), meeting_time=time(17), venue='Hall 0',
+            agenda='Road repairs', notes='The new budget will be presented at the next meetings',
+        )
+
+    def found(self, query):
+        results = search.search(query)
+        return [ward['id'] for ward in results['wards']], [meeting['id'] for meeting in results['meetings']]
+
+    def test_ranking(self):
+        # Scores weigh how rare a word is, so most meetings are about something else
+        Meeting.objects.bulk_create(
+            Meeting(
+                ward=self.ward, meeting_date=date(2024, 1, day), meeting_time=time(17), venue='Hall 0', agenda='Parks'
+            )
+            for day in range(1, 11)
+        )
+        response = self.client.get('/api/wards/search/', {'q': 'budget'})
+        meetings = response.json()['meetings']
+        self.assertEqual([meeting['id'] for meeting in meetings], [self.budget.id, self.roads.id])
+        self.assertGreater(meetings[0]['score'], meetings[1]['score'])
+        self.assertIn('<mark>Budget</mark>', meetings[0]['highlights']['agenda'])
+        # Meeting text is stemmed; every word must match
+        self.assertEqual(self.found('meeting budget'), ([], [self.roads.id]))
+        self.assertEqual(self.found('hall 1'), (['ward-1'], []))
+
+    def test_unindexed_fallback(self):
+        with mock.patch.dict(search.BACKENDS, clear=True):
+            results = search.search('budget')
+        self.assertEqual([meeting['id'] for meeting in results['meetings']], [self.roads.id, self.budget.id])
+        self.assertEqual({meeting['score'] for meeting in results['meetings']}, {None})
+        self.assertEqual(results['meetings'][1]['highlights']['agenda'], '<mark>Budget</mark> review')
+
+    @skipUnless(connection.vendor == 'sqlite', 'Triggers keep the FTS5 index in step on SQLite')
+    def test_index_follows_edits(self):
+        # Queryset updates bypass model signals; the triggers still see them
+        Ward.objects.filter(pk='ward-1').update(ward_name='Riverside')
+        self.assertEqual(self.found('riverside'), (['ward-1'], []))
+        self.assertEqual(self.found('ward 1'), ([], []))
+        Meeting.objects.filter(pk=self.roads.pk).update(agenda='Drainage')
+        self.assertEqual(self.found('drainage'), ([], [self.roads.id]))
+        self.assertEqual(self.found('road'), ([], []))
+        self.roads.delete()
+        self.assertEqual(self.found('drainage'), ([], []))
+        Ward.objects.filter(pk='ward-1').delete()
+        self.assertEqual(self.found('riverside'), ([], []))
+
+    @skipUnless(connection.vendor == 'sqlite', 'Only the SQLite index has triggers')
+    def test_triggers_repaired_after_migrate(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER wards_ward_fts_insert')
+        emit_post_migrate_signal(verbosity=0, interactive=False, db=connection.alias)
+        create_wards(1, start=2, meetings=0)
+        self.assertEqual(self.found('ward 2'), (['ward-2'], []))
+
+
+class MeetingPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Every ward meets on the same dates, so only the id orders those meetings
+        create_wards(4, meetings=2)
+
+    def walk(self, ordering):
+        paginator = MeetingKeysetPagination()
+        params = {'limit': 3, 'ordering': ordering}
+        pages = []
+        while True:
+            request = Request(RequestFactory().get('/api/wards/meetings/', params))
+            pages.append([meeting.id for meeting in paginator.paginate_queryset(Meeting.objects.all(), request)])
+            next_link = paginator.get_next_link()
+            if next_link is None:
+                return pages
+            params['cursor'] = parse_qs(urlsplit(next_link).query)['cursor'][0]
+
+    def test_pages_through_equal_dates(self):
+        for ordering, fields in (('meeting_date', ('meeting_date', 'id')), ('-meeting_date', ('-meeting_date', '-id'))):
+            with self.subTest(ordering=ordering):
+                pages = self.walk(ordering)
+                expected = list(Meeting.objects.order_by(*fields).values_list('id', flat=True))
+                self.assertEqual([len(page) for page in pages], [3, 3, 2])
+                self.assertEqual([meeting_id for page in pages for meeting_id in page], expected)
+
+    def test_malformed_cursor(self):
+        cursors = [
+            '!!!', 'abc', base64.urlsafe_b64encode(b'not a cursor').decode(),
+            base64.urlsafe_b64encode(b'2024-13-01|1').decode(), base64.urlsafe_b64encode(b'2024-01-01|x').decode(),
+            base64.urlsafe_b64encode('2024-01-01|١'.encode()).decode(),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor), self.assertLogs('django.request', 'WARNING'):
+                response = self.client.get('/api/wards/ward-0/meetings/', {'cursor': cursor})
+            self.assertEqual(response.status_code, 404)
+            self.assertEqual(response.json(), {'detail': 'Invalid cursor.'})
+
+
+class NextMeetingDatesTests(TestCase):
+    def test_numpy_and_pure_python_agree(self):
+        starts = [date(2024, 1, 1).toordinal(), date(2024, 6, 3).toordinal(), date(2024, 2, 5).toordinal()]
+        frequencies = [2, 1, 0]
+        for as_of in (date(2024, 1, 1), date(2024, 2, 6), date(2024, 6, 3)):
+            with self.subTest(as_of=as_of):
+                vectorized = recurrence.next_meeting_dates(starts, frequencies, as_of.toordinal(), 3)
+                with mock.patch.object(recurrence, '_numpy', return_value=None):
+                    pure = recurrence.next_meeting_dates(starts, frequencies, as_of.toordinal(), 3)
+                self.assertEqual(vectorized, pure)
+
+    def test_dates(self):
+        dates = recurrence.next_meeting_dates(
+            [date(2024, 1, 1).toordinal(), date(2024, 2, 5).toordinal()], [2, 0], date(2024, 1, 2).toordinal(), 2
+        )
+        self.assertEqual(dates, [['2024-01-15', '2024-01-29'], ['2024-02-05']])
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.calls = []
+        self.failures = 0
+        tasks = {
+            'record': jobs.Task('record', self.record, batch=True),
+            'flaky': jobs.Task('flaky', self.flaky, max_attempts=2, retry_delay=30),
+        }
+        patcher = mock.patch.dict(jobs.TASKS, tasks)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def record(self, payloads):
+        self.calls.append(payloads)
+
+    def flaky(self, **payload):
+        self.failures += 1
+        raise RuntimeError('mail server down')
+
+    def run_due(self):
+        return jobs.run_jobs(jobs.claim('test-worker', 20))
+
+    def test_idempotency_key(self):
+        first = jobs.enqueue('record', {'ward_ids': ['ward-1']}, key='summary:ward-1')
+        self.assertEqual(jobs.enqueue('record', {'ward_ids': ['ward-1']}, key='summary:ward-1'), first)
+        self.assertEqual(Job.objects.count(), 1)
+
+        jobs.claim('test-worker', 20)
+        # Once the job is running, the same key queues a new one for the newer change
+        second = jobs.enqueue('record', {'ward_ids': ['ward-1']}, key='summary:ward-1')
+        self.assertNotEqual(second, first)
+
+    def test_batch_task_runs_once_per_claim(self):
+        jobs.enqueue('record', {'ward_ids': ['ward-1']})
+        jobs.enqueue('record', {'ward_ids': ['ward-2']})
+        self.assertEqual(self.run_due(), 2)
+        self.assertEqual(self.calls, [[{'ward_ids': ['ward-1']}, {'ward_ids': ['ward-2']}]])
+        self.assertFalse(Job.objects.exclude(status=Job.DONE).exists())
+
+    def test_retries_with_backoff_then_fails(self):
+        job = jobs.enqueue('flaky', {})
+        with self.assertLogs('wards', 'WARNING'):
+            self.assertEqual(self.run_due(), 0)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=25))
+        self.assertIn('mail server down', job.last_error)
+
+        # Not due yet
+        self.assertEqual(jobs.claim('test-worker', 20), [])
+        Job.objects.update(run_after=timezone.now())
+        with self.assertLogs('wards', 'WARNING'):
+            self.run_due()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, self.failures), (Job.FAILED, 2, 2))
+
+    def test_stale_running_job_is_requeued(self):
+        job = jobs.enqueue('record', {})
+        jobs.claim('dead-worker', 20)
+        Job.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(jobs.requeue_stale(timeout=600), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+
+    @override_settings(WARDS_BACKGROUND_JOBS=False)
+    def test_inline_tasks_run_on_commit_and_log_failures(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            jobs.defer('flaky', {})
+            self.assertEqual(self.failures, 0)
+        with self.assertLogs('wards', 'ERROR') as logs:
+            for callback in callbacks:
+                callback()
+        self.assertEqual(self.failures, 1)
+        self.assertIn('Task flaky failed and will not be retried', logs.output[0])
+        self.assertFalse(Job.objects.exists())
+
+
+class BulkMeetingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        create_wards(2, meetings=1)
+        self.existing = Meeting.objects.get(ward_id='ward-0')
+        self.day = (date.today() + timedelta(days=14)).isoformat()
+
+    def post(self, operations, url='/api/wards/meetings/bulk/'):
+        return self.client.post(url, {'operations': operations}, content_type='application/json')
+
+    def post_rejected(self, operations, url='/api/wards/meetings/bulk/'):
+        with self.assertLogs('django.request', 'WARNING'):
+            return self.post(operations, url)
+
+    def test_batch_is_applied(self):
+        response = self.post([
+            {'op': 'create', 'ward': 'ward-0', 'meeting_date': self.day, 'meeting_time': '6:00 PM'},
+            {'op': 'cancel', 'id': self.existing.pk},
+            {'op': 'cancel', 'ward': 'ward-1', 'meeting_date': self.day},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['status'] for result in response.json()['results']], ['created', 'cancelled', 'cancelled'])
+        self.assertEqual(Meeting.objects.count(), 4)
+        self.assertEqual(Meeting.objects.filter(is_cancelled=True).count(), 2)
+
+    def test_one_invalid_operation_writes_nothing(self):
+        response = self.post_rejected([
+            {'op': 'create', 'ward': 'ward-0', 'meeting_date': self.day},
+            {'op': 'cancel', 'id': self.existing.pk},
+            {'op': 'update', 'id': 999999, 'venue': 'Library'},
+        ])
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['errors']
+        self.assertEqual(errors[:2], [{}, {}])
+        self.assertEqual(errors[2], {'id': ['Meeting 999999 not found.']})
+        self.assertEqual(Meeting.objects.count(), 2)
+        self.assertFalse(Meeting.objects.filter(is_cancelled=True).exists())
+
+    def test_operations_writing_the_same_meeting(self):
+        response = self.post_rejected([
+            {'op': 'create', 'ward': 'ward-0', 'meeting_date': self.day},
+            {'op': 'cancel', 'ward': 'ward-0', 'meeting_date': self.day},
+        ], url='/api/wards/ward-0/meetings/bulk/')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Another operation', response.json()['errors'][1]['non_field_errors'][0])
+        self.assertEqual(Meeting.objects.count(), 2)
+
+    def test_failed_write_rolls_back_the_whole_batch(self):
+        with mock.patch.object(Meeting.objects, 'bulk_update', side_effect=IntegrityError('unique')):
+            response = self.post_rejected([
+                {'op': 'create', 'ward': 'ward-0', 'meeting_date': self.day},
+                {'op': 'cancel', 'id': self.existing.pk},
+            ])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Meeting.objects.count(), 2)
+
+
+class SyncTests(TestCase):
+    def setUp(self):
+        create_wards(3, meetings=2)
+        # Out of the lag window, so a row is only sent again when it changes
+        yesterday = timezone.now() - timedelta(days=1)
+        Ward.objects.update(updated_at=yesterday)
+        Meeting.objects.update(updated_at=yesterday)
+
+    def sync(self, token=None, limit=None):
+        params = {}
+        if token:
+            params['since'] = token
+        if limit:
+            params['limit'] = limit
+        response = self.client.get('/api/wards/changes/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def sync_all(self, token=None, limit=None):
+        """Follow ``has_more`` to the end, returning every page"""
+        pages = [self.sync(token, limit)]
+        while pages[-1]['has_more']:
+            pages.append(self.sync(pages[-1]['token'], limit))
+        return pages
+
+    def test_full_sync_pages_through_everything(self):
+        pages = self.sync_all(limit=2)
+        self.assertEqual(len(pages), 3)
+        ward_ids = [ward['id'] for page in pages for ward in page['wards']]
+        meeting_ids = [meeting['id'] for page in pages for meeting in page['meetings']]
+        self.assertEqual(sorted(ward_ids), ['ward-0', 'ward-1', 'ward-2'])
+        self.assertEqual(sorted(meeting_ids), sorted(Meeting.objects.values_list('id', flat=True)))
+
+    def test_changes_and_deletions_since_token(self):
+        token = self.sync_all()[-1]['token']
+        self.assertEqual(self.sync(token)['wards'], [])
+
+        ward = Ward.objects.get(pk='ward-1')
+        ward.venue = 'Library'
+        ward.save()
+        deleted = Meeting.objects.filter(ward_id='ward-2').first()
+        deleted_id = deleted.pk
+        deleted.delete()
+        Ward.objects.get(pk='ward-0').delete()
+
+        delta = self.sync(token)
+        self.assertEqual([(row['id'], row['venue']) for row in delta['wards']], [('ward-1', 'Library')])
+        self.assertEqual(delta['meetings'], [])
+        self.assertEqual(delta['deleted']['wards'], ['ward-0'])
+        # The ward's meetings went with it
+        self.assertIn(deleted_id, delta['deleted']['meetings'])
+        self.assertEqual(len(delta['deleted']['meetings']), 3)
+
+    def test_tampered_token(self):
+        token = self.sync()['token']
+        with self.assertLogs('django.request', 'WARNING'):
+            response = self.client.get('/api/wards/changes/', {'since': token[:-2] + 'xx'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_expired_token(self):
+        old = timezone.now() - sync.retention() - timedelta(days=1)
+        token = sync.issue({'wards': (old, None), 'meetings': (old, None), 'deleted': (old, None)})
+        with self.assertLogs('django.request', 'WARNING'):
+            response = self.client.get('/api/wards/changes/', {'since': token})
+        self.assertEqual(response.status_code, 410)
+
+
+class ResponseFormatTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        create_wards(2)
+
+    def test_columnar_formats(self):
+        rows = self.client.get('/api/wards/?format=columnar').json()['results']
+        self.assertEqual(rows['count'], 2)
+        self.assertEqual([rows['ward_names'][index] for index in rows['columns']['ward_name']], ['Ward 0', 'Ward 1'])
+        self.assertEqual(len(rows['meetings']['columns']['ward']), 6)
+
+        msgpack = self.client.get('/api/wards/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(msgpack['Content-Type'], 'application/msgpack')
+        self.assertIn('Accept', msgpack['Vary'])
+
+    def test_unknown_times_match_json(self):
+        Ward.objects.filter(pk='ward-1').update(meeting_time=None)
+        Meeting.objects.filter(ward_id='ward-1').update(meeting_time=None)
+        for url, paginated in (
+            ('/api/wards/', True), ('/api/wards/ward-1/meetings/', True), ('/api/wards/occurrences/', False),
+        ):
+            with self.subTest(url=url):
+                results = self.client.get(url).json()
+                columns = self.client.get(url, {'format': 'columnar'}).json()
+                if paginated:
+                    results, columns = results['results'], columns['results']
+                columns = columns['columns']
+                self.assertIn(None, columns['meeting_time'])
+                self.assertEqual(columns['meeting_time'], [result['meeting_time'] for result in results])
+
+    def test_async_views_vary_on_accept(self):
+        from . import async_views
+
+        request = RequestFactory().get('/api/wards/ward-0/')
+        response = async_to_sync(async_views.ward_detail_view)(request, pk='ward-0')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Accept', response['Vary'])
+
+        request = RequestFactory().get('/api/wards/nope/')
+        response = async_to_sync(async_views.ward_detail_view)(request, pk='nope')
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('Accept', response['Vary'])
@@ -0,0 +1,55 @@
+"""
+Helpers for meeting times. Times are stored in ``TimeField``s and shown in the
+legacy display format, like "5:00 PM"; input may also be spelled "5pm" or
+"17:00".
+"""
+import re
+from datetime import datetime, time
+
+TIME_FORMATS = ('%I:%M %p', '%I:%M%p', '%I %p', '%I%p', '%H:%M', '%H:%M:%S')
+
+DISPLAY_FORMAT = '%I:%M %p'
+
+
+def parse_meeting_time(value):
+    """
+    Parse a meeting time such as "5:00 PM", "5pm", "6.30 p.m." or "17:00" into a
+    ``datetime.time``; times are returned as they are. Returns None when the
+    value cannot be parsed.
+    """
+    if isinstance(value, time):
+        return value
+    if not value:
+        return None
+    # "6.30 p.m." -> "6:30 PM"
+    text = re.sub(r'(?<=\d)\.(?=\d)', ':', str(value))
+    text = ' '.join(text.replace('.', '').upper().split())
+    for fmt in TIME_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).time()
+        except ValueError:
+            continue
+    return None
+
+
+def format_meeting_time(value):
+    """Display a meeting time as "5:00 PM", or '' when it is unknown"""
+    if value is None:
+        return ''
+    return value.strftime(DISPLAY_FORMAT).lstrip('0')
+
+
+def filter_time_range(queryset, time_from=None, time_to=None):
+    """Limit ``queryset`` to meeting times from ``time_from`` to ``time_to`` inclusive"""
+    if time_from is not None:
+        queryset = queryset.filter(meeting_time__gte=time_from)
+    if time_to is not None:
+        queryset = queryset.filter(meeting_time__lte=time_to)
+    return queryset
+
+
+def in_time_range(value, time_from=None, time_to=None):
+    """``filter_time_range`` for a single value; unknown times match only an open range"""
+    if value is None:
+        return time_from is None and time_to is None
+    return (time_from is None or time_from <= value) and (time_to is None or value <= time_to)
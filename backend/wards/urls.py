@@ -1,10 +1,41 @@
-from django.urls import path, include
+import re
+from django.conf import settings
+from django.urls import path, include, re_path
 from rest_framework.routers import DefaultRouter
+from .renderers import ICalendarRenderer
 from .views import WardViewSet
 
 router = DefaultRouter()
 router.register(r'', WardViewSet)
 
-urlpatterns = [
+calendar_feed = WardViewSet.as_view({'get': 'calendar'}, renderer_classes=[ICalendarRenderer])
+
+calendar_patterns = [
+    path('calendar.ics', calendar_feed, name='ward-calendar-all'),
+    path('<str:pk>/calendar.ics', calendar_feed, name='ward-calendar'),
+]
+
+# Every other route, sync or async
+router_patterns = [
     path('', include(router.urls)),
 ]
+
+urlpatterns = calendar_patterns + router_patterns
+
+if settings.WARDS_ASYNC_VIEWS:
+    from . import async_views
+
+    # Names match the router's, so metrics and reverse() see the same views.
+    # Ward ids never collide with the viewset's list-level actions (export/, ...)
+    list_actions = '|'.join(
+        re.escape(action.url_path) for action in WardViewSet.get_extra_actions() if not action.detail
+    )
+    urlpatterns = [
+        path('', async_views.ward_list_view, name='ward-list'),
+        path('occurrences/', async_views.occurrences_view, name='ward-occurrences'),
+        path('summary/', async_views.summary_view, name='ward-summary'),
+        path('calendar.ics', async_views.calendar_view, name='ward-calendar-all'),
+        path('<str:pk>/calendar.ics', async_views.calendar_view, name='ward-calendar'),
+        path('<str:pk>/meetings/', async_views.ward_meetings_view, name='ward-meetings'),
+        re_path(rf'^(?!(?:{list_actions})/$)(?P<pk>[^/.]+)/$', async_views.ward_detail_view, name='ward-detail'),
+    ] + router_patterns
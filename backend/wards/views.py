@@ -1,8 +1,158 @@
+from datetime import date, timedelta
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from django.db.models import Prefetch
 from rest_framework.response import Response
+from . import bulk, columnar, conditional, conflicts, exporters, feeds, materialize, search, summaries, sync
+from .cache import cached_response, response_cache
+from .conditional import conditional_response
 from .models import Ward, Meeting
-from .serializers import WardSerializer, MeetingSerializer
+from .pagination import MeetingKeysetPagination
+from .recurrence import MAX_RANGE_DAYS, default_range, next_meeting_dates
+from .renderers import WARD_RENDERERS, is_columnar
+from .times import filter_time_range, parse_meeting_time
+from .serializers import (
+    WardSerializer, MeetingSerializer, MeetingOperationSerializer, OccurrenceSerializer, ConflictSerializer,
+    SyncMeetingSerializer,
+)
+
+
+def parse_date_param(params, name, default=None):
+    """Parse an ISO date (YYYY-MM-DD) query parameter"""
+    value = params.get(name)
+    if not value:
+        return default
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValidationError({name: f'Invalid date "{value}", expected YYYY-MM-DD.'})
+
+
+def parse_date_range(params):
+    """Parse ``from``/``to`` query parameters into a bounded date range"""
+    default_from, default_to = default_range()
+    from_date = parse_date_param(params, 'from', default_from)
+    to_date = parse_date_param(params, 'to', from_date + (default_to - default_from))
+    if to_date < from_date:
+        raise ValidationError({'to': '"to" must not be before "from".'})
+    if to_date - from_date > timedelta(days=MAX_RANGE_DAYS):
+        raise ValidationError({'to': f'Date range may not exceed {MAX_RANGE_DAYS} days.'})
+    return from_date, to_date
+
+
+def parse_time_param(params, name):
+    """Parse a time query parameter ("17:00", "5:00 PM" or "5pm")"""
+    value = params.get(name)
+    if not value:
+        return None
+    parsed = parse_meeting_time(value)
+    if parsed is None:
+        raise ValidationError({name: f'Invalid time "{value}", expected HH:MM.'})
+    return parsed
+
+
+def parse_time_range(params):
+    """Parse ``time_from``/``time_to`` query parameters (inclusive, either may be omitted)"""
+    return parse_time_param(params, 'time_from'), parse_time_param(params, 'time_to')
+
+
+def parse_list_param(params, name):
+    """Parse a comma separated query parameter into a list of values"""
+    return [value.strip() for value in params.get(name, '').split(',') if value.strip()]
+
+
+def parse_bool_param(params, name):
+    """Parse a true/false query parameter, returning None when absent"""
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    if value.lower() in ('true', '1', 'yes'):
+        return True
+    if value.lower() in ('false', '0', 'no'):
+        return False
+    raise ValidationError({name: f'Invalid boolean "{value}", expected true or false.'})
+
+
+def feed_querysets(pk=None):
+    """Wards and meetings rendered into a calendar feed (one ward or all)"""
+    wards = Ward.objects.order_by('id')
+    meetings = Meeting.objects.order_by().only(
+        'ward_id', 'meeting_date', 'meeting_time', 'venue', 'agenda', 'is_cancelled'
+    )
+    if pk is not None:
+        wards = wards.filter(pk=pk)
+        meetings = meetings.filter(ward_id=pk)
+    return wards, meetings
+
+
+def parse_count_param(params, name, default, maximum):
+    """Parse a positive integer query parameter no larger than ``maximum``"""
+    value = params.get(name)
+    if not value:
+        return default
+    try:
+        count = int(value)
+    except ValueError:
+        count = 0
+    if not 1 <= count <= maximum:
+        raise ValidationError({name: f'Expected a whole number from 1 to {maximum}.'})
+    return count
+
+
+def summary_response(request, payload):
+    """Response for a rendered summary document, or 304 when the client has it"""
+    response = get_conditional_response(request, etag=payload['etag'])
+    if response is None:
+        response = HttpResponse(payload['content'], content_type='application/json')
+    response['ETag'] = payload['etag']
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def bulk_meetings_response(data, ward_id=None):
+    """Validate and apply a batch of meeting operations, reporting per operation"""
+    operations = data.get('operations') if isinstance(data, dict) else None
+    if not isinstance(operations, list):
+        raise ValidationError({'operations': 'Expected a list of operations.'})
+    serializer = MeetingOperationSerializer(
+        data=operations, many=True, max_length=bulk.MAX_OPERATIONS, context={'ward': ward_id}
+    )
+    if not serializer.is_valid():
+        errors = serializer.errors
+        return Response(errors if isinstance(errors, dict) else {'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        results, errors = bulk.apply(serializer.validated_data, ward_id)
+    except bulk.BatchConflict:
+        return Response(
+            {'detail': 'Meetings changed while the batch was being written; nothing was saved, retry.'},
+            status=status.HTTP_409_CONFLICT,
+        )
+    if any(errors):
+        return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+    for result in results:
+        result['meeting'] = MeetingSerializer(result['meeting']).data
+    return Response({'results': results})
+
+
+def filter_meetings(meetings, params):
+    """
+    Apply ``from``/``to``/``cancelled`` and ``time_from``/``time_to`` query
+    parameters to a meeting queryset
+    """
+    from_date = parse_date_param(params, 'from')
+    to_date = parse_date_param(params, 'to')
+    cancelled = parse_bool_param(params, 'cancelled')
+    if from_date:
+        meetings = meetings.filter(meeting_date__gte=from_date)
+    if to_date:
+        meetings = meetings.filter(meeting_date__lte=to_date)
+    if cancelled is not None:
+        meetings = meetings.filter(is_cancelled=cancelled)
+    return filter_time_range(meetings, *parse_time_range(params))
+
 
 class WardViewSet(viewsets.ModelViewSet):
     """
@@ -10,21 +160,321 @@ class WardViewSet(viewsets.ModelViewSet):
     """
     queryset = Ward.objects.all()
     serializer_class = WardSerializer
-    
+    renderer_classes = WARD_RENDERERS
+
+    # Ward lists only nest meetings from this many days ago onwards
+    RECENT_MEETINGS_DAYS = 90
+
+    # Upper bound on ``?count=`` of the next meetings endpoint
+    MAX_NEXT_COUNT = 52
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            queryset = filter_time_range(queryset, *parse_time_range(self.request.query_params))
+        if self.action == 'list' and self.includes_meetings():
+            recent = date.today() - timedelta(days=self.RECENT_MEETINGS_DAYS)
+            queryset = queryset.prefetch_related(
+                Prefetch('meetings', queryset=Meeting.objects.filter(meeting_date__gte=recent))
+            )
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action in ('list', 'retrieve'):
+            kwargs.setdefault('fields', self.requested_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def requested_fields(self):
+        """
+        Fields selected with ``?fields=``, plus nested meetings when
+        ``?expand=meetings`` is given. ``None`` means every field.
+        """
+        fields = parse_list_param(self.request.query_params, 'fields')
+        if not fields:
+            return None
+        if 'meetings' in parse_list_param(self.request.query_params, 'expand'):
+            fields.append('meetings')
+        return fields
+
+    def includes_meetings(self):
+        fields = self.requested_fields()
+        return fields is None or 'meetings' in fields
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        patch_vary_headers(response, ['Accept'])
+        return response
+
+    @conditional_response('list')
+    @cached_response('list')
+    def list(self, request, *args, **kwargs):
+        if is_columnar(request.accepted_renderer):
+            return self.list_columns(request)
+        return super().list(request, *args, **kwargs)
+
+    def list_columns(self, request):
+        """
+        ``list`` as a ``columnar.Table`` of ward values, with the nested
+        meetings in a second table keyed by ``ward``
+        """
+        fields = self.requested_fields()
+        columns = [column for column in columnar.WARD_COLUMNS if fields is None or column in fields]
+        wards = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+        rows = wards.values_list('id', *columns)
+        page = self.paginate_queryset(rows)
+        rows = list(rows) if page is None else page
+
+        children = {}
+        if self.includes_meetings():
+            recent = date.today() - timedelta(days=self.RECENT_MEETINGS_DAYS)
+            meetings = Meeting.objects.filter(
+                ward_id__in=[row[0] for row in rows], meeting_date__gte=recent
+            ).values_list('ward_id', *columnar.MEETING_COLUMNS)
+            children['meetings'] = columnar.Table(('ward',) + columnar.MEETING_COLUMNS, meetings)
+        table = columnar.Table(columns, [row[1:] for row in rows], children)
+        if page is not None:
+            return self.get_paginated_response(table)
+        return Response(table)
+
+    @conditional_response('retrieve', per_ward=True)
+    @cached_response('retrieve', per_ward=True)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     @action(detail=True, methods=['get'])
+    @conditional_response('meetings', per_ward=True)
+    @cached_response('meetings', per_ward=True)
     def meetings(self, request, pk=None):
-        """Get all meetings for a specific ward"""
+        """
+        Get meetings for a specific ward, newest first (``?ordering=meeting_date``
+        for oldest first), one keyset page at a time. Filter with ``?from=``,
+        ``?to=``, ``?cancelled=``, ``?time_from=`` and ``?time_to=``.
+        """
         ward = self.get_object()
-        meetings = ward.meetings.all()
-        serializer = MeetingSerializer(meetings, many=True)
+        meetings = filter_meetings(ward.meetings.all(), request.query_params)
+        paginator = MeetingKeysetPagination()
+        if is_columnar(request.accepted_renderer):
+            rows = paginator.page_queryset(meetings.values_list(*columnar.MEETING_COLUMNS), request)
+            # Rows start with the id, then the date
+            paginator.set_page(list(rows), cursor=lambda row: (row[1], row[0]))
+            return paginator.get_paginated_response(columnar.Table(columnar.MEETING_COLUMNS, paginator.page))
+        page = paginator.paginate_queryset(meetings, request, view=self)
+        serializer = MeetingSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['post'], url_path='meetings/bulk', url_name='meetings-bulk')
+    def meetings_bulk(self, request, pk=None):
+        """
+        Create, update and cancel many meetings of this ward at once:
+        ``{"operations": [{"op": "cancel", "meeting_date": "2026-01-05"}, ...]}``.
+        Every operation is applied, in one transaction, or none is.
+        """
+        ward = self.get_object()
+        return bulk_meetings_response(request.data, ward.pk)
+
+    @action(detail=False, methods=['post'], url_path='meetings/bulk', url_name='bulk-meetings')
+    def bulk_meetings(self, request):
+        """Like ``meetings_bulk``, for meetings of any ward (each operation names its ``ward``)"""
+        return bulk_meetings_response(request.data)
+
+    @action(detail=False, methods=['get'])
+    @cached_response('occurrences')
+    def occurrences(self, request):
+        """
+        Get expanded meeting occurrences for all wards (or ``?ward=`` ids,
+        comma separated) between ``?from=`` and ``?to=``, optionally only
+        those starting from ``?time_from=`` to ``?time_to=``
+        """
+        from_date, to_date = parse_date_range(request.query_params)
+        ward_ids = parse_list_param(request.query_params, 'ward')
+        time_from, time_to = parse_time_range(request.query_params)
+
+        if is_columnar(request.accepted_renderer):
+            rows = materialize.occurrence_rows(from_date, to_date, ward_ids, time_from, time_to)
+            return Response(columnar.Table(columnar.OCCURRENCE_COLUMNS, rows))
+        occurrences = materialize.occurrences(from_date, to_date, ward_ids, time_from, time_to)
+        serializer = OccurrenceSerializer(occurrences, many=True)
         return Response(serializer.data)
-    
+
+    @action(detail=False, methods=['get'])
+    @cached_response('conflicts')
+    def conflicts(self, request):
+        """
+        Get pairs of meetings booked at the same venue at overlapping times
+        between ``?from=`` and ``?to=``
+        """
+        from_date, to_date = parse_date_range(request.query_params)
+        serializer = ConflictSerializer(conflicts.find_conflicts(from_date, to_date), many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'], url_path='next')
+    @cached_response('next')
+    def next_meetings(self, request):
+        """
+        Get the next ``?count=`` (default 1) scheduled meeting dates of every
+        ward (or ``?ward=`` ids) on or after ``?as_of=`` (default today). Dates
+        with a cancelled meeting are repeated under ``cancelled``.
+        """
+        as_of = parse_date_param(request.query_params, 'as_of', date.today())
+        count = parse_count_param(request.query_params, 'count', 1, self.MAX_NEXT_COUNT)
+        ward_ids = parse_list_param(request.query_params, 'ward')
+
+        wards = Ward.objects.order_by('id')
+        if ward_ids:
+            wards = wards.filter(id__in=ward_ids)
+        ids, starts, frequencies = [], [], []
+        for ward_id, start_date, frequency_weeks in wards.values_list('id', 'start_date', 'frequency_weeks'):
+            ids.append(ward_id)
+            starts.append(start_date.toordinal())
+            frequencies.append(frequency_weeks)
+        schedules = next_meeting_dates(starts, frequencies, as_of.toordinal(), count)
+
+        # ISO dates sort like dates
+        last = max((dates[-1] for dates in schedules if dates), default=None)
+        cancelled = set()
+        if last is not None:
+            meetings = Meeting.objects.filter(
+                is_cancelled=True, meeting_date__range=(as_of, date.fromisoformat(last))
+            ).order_by()
+            if ward_ids:
+                meetings = meetings.filter(ward_id__in=ward_ids)
+            cancelled = {
+                (ward_id, meeting_date.isoformat())
+                for ward_id, meeting_date in meetings.values_list('ward_id', 'meeting_date')
+            }
+
+        results = [
+            {
+                'ward_id': ward_id,
+                'dates': dates,
+                'cancelled': [day for day in dates if (ward_id, day) in cancelled] if cancelled else [],
+            }
+            for ward_id, dates in zip(ids, schedules)
+        ]
+        return Response({'as_of': as_of.isoformat(), 'count': count, 'results': results})
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream meetings (``?source=meetings``, the default) or expanded
+        occurrences (``?source=occurrences``) as ``?output=csv|ndjson|ics``,
+        optionally limited by ``?from=``, ``?to=`` and ``?ward=``
+        """
+        output = request.query_params.get('output', 'csv')
+        source = request.query_params.get('source', 'meetings')
+        if output not in exporters.OUTPUTS:
+            raise ValidationError({'output': f'Expected one of: {", ".join(exporters.OUTPUTS)}.'})
+        if source not in exporters.SOURCES:
+            raise ValidationError({'source': f'Expected one of: {", ".join(exporters.SOURCES)}.'})
+
+        if source == 'occurrences':
+            from_date, to_date = parse_date_range(request.query_params)
+        else:
+            from_date = parse_date_param(request.query_params, 'from')
+            to_date = parse_date_param(request.query_params, 'to')
+        ward_ids = parse_list_param(request.query_params, 'ward')
+
+        content_type, extension = exporters.OUTPUTS[output]
+        response = StreamingHttpResponse(
+            exporters.export(output, source, from_date, to_date, ward_ids),
+            content_type=content_type,
+        )
+        response['Content-Disposition'] = f'attachment; filename="ward-{source}.{extension}"'
+        return response
+
+    def calendar(self, request, pk=None):
+        """
+        iCalendar subscription feed for one ward, or every ward when no ``pk``
+        is given. Rendered feeds are cached under their ETag, so repeated
+        polls cost the validator queries plus a cache lookup.
+        """
+        evaluated = conditional.evaluate(request, 'calendar', pk)
+        if evaluated is None and pk is not None:
+            raise NotFound()
+        if evaluated is not None and evaluated[2] is not None:
+            return evaluated[2]
+
+        key = feeds.cache_key(evaluated[0]) if evaluated else None
+        content = response_cache.get(key) if key else None
+        if content is None:
+            wards, meetings = feed_querysets(pk)
+            wards = list(wards)
+            content = feeds.render_feed(wards, meetings, feeds.feed_name(wards, pk))
+            if key:
+                response_cache.set(key, content)
+
+        response = HttpResponse(content, content_type='text/calendar; charset=utf-8')
+        if evaluated:
+            conditional.set_validators(response, evaluated[0], evaluated[1])
+        return response
+
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """
+        Get every ward's name, venue, schedule, next meeting and counts of
+        upcoming and cancelled meetings, as one precomputed JSON document
+        """
+        return summary_response(request, summaries.payload())
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Wards and meetings created or updated, and ids of those deleted,
+        since the sync token ``?since=`` (everything when omitted), at most
+        ``?limit=`` of each kind per page. Responses carry the next token.
+        """
+        limit = parse_count_param(request.query_params, 'limit', sync.PAGE_SIZE, sync.MAX_PAGE_SIZE)
+        try:
+            delta = sync.changes(request.query_params.get('since'), limit)
+        except sync.InvalidToken:
+            raise ValidationError({'since': 'Invalid sync token.'})
+        except sync.TokenExpired:
+            return Response(
+                {'detail': 'Sync token expired; sync again without "since".'}, status=status.HTTP_410_GONE
+            )
+        ward_fields = [field for field in WardSerializer.Meta.fields if field != 'meetings']
+        response = Response({
+            'token': delta['token'],
+            'has_more': delta['has_more'],
+            'wards': WardSerializer(delta['wards'], many=True, fields=ward_fields).data,
+            'meetings': SyncMeetingSerializer(delta['meetings'], many=True).data,
+            'deleted': delta['deleted'],
+        })
+        patch_cache_control(response, no_store=True)
+        return response
+
+    @action(detail=False, methods=['get'])
+    @cached_response('search')
+    def search(self, request):
+        """
+        Full-text search of ward names and venues and of meeting venues,
+        agendas and notes for every word of ``?q=``, best matches first, at
+        most ``?limit=`` of each, optionally only of ``?ward=`` ids
+        """
+        query = request.query_params.get('q', '')
+        if not search.terms(query):
+            raise ValidationError({'q': 'Enter at least one word to search for.'})
+        limit = parse_count_param(request.query_params, 'limit', search.PAGE_SIZE, search.MAX_PAGE_SIZE)
+        return Response(search.search(query, parse_list_param(request.query_params, 'ward'), limit))
+
+    @action(detail=False, methods=['get'], url_path='cache-stats')
+    def cache_stats(self, request):
+        """Get response cache hit/miss counters for this process"""
+        return Response(response_cache.stats())
+
     @action(detail=True, methods=['post'])
     def update_details(self, request, pk=None):
-        """Update ward details by ward admin"""
+        """
+        Update ward details by ward admin. Changes that would double-book a
+        venue another ward uses at the same time are rejected.
+        """
         ward = self.get_object()
         serializer = self.get_serializer(ward, data=request.data, partial=True)
         if serializer.is_valid():
+            clashes = conflicts.schedule_conflicts(ward, serializer.validated_data)
+            if clashes:
+                messages = list(dict.fromkeys(conflicts.describe(existing) for _, existing in clashes))
+                return Response({'conflicts': messages}, status=status.HTTP_400_BAD_REQUEST)
             serializer.save()
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
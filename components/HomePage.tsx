@@ -1,13 +1,23 @@
-import React, { useMemo } from 'react';
-import { Ward, UpcomingMeeting } from '../types';
+import React, { useEffect, useMemo, useState } from 'react';
+import { Ward, NextMeetings } from '../types';
+import { fetchNextMeetings } from '../utils/api';
 import { calculateUpcomingMeetings, formatDate } from '../utils/dateUtils';
 
+// Fetch a few dates per ward so a cancelled meeting can be skipped
+const NEXT_MEETINGS_COUNT = 3;
+
 interface HomePageProps {
   wards: Ward[];
   onWardClick: (wardId: string) => void;
 }
 
 export const HomePage: React.FC<HomePageProps> = ({ wards, onWardClick }) => {
+  const [nextMeetings, setNextMeetings] = useState<Record<string, NextMeetings>>({});
+
+  useEffect(() => {
+    fetchNextMeetings(NEXT_MEETINGS_COUNT).then(setNextMeetings);
+  }, [wards]);
+
   return (
     <div>
       {/* Hero Section */}
@@ -41,6 +51,7 @@ export const HomePage: React.FC<HomePageProps> = ({ wards, onWardClick }) => {
             <WardCardBig
               key={ward.id}
               ward={ward}
+              next={nextMeetings[ward.id]}
               onClick={() => onWardClick(ward.id)}
             />
           ))}
@@ -52,20 +63,24 @@ export const HomePage: React.FC<HomePageProps> = ({ wards, onWardClick }) => {
 
 interface WardCardBigProps {
   ward: Ward;
+  next?: NextMeetings;
   onClick: () => void;
 }
 
-const WardCardBig: React.FC<WardCardBigProps> = ({ ward, onClick }) => {
-  const upcomingMeetings = useMemo(() => {
+const WardCardBig: React.FC<WardCardBigProps> = ({ ward, next, onClick }) => {
+  const nextMeeting = useMemo(() => {
+    // Prefer the server's dates, which know about cancellations
+    if (next) {
+      const date = next.dates.find((day) => !next.cancelled.includes(day));
+      return date ? { date } : undefined;
+    }
     try {
-      return calculateUpcomingMeetings(ward.start_date, ward.frequency_weeks, 1);
+      return calculateUpcomingMeetings(ward.start_date, ward.frequency_weeks, 1)[0];
     } catch (error) {
       console.error(`Error calculating meetings for ward ${ward.ward_name}:`, error);
-      return [];
+      return undefined;
     }
-  }, [ward]);
-
-  const nextMeeting = upcomingMeetings[0];
+  }, [ward, next]);
 
   return (
     <button
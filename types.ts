@@ -27,3 +27,56 @@ export interface UpcomingMeeting {
   date: Date;
   isNext: boolean;
 }
+
+export interface NextMeetings {
+  ward_id: string;
+  dates: string[]; // ISO format: YYYY-MM-DD
+  cancelled: string[]; // The dates above whose meeting is cancelled
+}
+
+export interface SyncedMeeting extends Omit<Meeting, 'id'> {
+  id: number;
+  ward: string;
+  updated_at: string;
+}
+
+// One page of /api/wards/changes/: apply `deleted` first, then upsert the rows
+export interface WardChanges {
+  token: string; // Pass as ?since= on the next sync
+  has_more: boolean;
+  wards: Ward[];
+  meetings: SyncedMeeting[];
+  deleted: {
+    wards: string[];
+    meetings: number[];
+  };
+}
+
+export interface WardSearchHit {
+  id: string;
+  ward_name: string;
+  venue: string;
+  meeting_day: string;
+  meeting_time: string;
+  score: number | null; // Higher is better; null when the database has no search index
+  highlights: Record<string, string>; // HTML fragments with matches in <mark>
+}
+
+export interface MeetingSearchHit {
+  id: number;
+  ward: string;
+  ward_name: string;
+  meeting_date: string;
+  meeting_time: string;
+  venue: string;
+  is_cancelled: boolean;
+  score: number | null;
+  highlights: Record<string, string>;
+}
+
+// Response of /api/wards/search/?q=
+export interface SearchResults {
+  query: string;
+  wards: WardSearchHit[];
+  meetings: MeetingSearchHit[];
+}
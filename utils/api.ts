@@ -1,10 +1,15 @@
-import { Ward, Meeting } from '../types';
+import { Ward, Meeting, NextMeetings, SearchResults, WardChanges } from '../types';
 
 const API_URL = '/api/wards';
 
+// Fields needed to list wards and compute their upcoming meetings
+const WARD_LIST_FIELDS = [
+  'id', 'ward_name', 'meeting_day', 'meeting_time', 'venue', 'frequency_weeks', 'start_date',
+].join(',');
+
 export const fetchWards = async (): Promise<Ward[]> => {
   try {
-    const response = await fetch(`${API_URL}/`);
+    const response = await fetch(`${API_URL}/?fields=${WARD_LIST_FIELDS}`);
     if (!response.ok) throw new Error('Failed to fetch wards');
     const data = await response.json();
     // Handle both paginated and direct array responses
@@ -15,6 +20,45 @@ export const fetchWards = async (): Promise<Ward[]> => {
   }
 };
 
+// Next scheduled meeting dates of every ward, keyed by ward id
+export const fetchNextMeetings = async (count: number = 1): Promise<Record<string, NextMeetings>> => {
+  try {
+    const response = await fetch(`${API_URL}/next/?count=${count}`);
+    if (!response.ok) throw new Error('Failed to fetch next meetings');
+    const data = await response.json();
+    const byWard: Record<string, NextMeetings> = {};
+    for (const entry of data.results as NextMeetings[]) {
+      byWard[entry.ward_id] = entry;
+    }
+    return byWard;
+  } catch (error) {
+    console.error('Error fetching next meetings:', error);
+    return {};
+  }
+};
+
+// Wards and meetings changed since a sync token (everything without one).
+// Returns null when the token has expired and a full sync is needed.
+export const fetchChanges = async (since?: string): Promise<WardChanges | null> => {
+  const query = since ? `?since=${encodeURIComponent(since)}` : '';
+  const response = await fetch(`${API_URL}/changes/${query}`);
+  if (response.status === 410) return null;
+  if (!response.ok) throw new Error('Failed to fetch changes');
+  return await response.json();
+};
+
+// Wards and meetings matching every word of the query, best first
+export const searchWards = async (query: string): Promise<SearchResults> => {
+  try {
+    const response = await fetch(`${API_URL}/search/?q=${encodeURIComponent(query)}`);
+    if (!response.ok) throw new Error('Failed to search');
+    return await response.json();
+  } catch (error) {
+    console.error('Error searching:', error);
+    return { query, wards: [], meetings: [] };
+  }
+};
+
 export const fetchWardById = async (wardId: string): Promise<Ward | null> => {
   try {
     const response = await fetch(`${API_URL}/${wardId}/`);